@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from datetime import timedelta
 
 from backend.models.database import get_db, User
@@ -11,6 +14,7 @@ from backend.utils.security import (
     create_access_token,
     verify_token
 )
+from backend.utils.read_routing import client_written_at, read_router, user_key
 from backend.config import settings
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -20,10 +24,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 # =====================================================
 # GET CURRENT USER (JWT → USER)
 # =====================================================
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+async def load_token_user(token: str, db: AsyncSession) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -34,12 +35,41 @@ def get_current_user(
     if email is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == email).first()
+    # The profile is loaded with the user - routes read it on the event loop
+    user = await db.scalar(
+        select(User)
+        .options(joinedload(User.emergency_profile))
+        .where(User.email == email)
+    )
     if user is None:
         raise credentials_exception
 
     return user
 
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    return await load_token_user(token, db)
+
+# -----------------------------------------------------
+# Read-only routes: the user and their data from the
+# read replica (primary right after their own writes)
+# -----------------------------------------------------
+async def get_user_read_db(request: Request, token: str = Depends(oauth2_scheme)):
+    email = verify_token(token)
+    keys = [user_key(email)] if email else []
+    async with read_router.session(*keys, written_at=client_written_at(request)) as db:
+        yield db
+
+
+async def get_current_reader(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_user_read_db)
+) -> User:
+    return await load_token_user(token, db)
+
 # =====================================================
 # REGISTER
 # =====================================================
@@ -48,14 +78,16 @@ def get_current_user(
     response_model=UserResponse,
     status_code=status.HTTP_201_CREATED
 )
-def register(
+async def register(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    existing_user = db.query(User).filter(
-        (User.email == user_data.email) |
-        (User.username == user_data.username)
-    ).first()
+    existing_user = await db.scalar(
+        select(User).where(or_(
+            User.email == user_data.email,
+            User.username == user_data.username
+        ))
+    )
 
     if existing_user:
         raise HTTPException(
@@ -68,13 +100,14 @@ def register(
         username=user_data.username,
         full_name=user_data.full_name,
         phone=user_data.phone,
-        password_hash=get_password_hash(user_data.password),
+        # bcrypt is deliberately slow - keep it off the event loop
+        password_hash=await run_in_threadpool(get_password_hash, user_data.password),
         is_active=True
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     return new_user
 
@@ -82,15 +115,16 @@ def register(
 # LOGIN
 # =====================================================
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(User).filter(
-        User.email == form_data.username
-    ).first()
+    user = await db.scalar(
+        select(User).where(User.email == form_data.username)
+    )
 
-    if not user or not verify_password(
+    if not user or not await run_in_threadpool(
+        verify_password,
         form_data.password,
         user.password_hash
     ):
@@ -124,14 +158,14 @@ def login(
 # CURRENT USER INFO
 # =====================================================
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 # =====================================================
 # LOGOUT (CLIENT SIDE)
 # =====================================================
 @router.post("/logout")
-def logout():
+async def logout():
     return {
         "message": "Logged out successfully. Remove token from client."
     }
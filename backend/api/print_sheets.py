@@ -0,0 +1,138 @@
+"""
+Bulk print sheet API - many cards imposed on letter pages
+"""
+from datetime import datetime, timedelta
+from functools import partial
+from typing import AsyncIterator, Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models.database import get_db, SessionLocal, PrintSheetUsage, User
+from backend.api.auth import get_current_user
+from backend.api.public import log_access
+from backend.models.schemas import PrintSheetRequest
+from backend.utils.public_card import card_print_data, load_public_cards, missing_public_ids
+from backend.utils.short_link import card_qr_data
+from backend.utils.print_sheet import CARDS_PER_QUERY, cards_per_page, paginate, render_sheet_page, sheet_writer
+from backend.utils.render_service import render_service
+from backend.config import settings
+
+router = APIRouter(prefix="/print", tags=["Print Sheets"])
+
+# -----------------------------------------------------
+# Helper: Charge a sheet to the user's print quota
+# (usage rows live in the database, so the quota holds
+#  across workers; the user's row lock serializes their
+#  concurrent requests on PostgreSQL)
+# -----------------------------------------------------
+async def charge_print_quota(user: User, cards: int, db: AsyncSession) -> None:
+    if settings.PRINT_SHEET_QUOTA_CARDS <= 0:
+        return
+
+    await db.execute(select(User.id).where(User.id == user.id).with_for_update())
+    since = datetime.utcnow() - timedelta(seconds=settings.PRINT_SHEET_QUOTA_SECONDS)
+    used = await db.scalar(
+        select(func.coalesce(func.sum(PrintSheetUsage.cards), 0))
+        .where(PrintSheetUsage.user_id == user.id, PrintSheetUsage.requested_at >= since)
+    )
+    if used + cards > settings.PRINT_SHEET_QUOTA_CARDS:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Print sheet quota reached, try again later"
+        )
+
+    db.add(PrintSheetUsage(user_id=user.id, cards=cards))
+    await db.commit()
+
+# -----------------------------------------------------
+# Helper: Load cards a chunk at a time, as sheet pages
+# (the request's session is closed before the body is
+#  streamed, so each chunk uses a short-lived session;
+#  decrypting a chunk is CPU work, so it stays on the
+#  sync engine in the threadpool)
+# -----------------------------------------------------
+def load_sheet_cards(public_ids: List[str], request: Request) -> List[Dict]:
+    db = SessionLocal()
+    try:
+        entries = load_public_cards(public_ids, db)
+    finally:
+        db.close()
+
+    # Printing a card reads it, like a scan does
+    for entry in entries:
+        log_access(entry, request)
+
+    return [
+        {
+            "user_data": card_print_data(entry),
+            "qr_url": card_qr_data(entry)
+        }
+        for entry in entries
+    ]
+
+
+async def sheet_pages(public_ids: List[str], per_page: int, request: Request) -> AsyncIterator[List[Dict]]:
+    for start in range(0, len(public_ids), CARDS_PER_QUERY):
+        cards = await run_in_threadpool(load_sheet_cards, public_ids[start:start + CARDS_PER_QUERY], request)
+        for page in paginate(cards, per_page):
+            yield page
+
+
+async def stream_print_sheet(public_ids: List[str], request: Request, card_size: str = "credit") -> AsyncIterator[bytes]:
+    writer = sheet_writer(card_size)
+    yield writer.begin()
+
+    pages = render_service.map(
+        partial(render_sheet_page, card_size=card_size),
+        sheet_pages(public_ids, cards_per_page(card_size), request),
+        settings.PRINT_SHEET_WINDOW
+    )
+    async for content in pages:
+        yield writer.add_page(content)
+
+    yield writer.finish()
+
+# =====================================================
+# 🖨️ BULK PRINT SHEET (SCHOOLS / EMPLOYERS)
+# =====================================================
+@router.post("/sheets", responses={200: {"content": {"application/pdf": {}}}})
+async def create_print_sheet(
+    sheet: PrintSheetRequest,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stream a PDF with the requested cards (credit or business card
+    size) laid out eight to a letter page, with cut marks. Pages are rendered in parallel and
+    written as they complete, so memory use does not grow with the batch.
+    Every card printed counts against the user's print quota and is
+    recorded in its owner's access log.
+    """
+    if len(sheet.public_ids) > settings.PRINT_SHEET_MAX_CARDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.PRINT_SHEET_MAX_CARDS} cards per print sheet"
+        )
+
+    # Charged before the lookup, so probing for ids uses up the quota too
+    await charge_print_quota(current_user, len(sheet.public_ids), db)
+
+    # Which ids exist is not told: that would let callers enumerate cards
+    missing = await db.run_sync(lambda session: missing_public_ids(sheet.public_ids, session))
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Some public_ids could not be printed"
+        )
+
+    return StreamingResponse(
+        stream_print_sheet(sheet.public_ids, request, sheet.card_size),
+        media_type="application/pdf",
+        headers={"Content-Disposition": 'attachment; filename="emergency_cards.pdf"'}
+    )
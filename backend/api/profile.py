@@ -1,9 +1,12 @@
 """
 Emergency Profile API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
+from datetime import datetime
+import base64
 import uuid
 
 from backend.models.database import (
@@ -12,21 +15,62 @@ from backend.models.database import (
     EmergencyProfile,
     EmergencyContact
 )
-from backend.api.auth import get_current_user
+from backend.api.auth import get_current_reader, get_current_user, get_user_read_db
+from backend.api.public import render_card_pdf
 from backend.models.schemas import (
     EmergencyProfileCreate,
     EmergencyProfileUpdate,
     EmergencyProfileResponse,
     EmergencyContactCreate,
     EmergencyContactResponse,
+    PDFCardRequest,
     QRCodeResponse
 )
 from backend.utils.security import encryptor
-from backend.utils.qr_generator import generate_qr_code
+from backend.utils.qr_generator import get_qr_image, qr_info, qr_version
+from backend.utils.short_link import card_qr_data
+from backend.utils.public_card import card_print_data, get_public_card_async
+from backend.utils.degraded_mode import degraded_cards
+from backend.utils.artifact_store import content_key, qr_cache, wallpaper_cache
+from backend.utils.http_cache import etag_matches
+from backend.utils.render_service import render_service
+from backend.utils.wallpaper import DEVICE_RESOLUTIONS, LAYOUT_VERSION, WALLPAPER_MEDIA_TYPES, render_wallpaper
+from backend.utils.card_cache import card_cache
+from backend.utils.prerender import prerender_pipeline
+from backend.utils.read_routing import card_key, read_router, user_key
 from backend.config import settings
 
 router = APIRouter(prefix="/profile", tags=["Emergency Profile"])
 
+# -----------------------------------------------------
+# Helper: Bump the card version on contact changes
+# (contacts have no updated_at of their own; the public
+#  card's ETag / Last-Modified follow the profile)
+# -----------------------------------------------------
+def touch_profile(user: User):
+    profile = user.emergency_profile
+    if profile:
+        profile.updated_at = datetime.utcnow()
+
+# -----------------------------------------------------
+# Helper: A card changed (after commit) - drop the cached
+# copy, queue its artifacts for the new version and read
+# the card and its owner from the primary for a while
+# -----------------------------------------------------
+def card_changed(public_id: str, user: User):
+    card_cache.invalidate(public_id)
+    degraded_cards.forget(public_id)
+    prerender_pipeline.submit(public_id)
+    read_router.wrote(card_key(public_id), user_key(user.email))
+
+
+def invalidate_public_card(user: User):
+    profile = user.emergency_profile
+    if profile:
+        card_changed(profile.public_id, user)
+    else:
+        read_router.wrote(user_key(user.email))
+
 # =====================================================
 # CREATE EMERGENCY PROFILE
 # =====================================================
@@ -35,14 +79,14 @@ router = APIRouter(prefix="/profile", tags=["Emergency Profile"])
     response_model=EmergencyProfileResponse,
     status_code=status.HTTP_201_CREATED
 )
-def create_emergency_profile(
+async def create_emergency_profile(
     profile_data: EmergencyProfileCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    existing = db.query(EmergencyProfile).filter(
-        EmergencyProfile.user_id == current_user.id
-    ).first()
+    existing = await db.scalar(
+        select(EmergencyProfile).where(EmergencyProfile.user_id == current_user.id)
+    )
 
     if existing:
         raise HTTPException(
@@ -74,21 +118,22 @@ def create_emergency_profile(
     )
 
     db.add(profile)
-    db.commit()
-    db.refresh(profile)
+    await db.commit()
+    await db.refresh(profile)
+    card_changed(profile.public_id, current_user)
     return profile
 
 # =====================================================
 # GET MY PROFILE
 # =====================================================
 @router.get("", response_model=EmergencyProfileResponse)
-def get_my_profile(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_my_profile(
+    current_user: User = Depends(get_current_reader),
+    db: AsyncSession = Depends(get_user_read_db)
 ):
-    profile = db.query(EmergencyProfile).filter(
-        EmergencyProfile.user_id == current_user.id
-    ).first()
+    profile = await db.scalar(
+        select(EmergencyProfile).where(EmergencyProfile.user_id == current_user.id)
+    )
 
     if not profile:
         raise HTTPException(
@@ -102,14 +147,14 @@ def get_my_profile(
 # UPDATE PROFILE
 # =====================================================
 @router.put("", response_model=EmergencyProfileResponse)
-def update_profile(
+async def update_profile(
     data: EmergencyProfileUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    profile = db.query(EmergencyProfile).filter(
-        EmergencyProfile.user_id == current_user.id
-    ).first()
+    profile = await db.scalar(
+        select(EmergencyProfile).where(EmergencyProfile.user_id == current_user.id)
+    )
 
     if not profile:
         raise HTTPException(
@@ -137,21 +182,22 @@ def update_profile(
     for key, value in updates.items():
         setattr(profile, key, value)
 
-    db.commit()
-    db.refresh(profile)
+    await db.commit()
+    await db.refresh(profile)
+    card_changed(profile.public_id, current_user)
     return profile
 
 # =====================================================
 # DELETE PROFILE
 # =====================================================
 @router.delete("", status_code=status.HTTP_204_NO_CONTENT)
-def delete_profile(
+async def delete_profile(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    profile = db.query(EmergencyProfile).filter(
-        EmergencyProfile.user_id == current_user.id
-    ).first()
+    profile = await db.scalar(
+        select(EmergencyProfile).where(EmergencyProfile.user_id == current_user.id)
+    )
 
     if not profile:
         raise HTTPException(
@@ -159,21 +205,36 @@ def delete_profile(
             detail="Emergency profile not found"
         )
 
-    db.delete(profile)
-    db.commit()
+    public_id = profile.public_id
+    await db.delete(profile)
+    await db.commit()
+    card_changed(public_id, current_user)
     return None
 
+# -----------------------------------------------------
+# Helper: Record where the profile's QR artifact lives
+# (updated_at is kept as is - the card itself did not
+#  change, so its ETag / cached copies stay valid)
+# -----------------------------------------------------
+async def record_qr_path(db: AsyncSession, user: User, path: str):
+    await db.execute(
+        update(EmergencyProfile)
+        .where(EmergencyProfile.id == user.emergency_profile.id)
+        .values(qr_code_path=path, updated_at=EmergencyProfile.updated_at)
+    )
+    await db.commit()
+    read_router.wrote(user_key(user.email))
+
 # =====================================================
 # QR CODE GENERATION (🔥 PROD FIXED)
 # =====================================================
 @router.get("/qr-code", response_model=QRCodeResponse)
-def generate_qr(
+async def generate_qr(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    profile = db.query(EmergencyProfile).filter(
-        EmergencyProfile.user_id == current_user.id
-    ).first()
+    # Loaded together with the user by get_current_user
+    profile = current_user.emergency_profile
 
     if not profile:
         raise HTTPException(
@@ -182,16 +243,121 @@ def generate_qr(
         )
 
     # ✅ IMPORTANT: Use Render URL (NOT localhost)
-    public_url = f"{settings.FRONTEND_URL}/emergency/{profile.public_id}"
+    public_id = profile.public_id
+    public_url = f"{settings.FRONTEND_URL}/emergency/{public_id}"
+    entry = await get_public_card_async(public_id, db)
+    qr_url = card_qr_data(entry)
+
+    key, png = await get_qr_image(qr_url)
+    info = qr_info(qr_url)
 
-    qr_base64, _ = generate_qr_code(public_url)
+    if settings.QR_CACHE_DIR:
+        path = qr_cache.location(key)
+        if profile.qr_code_path != path:
+            await record_qr_path(db, current_user, path)
 
     return {
-        "qr_code_base64": qr_base64,
+        "qr_code_base64": base64.b64encode(png).decode("utf-8"),
+        "qr_code_image_url": f"{settings.FRONTEND_URL}/emergency/{public_id}/qr?v={qr_version(qr_url)}",
+        "qr_code_url": qr_url,
+        "qr_version": info["version"],
+        "qr_modules": info["modules"],
         "public_url": public_url,
-        "public_id": profile.public_id
+        "public_id": public_id
+    }
+
+# =====================================================
+# 💳 WALLET CARD PDF (CREDIT / BUSINESS CARD SIZE)
+# =====================================================
+@router.post("/card-pdf", responses={200: {"content": {"application/pdf": {}}}})
+async def download_wallet_card_pdf(
+    card_request: PDFCardRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if card_request.include_photo:
+        raise HTTPException(
+            status_code=400,
+            detail="Profile photos are not supported on cards"
+        )
+
+    profile = current_user.emergency_profile
+
+    if not profile:
+        raise HTTPException(
+            status_code=404,
+            detail="Emergency profile not found"
+        )
+
+    public_id = profile.public_id
+    entry = await get_public_card_async(public_id, db)
+    pdf_bytes = await render_card_pdf(card_print_data(entry), card_qr_data(entry), card_request.card_size)
+
+    return Response(
+        pdf_bytes,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition":
+                f'attachment; filename="emergency_card_{public_id}_{card_request.card_size}.pdf"'
+        }
+    )
+
+# =====================================================
+# 📱 LOCK-SCREEN WALLPAPER (PNG / WEBP)
+# Rendered once per card version, device and format;
+# repeat downloads come from wallpaper_cache
+# =====================================================
+@router.get("/wallpaper/devices")
+async def get_wallpaper_devices():
+    return {
+        device: {"width": width, "height": height}
+        for device, (width, height) in DEVICE_RESOLUTIONS.items()
     }
 
+
+@router.get(
+    "/wallpaper",
+    response_class=Response,
+    responses={200: {"content": {media_type: {} for media_type in WALLPAPER_MEDIA_TYPES.values()}}}
+)
+async def get_wallpaper(
+    request: Request,
+    device: str = Query("iphone-15", pattern=f"^({'|'.join(DEVICE_RESOLUTIONS)})$"),
+    format: str = Query("png", pattern="^(png|webp)$"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    profile = current_user.emergency_profile
+
+    if not profile:
+        raise HTTPException(
+            status_code=404,
+            detail="Emergency profile not found"
+        )
+
+    # The public card (visibility flags applied): the lock screen is
+    # readable by anyone holding the phone
+    entry = await get_public_card_async(profile.public_id, db)
+    qr_data = card_qr_data(entry)
+
+    key = content_key("wallpaper", LAYOUT_VERSION, device, format, entry["etag"], qr_data)
+    headers = {
+        "ETag": f'"{key[:32]}"',
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f'inline; filename="emergency-wallpaper-{device}.{format}"'
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    image = wallpaper_cache.get(key)
+    if image is None:
+        image = await render_service.run(render_wallpaper, entry["card"], qr_data, device, format)
+        wallpaper_cache.put(key, image)
+
+    return Response(image, media_type=WALLPAPER_MEDIA_TYPES[format], headers=headers)
+
 # =====================================================
 # ADD EMERGENCY CONTACT
 # =====================================================
@@ -200,15 +366,17 @@ def generate_qr(
     response_model=EmergencyContactResponse,
     status_code=status.HTTP_201_CREATED
 )
-def add_contact(
+async def add_contact(
     contact: EmergencyContactCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    exists = db.query(EmergencyContact).filter(
-        EmergencyContact.user_id == current_user.id,
-        EmergencyContact.phone == contact.phone
-    ).first()
+    exists = await db.scalar(
+        select(EmergencyContact).where(
+            EmergencyContact.user_id == current_user.id,
+            EmergencyContact.phone == contact.phone
+        )
+    )
 
     if exists:
         raise HTTPException(
@@ -222,8 +390,10 @@ def add_contact(
     )
 
     db.add(new_contact)
-    db.commit()
-    db.refresh(new_contact)
+    touch_profile(current_user)
+    await db.commit()
+    await db.refresh(new_contact)
+    invalidate_public_card(current_user)
     return new_contact
 
 # =====================================================
@@ -233,16 +403,16 @@ def add_contact(
     "/contacts",
     response_model=List[EmergencyContactResponse]
 )
-def get_contacts(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_contacts(
+    current_user: User = Depends(get_current_reader),
+    db: AsyncSession = Depends(get_user_read_db)
 ):
-    return (
-        db.query(EmergencyContact)
-        .filter(EmergencyContact.user_id == current_user.id)
+    contacts = await db.scalars(
+        select(EmergencyContact)
+        .where(EmergencyContact.user_id == current_user.id)
         .order_by(EmergencyContact.priority)
-        .all()
     )
+    return contacts.all()
 
 # =====================================================
 # DELETE EMERGENCY CONTACT
@@ -251,15 +421,17 @@ def get_contacts(
     "/contacts/{contact_id}",
     status_code=status.HTTP_204_NO_CONTENT
 )
-def delete_contact(
+async def delete_contact(
     contact_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    contact = db.query(EmergencyContact).filter(
-        EmergencyContact.id == contact_id,
-        EmergencyContact.user_id == current_user.id
-    ).first()
+    contact = await db.scalar(
+        select(EmergencyContact).where(
+            EmergencyContact.id == contact_id,
+            EmergencyContact.user_id == current_user.id
+        )
+    )
 
     if not contact:
         raise HTTPException(
@@ -267,6 +439,8 @@ def delete_contact(
             detail="Emergency contact not found"
         )
 
-    db.delete(contact)
-    db.commit()
+    await db.delete(contact)
+    touch_profile(current_user)
+    await db.commit()
+    invalidate_public_card(current_user)
     return None
@@ -2,325 +2,325 @@
 """
 Public Emergency Card API - No authentication required
 """
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse
-from sqlalchemy.orm import Session
-
-from backend.models.database import (
-    get_db,
-    EmergencyProfile,
-    EmergencyContact,
-    AccessLog
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import HTMLResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models.schemas import (
+    PublicEmergencyCard,
+    OfflineCardKey,
+    OfflineCardVerification,
+    OfflineCardVerifyRequest
 )
-from backend.models.schemas import PublicEmergencyCard
-from backend.utils.security import encryptor
-from backend.utils.pdf_generator import generate_full_page_card
-from backend.config import settings
+from backend.utils.public_card import card_print_data
+from backend.utils.degraded_mode import degraded_cards
+from backend.utils.access_log_writer import access_log_writer
+from backend.utils.card_template import negotiate_coding
+from backend.utils.http_cache import (
+    cache_headers,
+    etag_matches,
+    is_not_modified,
+    negotiate_media_type,
+    not_modified_response
+)
+from backend.utils import cbor
+from backend.utils.pdf_generator import generate_emergency_card_pdf, generate_full_page_card
+from backend.utils.artifact_store import content_key, pdf_cache
+from backend.utils.render_service import render_service
+from backend.utils.qr_generator import QR_MEDIA_TYPES, get_qr_image, qr_version
+from backend.utils.short_link import card_qr_data, decode_short_id
+from backend.utils.offline_card import ALGORITHM_NAMES, b64url_encode, extract_payload, verify_payload
+from backend.utils.security import card_signer
+from backend.utils.card_artifacts import QR_SIZE
+from backend.utils.prerender import prerender_pipeline
+from backend.utils.read_routing import card_key, client_written_at, read_router
 
 router = APIRouter(tags=["Public Emergency Access"])
 
+# Representations of a card, in order of preference for */*
+HTML, JSON, CBOR = "text/html", "application/json", cbor.MEDIA_TYPE
+CARD_MEDIA_TYPES = [HTML, JSON, CBOR]
+
+NOT_FOUND_HTML = "<h1>Emergency Card Not Found</h1>"
+
+# QR images never change for a given ?v= (see qr_version)
+QR_IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+QR_CACHE_CONTROL = "public, max-age=86400"
+
+# -----------------------------------------------------
+# Helper: Read session for a card - the read replica,
+# unless it lags or the card was just edited
+# -----------------------------------------------------
+async def get_card_read_db(public_id: str, request: Request):
+    async with read_router.session(card_key(public_id), written_at=client_written_at(request)) as db:
+        yield db
+
+
+async def get_short_link_read_db(code: str, request: Request):
+    public_id = decode_short_id(code)
+    keys = [card_key(public_id)] if public_id else []
+    async with read_router.session(*keys, written_at=client_written_at(request)) as db:
+        yield db
+
 # -----------------------------------------------------
 # Helper: Log access
 # -----------------------------------------------------
-def log_access(public_id: str, request: Request, db: Session):
-    try:
-        profile = db.query(EmergencyProfile).filter(
-            EmergencyProfile.public_id == public_id
-        ).first()
-
-        if profile:
-            access_log = AccessLog(
-                user_id=profile.user_id,
-                ip_address=request.client.host if request.client else "unknown",
-                user_agent=request.headers.get("user-agent", "unknown")
-            )
-            db.add(access_log)
-            db.commit()
-    except Exception as e:
-        print(f"Access log error: {e}")
+def log_access(entry: dict, request: Request):
+    access_log_writer.record(
+        user_id=entry["user_id"],
+        ip_address=request.client.host if request.client else "unknown",
+        user_agent=request.headers.get("user-agent", "unknown")
+    )
+
+# -----------------------------------------------------
+# Helpers: One response builder per representation
+# (serialized bodies are kept on the cached card entry,
+#  so each is built once per card version)
+# -----------------------------------------------------
+def card_html_response(entry: dict, request: Request, vary: str) -> Response:
+    coding = negotiate_coding(request.headers.get("accept-encoding", ""))
+
+    if is_not_modified(request, entry):
+        return not_modified_response(entry, coding, vary)
+
+    body = prerender_pipeline.rendered_card(entry).for_coding(coding)
+    headers = cache_headers(entry, coding, vary)
+    if coding:
+        headers["Content-Encoding"] = coding
+
+    return HTMLResponse(content=body, headers=headers)
+
+
+def card_json_response(entry: dict, request: Request, vary: Optional[str] = None) -> Response:
+    if is_not_modified(request, entry):
+        return not_modified_response(entry, "json", vary)
+
+    body = entry.get("json")
+    if body is None:
+        body = entry["json"] = json.dumps(entry["card"], separators=(",", ":")).encode()
+
+    return Response(body, media_type=JSON, headers=cache_headers(entry, "json", vary))
+
+
+def card_cbor_response(entry: dict, request: Request, vary: Optional[str] = None) -> Response:
+    if is_not_modified(request, entry):
+        return not_modified_response(entry, "cbor", vary)
+
+    body = entry.get("cbor")
+    if body is None:
+        body = entry["cbor"] = cbor.dumps(entry["card"])
+
+    return Response(body, media_type=CBOR, headers=cache_headers(entry, "cbor", vary))
+
+# -----------------------------------------------------
+# Helper: Rendered PDF, cached by content
+# (unchanged card data + URL → same key → no re-render)
+# Full letter page by default, or a wallet card of
+# card_size ("credit" / "business")
+# -----------------------------------------------------
+async def render_card_pdf(user_data: dict, qr_url: str, card_size: Optional[str] = None) -> bytes:
+    layout = f"{card_size}_card" if card_size else "full_page_card"
+    key = content_key(layout, user_data, qr_url)
+    pdf_bytes = pdf_cache.get(key)
+    if pdf_bytes is None:
+        if card_size:
+            pdf_bytes = await render_service.run(generate_emergency_card_pdf, user_data, qr_url, card_size)
+        else:
+            pdf_bytes = await render_service.run(generate_full_page_card, user_data, qr_url)
+        pdf_cache.put(key, pdf_bytes)
+    return pdf_bytes
 
 # =====================================================
 # 🔁 PUBLIC ENTRY (QR ALWAYS HITS THIS)
+# Serves the card directly - no redirect hop - as HTML,
+# JSON or CBOR depending on the Accept header
 # =====================================================
-@router.get("/emergency/{public_id}")
-def redirect_to_emergency_view(public_id: str):
-    return RedirectResponse(
-        url=f"/emergency/{public_id}/view",
-        status_code=302
-    )
+@router.get(
+    "/emergency/{public_id}",
+    response_class=HTMLResponse,
+    responses={200: {"content": {JSON: {}, CBOR: {}}}}
+)
+async def get_emergency_card(
+    public_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_card_read_db)
+):
+    media_type = negotiate_media_type(request.headers.get("accept"), CARD_MEDIA_TYPES)
+    entry = await degraded_cards.get_card_async(public_id, db, lambda e: is_not_modified(request, e))
+
+    if not entry:
+        if media_type == HTML:
+            return HTMLResponse(NOT_FOUND_HTML, status_code=404)
+        raise HTTPException(
+            status_code=404,
+            detail="Emergency card not found"
+        )
+
+    log_access(entry, request)
+
+    if media_type == JSON:
+        return card_json_response(entry, request, vary="Accept")
+    if media_type == CBOR:
+        return card_cbor_response(entry, request, vary="Accept")
+    return card_html_response(entry, request, vary="Accept, Accept-Encoding")
+
+# =====================================================
+# 🔗 SHORT QR LINK (QR_SHORT_LINKS)
+# /E/{base-36 id} - same card, no redirect hop
+# =====================================================
+@router.get("/E/{code}", response_class=HTMLResponse, include_in_schema=False)
+async def get_emergency_card_short(
+    code: str,
+    request: Request,
+    db: AsyncSession = Depends(get_short_link_read_db)
+):
+    public_id = decode_short_id(code)
+    if public_id is None:
+        return HTMLResponse(NOT_FOUND_HTML, status_code=404)
+
+    return await get_emergency_card(public_id, request, db)
 
 # =====================================================
 # 🧠 JSON API (PROGRAMMATIC USE)
 # =====================================================
 @router.get("/api/emergency/{public_id}", response_model=PublicEmergencyCard)
-def get_public_emergency_card_json(
+async def get_public_emergency_card_json(
     public_id: str,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_card_read_db)
 ):
-    profile = db.query(EmergencyProfile).filter(
-        EmergencyProfile.public_id == public_id
-    ).first()
+    entry = await degraded_cards.get_card_async(public_id, db, lambda e: is_not_modified(request, e))
 
-    if not profile:
+    if not entry:
         raise HTTPException(
             status_code=404,
             detail="Emergency card not found"
         )
 
-    log_access(public_id, request, db)
+    log_access(entry, request)
 
-    contacts = db.query(EmergencyContact).filter(
-        EmergencyContact.user_id == profile.user_id
-    ).order_by(EmergencyContact.priority).all()
-
-    return {
-        "full_name": profile.full_name if profile.show_name else None,
-        "age": profile.age if profile.show_age else None,
-        "blood_group": profile.blood_group if profile.show_blood_group else None,
-        "allergies": encryptor.decrypt_json(profile.allergies)
-        if profile.show_allergies else None,
-        "medical_conditions": encryptor.decrypt_json(profile.medical_conditions)
-        if profile.show_conditions else None,
-        "medications": encryptor.decrypt_json(profile.medications)
-        if profile.show_medications else None,
-        "organ_donor": profile.organ_donor,
-        "emergency_contacts": [
-            {
-                "name": c.name,
-                "relation": c.relation,
-                "phone": c.phone,
-                "priority": c.priority
-            } for c in contacts
-        ]
-    }
+    return card_json_response(entry, request)
 
 # =====================================================
 # 🖥️ UI VIEW (MOBILE + FIRST RESPONDER FRIENDLY)
+# (alias of the HTML representation above)
 # =====================================================
 @router.get("/emergency/{public_id}/view", response_class=HTMLResponse)
-def view_emergency_card_html(
+async def view_emergency_card_html(
     public_id: str,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_card_read_db)
 ):
-    profile = db.query(EmergencyProfile).filter(
-        EmergencyProfile.public_id == public_id
-    ).first()
-
-    if not profile:
-        return HTMLResponse(
-            "<h1>Emergency Card Not Found</h1>",
-            status_code=404
-        )
+    entry = await degraded_cards.get_card_async(public_id, db, lambda e: is_not_modified(request, e))
 
-    log_access(public_id, request, db)
-
-    contacts = db.query(EmergencyContact).filter(
-        EmergencyContact.user_id == profile.user_id
-    ).order_by(EmergencyContact.priority).all()
-
-    allergies = encryptor.decrypt_json(profile.allergies) if profile.show_allergies else []
-    conditions = encryptor.decrypt_json(profile.medical_conditions) if profile.show_conditions else []
-    medications = encryptor.decrypt_json(profile.medications) if profile.show_medications else []
-
-    html_content = f"""
-<!DOCTYPE html>
-<html>
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>Emergency Medical Card</title>
-
-<style>
-body {{
-    font-family: 'Segoe UI', Arial, sans-serif;
-    background: linear-gradient(135deg, #667eea, #764ba2);
-    min-height: 100vh;
-    display: flex;
-    align-items: center;
-    justify-content: center;
-    padding: 20px;
-}}
-
-.card {{
-    background: #fff;
-    width: 100%;
-    max-width: 420px;
-    border-radius: 22px;
-    box-shadow: 0 25px 60px rgba(0,0,0,0.35);
-    overflow: hidden;
-}}
-
-.header {{
-    background: linear-gradient(135deg, #ff416c, #ff4b2b);
-    color: white;
-    text-align: center;
-    padding: 25px;
-}}
-
-.header h1 {{
-    font-size: 22px;
-}}
-
-.content {{
-    padding: 22px;
-}}
-
-.section {{
-    margin-bottom: 18px;
-}}
-
-.section-title {{
-    font-weight: 700;
-    margin-bottom: 8px;
-}}
-
-.info {{
-    background: #f7f9fc;
-    padding: 10px;
-    border-radius: 8px;
-    margin-bottom: 6px;
-}}
-
-.blood {{
-    background: #e63946;
-    color: white;
-    font-size: 26px;
-    font-weight: bold;
-    padding: 8px 22px;
-    border-radius: 30px;
-    display: inline-block;
-}}
-
-.contact {{
-    background: #e8f5e9;
-    padding: 12px;
-    border-radius: 10px;
-    border-left: 5px solid #28a745;
-    margin-bottom: 10px;
-}}
-
-.call {{
-    display: block;
-    margin-top: 8px;
-    background: #28a745;
-    color: white;
-    padding: 10px;
-    text-align: center;
-    border-radius: 8px;
-    text-decoration: none;
-    font-weight: bold;
-}}
-
-.footer {{
-    text-align: center;
-    font-size: 12px;
-    color: #777;
-    padding: 12px;
-    background: #fafafa;
-}}
-</style>
-</head>
-
-<body>
-<div class="card">
-    <div class="header">
-        <h1>EMERGENCY MEDICAL INFO</h1>
-        <p>For first responders</p>
-    </div>
-
-    <div class="content">
-
-        <div class="section">
-            <div class="section-title">Personal Details</div>
-            <div class="info">Name: {profile.full_name}</div>
-            <div class="info">Age: {profile.age}</div>
-        </div>
-
-        <div class="section">
-            <div class="section-title">Blood Group</div>
-            <div style="text-align:center;">
-                <span class="blood">{profile.blood_group}</span>
-            </div>
-        </div>
-
-        <div class="section">
-            <div class="section-title">Allergies</div>
-            <div>{", ".join(allergies) if allergies else "None"}</div>
-        </div>
-
-        <div class="section">
-            <div class="section-title">Medical Conditions</div>
-            <div>{", ".join(conditions) if conditions else "None"}</div>
-        </div>
-
-        <div class="section">
-            <div class="section-title">Medications</div>
-            <div>{", ".join(medications) if medications else "None"}</div>
-        </div>
-
-        <div class="section">
-            <div class="section-title">Emergency Contacts</div>
-            {"".join([f"<div class='contact'><b>{c.name}</b> ({c.relation})<a class='call' href='tel:{c.phone}'>Call {c.phone}</a></div>" for c in contacts])}
-        </div>
-
-    </div>
-
-    <div class="footer">
-        Emergency Info Card • Powered by QR Access
-    </div>
-</div>
-</body>
-</html>
-"""
-    return HTMLResponse(content=html_content)
+    if not entry:
+        return HTMLResponse(NOT_FOUND_HTML, status_code=404)
+
+    log_access(entry, request)
+
+    return card_html_response(entry, request, vary="Accept-Encoding")
 
 # =====================================================
 # 📄 PDF DOWNLOAD (PROD URL FIX)
 # =====================================================
 @router.get("/emergency/{public_id}/pdf")
-def download_emergency_card_pdf(
+async def download_emergency_card_pdf(
     public_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_card_read_db)
 ):
-    profile = db.query(EmergencyProfile).filter(
-        EmergencyProfile.public_id == public_id
-    ).first()
+    entry = await degraded_cards.get_card_async(
+        public_id, db, lambda e: is_not_modified(request, e)
+    )
 
-    if not profile:
+    if not entry:
         raise HTTPException(
             status_code=404,
             detail="Emergency card not found"
         )
 
-    primary_contact = db.query(EmergencyContact).filter(
-        EmergencyContact.user_id == profile.user_id,
-        EmergencyContact.priority == 1
-    ).first()
-
-    user_data = {
-        "name": profile.full_name,
-        "blood_group": profile.blood_group,
-        "age": profile.age,
-        "emergency_contact": {
-            "name": primary_contact.name if primary_contact else "N/A",
-            "phone": primary_contact.phone if primary_contact else "N/A"
-        }
+    if is_not_modified(request, entry):
+        return not_modified_response(entry)
+
+    # Pre-rendered when the card last changed; render only on a miss
+    pdf_bytes = prerender_pipeline.get(entry, "pdf")
+    if pdf_bytes is None:
+        user_data = card_print_data(entry)
+
+        # ✅ IMPORTANT: Render URL (NOT localhost)
+        qr_url = card_qr_data(entry)
+
+        pdf_bytes = await render_card_pdf(user_data, qr_url)
+
+    headers = cache_headers(entry)
+    headers["Content-Disposition"] = f'attachment; filename="emergency_card_{public_id}.pdf"'
+
+    return Response(pdf_bytes, media_type="application/pdf", headers=headers)
+
+# =====================================================
+# 🔳 QR IMAGE (PNG / SVG, NO BASE64)
+# =====================================================
+@router.get(
+    "/emergency/{public_id}/qr",
+    response_class=Response,
+    responses={200: {"content": {media_type: {} for media_type in QR_MEDIA_TYPES.values()}}}
+)
+async def get_emergency_qr_image(
+    public_id: str,
+    request: Request,
+    format: str = Query("png", pattern="^(png|svg)$"),
+    size: int = Query(10, ge=1, le=40, description="Pixels per module"),
+    v: Optional[str] = Query(None, description="Version from qr_code_image_url"),
+    db: AsyncSession = Depends(get_card_read_db)
+):
+    entry = await degraded_cards.get_card_async(public_id, db)
+
+    if not entry:
+        raise HTTPException(
+            status_code=404,
+            detail="Emergency card not found"
+        )
+
+    qr_url = card_qr_data(entry)
+    version = qr_version(qr_url)
+    headers = {
+        "ETag": f'"{version}-{format}-{size}"',
+        "Cache-Control": QR_IMMUTABLE_CACHE_CONTROL if v == version else QR_CACHE_CONTROL,
     }
 
-    # ✅ IMPORTANT: Render URL (NOT localhost)
-    qr_url = f"{settings.FRONTEND_URL}/emergency/{public_id}"
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
 
-    pdf_bytes = generate_full_page_card(user_data, qr_url)
+    image = prerender_pipeline.get(entry, f"qr.{format}") if size == QR_SIZE else None
+    if image is None:
+        _, image = await get_qr_image(qr_url, size, format)
 
-    import tempfile
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        tmp.write(pdf_bytes)
-        tmp_path = tmp.name
+    return Response(image, media_type=QR_MEDIA_TYPES[format], headers=headers)
 
-    return FileResponse(
-        tmp_path,
-        filename=f"emergency_card_{public_id}.pdf",
-        media_type="application/pdf"
-    )
+# =====================================================
+# 📴 OFFLINE QR PAYLOAD (OFFLINE_QR)
+# Responder tools cache the public key once, then read
+# and check cards with no server round trip
+# =====================================================
+@router.get("/api/offline-card/key", response_model=OfflineCardKey)
+def get_offline_card_key():
+    return {
+        "algorithm": ALGORITHM_NAMES[card_signer.algorithm],
+        "key_id": card_signer.key_id.hex(),
+        "public_key": b64url_encode(card_signer.public_key) if card_signer.public_key else None
+    }
+
+
+@router.post("/api/offline-card/verify", response_model=OfflineCardVerification)
+def verify_offline_card(verification: OfflineCardVerifyRequest):
+    try:
+        return verify_payload(extract_payload(verification.payload), signer=card_signer)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid offline card payload: {e}"
+        )
@@ -0,0 +1,151 @@
+"""
+Command-line tools
+
+    python -m backend.cli print-sheet IDS_FILE -o cards.pdf [--workers N] [--card-size business]
+    python -m backend.cli prerender [IDS_FILE]
+    python -m backend.cli export-static OUT_DIR [--workers N] [--full]
+
+IDS_FILE holds one public_id per line ("-" reads stdin); prerender
+without one backfills every card.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List
+
+from backend.config import settings
+from backend.models.database import SessionLocal, EmergencyProfile
+from backend.utils.public_card import card_print_data, load_public_cards, missing_public_ids
+from backend.utils.short_link import card_qr_data
+from backend.utils.pdf_generator import CARD_SIZES
+from backend.utils.print_sheet import CARDS_PER_QUERY, write_print_sheet
+from backend.utils.prerender import prerender_pipeline
+from backend.utils.static_export import export_static_site
+
+
+def read_public_ids(path: str) -> List[str]:
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def sheet_cards(public_ids: List[str], db) -> Iterator[Dict]:
+    for start in range(0, len(public_ids), CARDS_PER_QUERY):
+        for entry in load_public_cards(public_ids[start:start + CARDS_PER_QUERY], db):
+            yield {
+                "user_data": card_print_data(entry),
+                "qr_url": card_qr_data(entry)
+            }
+
+
+def print_sheet_command(args) -> int:
+    public_ids = read_public_ids(args.ids_file)
+    if not public_ids:
+        print("❌ No public_ids given", file=sys.stderr)
+        return 1
+
+    db = SessionLocal()
+    try:
+        missing = missing_public_ids(public_ids, db)
+        if missing and not args.skip_missing:
+            print(f"❌ Unknown public_ids ({len(missing)}): {', '.join(sorted(missing)[:20])}",
+                  file=sys.stderr)
+            return 1
+
+        executor = ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=multiprocessing.get_context(settings.RENDER_START_METHOD)
+        )
+        with executor, open(args.out, "wb") as out:
+            pages = write_print_sheet(
+                sheet_cards(public_ids, db), out, executor,
+                window=args.workers * 2, card_size=args.card_size
+            )
+    finally:
+        db.close()
+
+    cards = sum(1 for public_id in public_ids if public_id not in missing)
+    print(f"✅ Wrote {cards} cards on {pages} pages to {args.out}")
+    return 0
+
+
+def prerender_command(args) -> int:
+    if args.ids_file:
+        public_ids = read_public_ids(args.ids_file)
+    else:
+        db = SessionLocal()
+        try:
+            public_ids = [row.public_id for row in db.query(EmergencyProfile.public_id)]
+        finally:
+            db.close()
+
+    results = {}
+    for public_id in public_ids:
+        try:
+            result = prerender_pipeline.render(public_id)
+        except Exception as e:
+            print(f"❌ {public_id}: {e}", file=sys.stderr)
+            result = "failed"
+        results[result] = results.get(result, 0) + 1
+
+    summary = ", ".join(f"{count} {result}" for result, count in sorted(results.items()))
+    print(f"✅ Pre-rendered {len(public_ids)} cards ({summary or 'nothing to do'})")
+    return 1 if "failed" in results else 0
+
+
+def export_static_command(args) -> int:
+    db = SessionLocal()
+    try:
+        executor = ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=multiprocessing.get_context(settings.RENDER_START_METHOD)
+        )
+        with executor:
+            stats = export_static_site(
+                args.out_dir, db, executor,
+                short_links=settings.QR_SHORT_LINKS,
+                full=args.full,
+                window=args.workers * 2
+            )
+    finally:
+        db.close()
+
+    print(f"✅ Exported to {args.out_dir}: {stats['rendered']} rendered, "
+          f"{stats['unchanged']} unchanged, {stats['removed']} removed")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sheet = commands.add_parser("print-sheet", help="Render many cards as a printable PDF")
+    sheet.add_argument("ids_file", help="file with one public_id per line, or - for stdin")
+    sheet.add_argument("-o", "--out", default="emergency_cards.pdf")
+    sheet.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    sheet.add_argument("--card-size", choices=sorted(CARD_SIZES), default="credit")
+    sheet.add_argument("--skip-missing", action="store_true",
+                       help="leave out unknown public_ids instead of failing")
+    sheet.set_defaults(handler=print_sheet_command)
+
+    prerender = commands.add_parser("prerender", help="Render stored card artifacts (after deploys)")
+    prerender.add_argument("ids_file", nargs="?", help="file with one public_id per line (default: all cards)")
+    prerender.set_defaults(handler=prerender_command)
+
+    export = commands.add_parser("export-static", help="Export every public card as a static site")
+    export.add_argument("out_dir")
+    export.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    export.add_argument("--full", action="store_true", help="re-render every card, not just changed ones")
+    export.set_defaults(handler=export_static_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
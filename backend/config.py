@@ -19,6 +19,47 @@ class Settings(BaseSettings):
     # =====================================================
     DATABASE_URL: str
 
+    # Routers talk to the database through asyncpg / aiosqlite; False
+    # runs the sync driver (psycopg2 / sqlite3) in the threadpool instead
+    DB_ASYNC: bool = True
+
+    # Connection pool, per engine and worker process (both engines exist
+    # when DB_ASYNC is on: async for requests, sync for background jobs)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0      # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = -1          # seconds before a connection is replaced; -1 = never
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WARMUP: bool = True        # open DB_POOL_SIZE connections at startup
+
+    # PostgreSQL only; 0 = no limit
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+
+    # Optional read replica for public card GETs and the owner's profile /
+    # contacts reads. Reads go to the primary while the replica lags more
+    # than DB_REPLICA_MAX_LAG_SECONDS (checked every DB_REPLICA_CHECK_SECONDS)
+    # and for DB_READ_YOUR_WRITES_SECONDS after a card / user is written
+    DATABASE_READ_URL: Optional[str] = None
+    DB_REPLICA_MAX_LAG_SECONDS: float = 1.0
+    DB_REPLICA_CHECK_SECONDS: float = 2.0
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    # Run `alembic upgrade head` when a worker starts; turn off to migrate
+    # from a release step instead (the schema is then only checked)
+    DB_MIGRATE_ON_STARTUP: bool = True
+
+    # Behind PgBouncer in transaction mode: no startup options or named
+    # prepared statements (statement timeout set per transaction instead)
+    DB_PGBOUNCER: bool = False
+
+    # SQLite only: pragmas for every connection, and write transactions
+    # queued in order per worker instead of retrying on "database is locked"
+    SQLITE_JOURNAL_MODE: str = "WAL"          # readers don't block the writer
+    SQLITE_SYNCHRONOUS: str = "NORMAL"        # fsync at checkpoints, not every commit
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000        # wait for another worker's write lock
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # bytes of the file read through mmap; 0 = off
+    SQLITE_WRITE_QUEUE: bool = True
+
     # =====================================================
     # SECURITY
     # =====================================================
@@ -33,6 +74,111 @@ class Settings(BaseSettings):
     # =====================================================
     FRONTEND_URL: str = "https://emergency-card.onrender.com"
 
+    # Print {HOST}/E/{BASE36 ID} in QR codes instead of the full card URL
+    # (alphanumeric QR mode → smaller QR version); the base URL should
+    # be scheme + host only and defaults to FRONTEND_URL
+    QR_SHORT_LINKS: bool = False
+    QR_SHORT_BASE_URL: Optional[str] = None
+
+    # Also carry the card's critical fields, compressed and signed, in
+    # the QR code's URL fragment for reading without signal
+    # (signature: "ed25519" or "hmac"; key derived from SECRET_KEY
+    #  unless OFFLINE_QR_SIGNING_KEY is set)
+    OFFLINE_QR: bool = False
+    OFFLINE_QR_SIGNATURE: str = "ed25519"
+    OFFLINE_QR_SIGNING_KEY: Optional[str] = None
+
+    # =====================================================
+    # PUBLIC CARD CACHE
+    # (per worker process; 0 entries disables the cache)
+    # =====================================================
+    CARD_CACHE_MAX_ENTRIES: int = 1024
+    CARD_CACHE_TTL_SECONDS: int = 300
+
+    # Cache-Control sent with public cards (browsers / CDN revalidate via ETag)
+    PUBLIC_CARD_CACHE_CONTROL: str = (
+        "public, max-age=60, stale-while-revalidate=300, stale-if-error=86400"
+    )
+
+    # Store gzip (and brotli, if installed) bodies next to rendered HTML
+    HTML_PRECOMPRESS: bool = True
+
+    # =====================================================
+    # DEGRADED MODE
+    # (public cards fall back to the last copy served while the
+    #  database fails or is slow; copies in memory unless a
+    #  directory is given)
+    # =====================================================
+    DEGRADED_MODE_ENABLED: bool = True
+    LAST_KNOWN_GOOD_MAX_BYTES: int = 64 * 1024 * 1024
+    LAST_KNOWN_GOOD_DIR: Optional[str] = None          # share it between workers
+    LAST_KNOWN_GOOD_MAX_AGE_SECONDS: float = 86400.0   # never serve older copies
+    DB_BREAKER_FAILURES: int = 5
+    DB_BREAKER_RESET_SECONDS: float = 15.0
+    DB_SLOW_LOOKUP_SECONDS: float = 2.0
+
+    # =====================================================
+    # RENDERED PDF CACHE
+    # (in memory unless a directory is given)
+    # =====================================================
+    PDF_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    PDF_CACHE_DIR: Optional[str] = None
+
+    # =====================================================
+    # QR IMAGE CACHE
+    # (memory LRU in front of a content-addressed directory;
+    #  empty QR_CACHE_DIR keeps QR images in memory only;
+    #  relative *_DIR paths are under the app directory)
+    # =====================================================
+    QR_CACHE_MEMORY_BYTES: int = 8 * 1024 * 1024
+    QR_CACHE_DIR: Optional[str] = "artifacts/qr"
+    QR_CACHE_DISK_BYTES: int = 256 * 1024 * 1024
+
+    # =====================================================
+    # LOCK-SCREEN WALLPAPER CACHE
+    # (one image per profile version, device and format;
+    #  in memory unless a directory is given)
+    # =====================================================
+    WALLPAPER_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    WALLPAPER_CACHE_DIR: Optional[str] = None
+
+    # =====================================================
+    # PRE-RENDERED CARD ARTIFACTS
+    # (HTML / QR / PDF rendered in the background when a card
+    #  changes, stored per card version; empty dir = memory)
+    # =====================================================
+    PRERENDER_ENABLED: bool = True
+    PRERENDER_DIR: Optional[str] = "artifacts/cards"
+    PRERENDER_MAX_BYTES: int = 512 * 1024 * 1024
+    PRERENDER_QUEUE_SIZE: int = 10000
+
+    # =====================================================
+    # RENDER SERVICE
+    # (QR / PDF rendering in a process pool; 0 workers = threads)
+    # =====================================================
+    RENDER_WORKERS: int = 2
+    RENDER_MAX_PENDING: int = 32
+    RENDER_TIMEOUT_SECONDS: float = 20.0
+    RENDER_START_METHOD: str = "spawn"
+
+    # =====================================================
+    # BULK PRINT SHEETS
+    # (pages rendered in parallel, at most WINDOW in flight)
+    # =====================================================
+    PRINT_SHEET_MAX_CARDS: int = 5000
+    PRINT_SHEET_WINDOW: int = 8
+    # Cards one user may print per QUOTA_SECONDS, across all workers (0 = no quota)
+    PRINT_SHEET_QUOTA_CARDS: int = 20000
+    PRINT_SHEET_QUOTA_SECONDS: float = 86400.0
+
+    # =====================================================
+    # ACCESS LOG WRITER
+    # (scans are queued and bulk-inserted in the background)
+    # =====================================================
+    ACCESS_LOG_QUEUE_SIZE: int = 10000
+    ACCESS_LOG_BATCH_SIZE: int = 200
+    ACCESS_LOG_FLUSH_SECONDS: float = 2.0
+
     # =====================================================
     # OPTIONAL: EMAIL
     # =====================================================
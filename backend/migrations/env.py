@@ -0,0 +1,60 @@
+"""
+Alembic environment: migrates the database in DATABASE_URL, or the
+connection handed over by backend.models.migrations (app startup)
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from backend.models.database import Base, engine
+
+config = context.config
+
+# The app keeps its own logging setup when it runs migrations at startup
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def _configure(**kwargs) -> None:
+    context.configure(
+        target_metadata=target_metadata,
+        # SQLite can't ALTER most things in place - copy-and-move instead
+        render_as_batch=engine.url.get_backend_name() == "sqlite",
+        compare_type=True,
+        # Each revision commits on its own (0002 builds indexes outside a transaction)
+        transaction_per_migration=True,
+        **kwargs
+    )
+
+
+def run_migrations_offline() -> None:
+    """`alembic upgrade head --sql`: emit the SQL instead of running it"""
+    _configure(
+        url=engine.url.render_as_string(hide_password=False),
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"}
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    with engine.connect() as connection:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
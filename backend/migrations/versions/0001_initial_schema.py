@@ -0,0 +1,100 @@
+"""initial schema
+
+The tables as Base.metadata.create_all() used to build them at startup.
+Databases created that way are stamped with this revision on their
+first migration (see backend.models.migrations).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 03:51:50.846317
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('username', sa.String(), nullable=False),
+        sa.Column('password_hash', sa.String(), nullable=False),
+        sa.Column('full_name', sa.String(), nullable=True),
+        sa.Column('phone', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'access_logs',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('accessed_at', sa.DateTime(), nullable=True),
+        sa.Column('ip_address', sa.String(), nullable=True),
+        sa.Column('user_agent', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table(
+        'emergency_contacts',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('relation', sa.String(), nullable=False),
+        sa.Column('phone', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('priority', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table(
+        'emergency_profiles',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('public_id', sa.String(), nullable=False),
+        sa.Column('full_name', sa.String(), nullable=True),
+        sa.Column('age', sa.Integer(), nullable=True),
+        sa.Column('blood_group', sa.String(length=10), nullable=True),
+        sa.Column('allergies', sa.Text(), nullable=True),
+        sa.Column('medical_conditions', sa.Text(), nullable=True),
+        sa.Column('medications', sa.Text(), nullable=True),
+        sa.Column('doctor_name', sa.String(), nullable=True),
+        sa.Column('doctor_phone', sa.String(), nullable=True),
+        sa.Column('organ_donor', sa.Boolean(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('show_name', sa.Boolean(), nullable=True),
+        sa.Column('show_age', sa.Boolean(), nullable=True),
+        sa.Column('show_blood_group', sa.Boolean(), nullable=True),
+        sa.Column('show_allergies', sa.Boolean(), nullable=True),
+        sa.Column('show_conditions', sa.Boolean(), nullable=True),
+        sa.Column('show_medications', sa.Boolean(), nullable=True),
+        sa.Column('qr_code_path', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id')
+    )
+    op.create_index('ix_emergency_profiles_public_id', 'emergency_profiles', ['public_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_emergency_profiles_public_id', table_name='emergency_profiles')
+    op.drop_table('emergency_profiles')
+    op.drop_table('emergency_contacts')
+    op.drop_table('access_logs')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_table('users')
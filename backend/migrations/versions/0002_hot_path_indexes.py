@@ -0,0 +1,40 @@
+"""hot-path indexes on contacts and access logs
+
+emergency_contacts and access_logs had no index on user_id, so every
+contact list and access-log lookup scanned the whole table. The
+composite indexes match how they are read: a user's contacts ordered by
+priority, a user's access logs ordered by time.
+
+On PostgreSQL the indexes are built CONCURRENTLY, without blocking
+writes to the tables.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 04:02:11.118204
+"""
+from alembic import op
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_emergency_contacts_user_id_priority', 'emergency_contacts', ['user_id', 'priority']),
+    ('ix_access_logs_user_id_accessed_at', 'access_logs', ['user_id', 'accessed_at']),
+)
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            # Databases built by create_all() from newer models already have them
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
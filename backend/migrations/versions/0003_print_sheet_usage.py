@@ -0,0 +1,45 @@
+"""print sheet usage
+
+One row per bulk print sheet: who asked for it, when, and how many
+cards. POST /print/sheets sums a user's rows over the quota window
+(PRINT_SHEET_QUOTA_CARDS / PRINT_SHEET_QUOTA_SECONDS), so the quota
+holds across every worker.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 04:31:27.402118
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Databases built by create_all() from newer models already have it
+    if sa.inspect(op.get_bind()).has_table('print_sheet_usage'):
+        return
+
+    op.create_table(
+        'print_sheet_usage',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('requested_at', sa.DateTime(), nullable=True),
+        sa.Column('cards', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_print_sheet_usage_user_id_requested_at',
+        'print_sheet_usage',
+        ['user_id', 'requested_at']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_print_sheet_usage_user_id_requested_at', table_name='print_sheet_usage')
+    op.drop_table('print_sheet_usage')
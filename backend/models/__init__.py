@@ -1,45 +1,27 @@
 """
 Database connection and session management
-"""
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from backend.config import settings
-from backend.models.database import Base
 
-# Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
-    echo=settings.DEBUG
+The engines, session factories and get_db live in backend.models.database
+(built by backend.models.engine); they are re-exported here.
+"""
+from backend.models.database import (
+    Base,
+    engine,
+    async_engine,
+    SessionLocal,
+    AsyncSessionLocal,
+    get_db,
+    init_db
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-
-def get_db():
-    """
-    Dependency to get database session
-    """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-def init_db():
-    """
-    Initialize database - create all tables
-    """
-    Base.metadata.create_all(bind=engine)
-    print("✅ Database initialized successfully!")
-
 
 def reset_db():
     """
     Reset database - drop and recreate all tables (use with caution!)
     """
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+    from alembic import command
+    from backend.models.migrations import alembic_config, migrate
+
+    command.downgrade(alembic_config(), "base")
+    migrate()
     print("🔄 Database reset successfully!")
@@ -1,9 +1,13 @@
 """
 Database models for Emergency Info Card System
 """
+import asyncio
 import os
 import uuid
+import weakref
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import Optional
 from sqlalchemy import (
     Column,
     String,
@@ -11,10 +15,16 @@ from sqlalchemy import (
     DateTime,
     Text,
     ForeignKey,
-    Integer,
-    create_engine
+    Index,
+    Integer
 )
-from sqlalchemy.orm import relationship, sessionmaker, declarative_base
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import relationship, sessionmaker, declarative_base, Session
+from fastapi.concurrency import run_in_threadpool
+
+from backend.config import settings
+from backend.models.engine import create_async_db_engine, create_db_engine
 
 # =====================================================
 # DATABASE CONFIG
@@ -29,16 +39,14 @@ if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
     print(f"✅ Fixed DATABASE_URL format: postgres:// → postgresql://")
 
+DATABASE_READ_URL = settings.DATABASE_READ_URL
+if DATABASE_READ_URL and DATABASE_READ_URL.startswith("postgres://"):
+    DATABASE_READ_URL = DATABASE_READ_URL.replace("postgres://", "postgresql://", 1)
+
 print(f"🔗 Connecting to database: {DATABASE_URL[:30]}...")
 
 try:
-    engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,
-        pool_size=5,
-        max_overflow=10,
-        echo=False  # Set to True for SQL debugging
-    )
+    engine = create_db_engine(DATABASE_URL)
     print("✅ Database engine created successfully")
 except Exception as e:
     print(f"❌ Failed to create database engine: {e}")
@@ -50,31 +58,153 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# =====================================================
+# ASYNC ENGINE (asyncpg / aiosqlite - used by the routers)
+# =====================================================
+
+async_engine = create_async_db_engine(DATABASE_URL) if settings.DB_ASYNC else None
+
+# Objects stay readable after commit - there is no lazy IO on the event loop
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False
+) if async_engine is not None else None
+
+# =====================================================
+# READ REPLICA (DATABASE_READ_URL - see backend/utils/read_routing.py)
+# =====================================================
+
+read_engine = create_db_engine(DATABASE_READ_URL) if DATABASE_READ_URL else None
+async_read_engine = (
+    create_async_db_engine(DATABASE_READ_URL) if DATABASE_READ_URL and settings.DB_ASYNC else None
+)
+
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine
+) if read_engine is not None else None
+
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine,
+    autoflush=False,
+    expire_on_commit=False
+) if async_read_engine is not None else None
+
+
+class SyncSessionAdapter:
+    """
+    The subset of AsyncSession the routers use, on top of a sync Session
+    whose calls run in the threadpool (DB_ASYNC=False: psycopg2 / sqlite3).
+    Results are buffered, as AsyncSession's are.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    async def execute(self, statement, *args, **kwargs):
+        result = await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+        # ORM results always have rows; a bare UPDATE / DELETE has none to buffer
+        return result.freeze()() if getattr(result, "returns_rows", True) else result
+
+    async def scalar(self, statement, *args, **kwargs):
+        return (await self.execute(statement, *args, **kwargs)).scalar()
+
+    async def scalars(self, statement, *args, **kwargs):
+        return (await self.execute(statement, *args, **kwargs)).scalars()
+
+    async def get(self, entity, ident):
+        return await run_in_threadpool(self.sync_session.get, entity, ident)
+
+    async def delete(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        """fn(session, *args) - like AsyncSession.run_sync"""
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+
+# A sync session keeps its connection between threadpool hops. Without a
+# limit, threads blocked on pool checkout can starve the requests that hold
+# the connections of the threads they need to finish - so requests wait for
+# a slot on the event loop instead, one slot per pooled connection.
+_sync_session_slots = weakref.WeakKeyDictionary()
+
+
+def _sync_slots(bind: Engine) -> asyncio.Semaphore:
+    slots = _sync_session_slots.setdefault(asyncio.get_running_loop(), {})
+    if bind not in slots:
+        connections = settings.DB_POOL_SIZE + max(settings.DB_MAX_OVERFLOW, 0)
+        slots[bind] = asyncio.Semaphore(connections)
+    return slots[bind]
+
 Base = declarative_base()
 
 # =====================================================
 # DB DEPENDENCY (USED IN auth.py, profile.py, public.py)
 # =====================================================
 
-def get_db():
-    db = SessionLocal()
-    try:
+@asynccontextmanager
+async def session_scope(sessions: sessionmaker, async_sessions: Optional[async_sessionmaker]):
+    """
+    Request-scoped session on one database: an AsyncSession, or the sync
+    Session behind SyncSessionAdapter when DB_ASYNC is off
+    """
+    if async_sessions is not None:
+        async with async_sessions() as db:
+            yield db
+    else:
+        async with _sync_slots(sessions.kw["bind"]):
+            db = SyncSessionAdapter(sessions(expire_on_commit=False))
+            try:
+                yield db
+            finally:
+                await db.close()
+
+
+async def get_db():
+    """Session on the primary - every write, and reads that must see them"""
+    async with session_scope(SessionLocal, AsyncSessionLocal) as db:
         yield db
-    finally:
-        db.close()
 
 # =====================================================
 # INIT DB (CALLED IN main.py STARTUP EVENT)
 # =====================================================
 
 def init_db():
-    """Create all database tables"""
+    """Apply pending migrations (DB_MIGRATE_ON_STARTUP) or check there are none"""
+    # Imported here: the migration environment imports this module
+    from backend.models.migrations import current_revision, head_revision, migrate
+
     try:
-        print("🔄 Creating database tables...")
-        Base.metadata.create_all(bind=engine)
-        print("✅ Database tables created successfully!")
+        if settings.DB_MIGRATE_ON_STARTUP:
+            print("🔄 Running database migrations...")
+            before = migrate()
+            print(f"✅ Database schema at revision {head_revision()} (was {before or 'empty'})")
+            return
+
+        with engine.connect() as connection:
+            current = current_revision(connection)
+        if current != head_revision():
+            print(f"⚠️ Database schema at revision {current}, code expects {head_revision()} - run: alembic upgrade head")
     except Exception as e:
-        print(f"❌ Failed to create database tables: {e}")
+        print(f"❌ Failed to migrate database: {e}")
         raise
 
 # =====================================================
@@ -116,7 +246,8 @@ class User(Base):
     emergency_contacts = relationship(
         "EmergencyContact",
         back_populates="user",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        order_by="EmergencyContact.priority"
     )
 
     access_logs = relationship(
@@ -125,6 +256,12 @@ class User(Base):
         cascade="all, delete-orphan"
     )
 
+    print_sheets = relationship(
+        "PrintSheetUsage",
+        back_populates="user",
+        cascade="all, delete-orphan"
+    )
+
 
 class EmergencyProfile(Base):
     __tablename__ = "emergency_profiles"
@@ -176,6 +313,10 @@ class EmergencyProfile(Base):
 
 class EmergencyContact(Base):
     __tablename__ = "emergency_contacts"
+    __table_args__ = (
+        # A user's contacts in priority order (card loads, /profile/contacts)
+        Index("ix_emergency_contacts_user_id_priority", "user_id", "priority"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     user_id = Column(
@@ -200,6 +341,10 @@ class EmergencyContact(Base):
 
 class AccessLog(Base):
     __tablename__ = "access_logs"
+    __table_args__ = (
+        # A user's access history by time (and the account-delete cascade)
+        Index("ix_access_logs_user_id_accessed_at", "user_id", "accessed_at"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     user_id = Column(
@@ -216,3 +361,26 @@ class AccessLog(Base):
         "User",
         back_populates="access_logs"
     )
+
+
+class PrintSheetUsage(Base):
+    __tablename__ = "print_sheet_usage"
+    __table_args__ = (
+        # A user's print sheets in the quota window
+        Index("ix_print_sheet_usage_user_id_requested_at", "user_id", "requested_at"),
+    )
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    user_id = Column(
+        String,
+        ForeignKey("users.id"),
+        nullable=False
+    )
+
+    requested_at = Column(DateTime, default=datetime.utcnow)
+    cards = Column(Integer, nullable=False)
+
+    user = relationship(
+        "User",
+        back_populates="print_sheets"
+    )
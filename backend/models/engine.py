@@ -0,0 +1,229 @@
+"""
+Engine factory and connection pool stats
+
+Both engines (sync, and async when DB_ASYNC is on) are built here from
+the DB_POOL_* / DB_STATEMENT_TIMEOUT_MS / DB_PGBOUNCER settings (SQLite
+engines also get the SQLITE_* pragmas and write queue). Their pools
+count checkouts, the checkouts that found every connection in use,
+how long those waited and how many timed out.
+"""
+import asyncio
+import threading
+import time
+import uuid
+from typing import Any, Dict, Union
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from backend.config import settings
+from backend.models.sqlite_tuning import tune_sqlite, write_queue_stats
+
+
+class _CheckoutStats:
+    """QueuePool mixin: times the checkouts that had to wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        saturated = 0 <= self._max_overflow and self.checkedout() >= self.size() + self._max_overflow
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.timeouts += timed_out
+                if saturated:
+                    self.waits += 1
+                    self.wait_seconds += waited
+                    self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+class InstrumentedQueuePool(_CheckoutStats, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_CheckoutStats, AsyncAdaptedQueuePool):
+    pass
+
+
+# -----------------------------------------------------
+# Helpers
+# -----------------------------------------------------
+
+def async_database_url(url: Union[str, URL]) -> str:
+    """The same database through its asyncio driver"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        # asyncpg spells libpq's sslmode as ssl
+        query = dict(url.query)
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        url = url.set(drivername="postgresql+asyncpg", query=query)
+    elif backend == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url.render_as_string(hide_password=False)
+
+
+def _is_memory_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _engine_options(url: URL, is_async: bool, overrides: Dict[str, Any]) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"echo": False}
+    if not _is_memory_sqlite(url):
+        # An in-memory SQLite database lives in one connection - keep SQLAlchemy's default pool
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING
+        )
+
+    connect_args: Dict[str, Any] = {}
+    if url.get_backend_name() == "postgresql":
+        timeout = settings.DB_STATEMENT_TIMEOUT_MS
+        if settings.DB_PGBOUNCER:
+            # Transaction pooling gives each transaction whichever server
+            # connection is free: no startup options, no named prepared
+            # statements that outlive a transaction
+            if is_async:
+                connect_args.update(
+                    statement_cache_size=0,
+                    prepared_statement_cache_size=0,
+                    prepared_statement_name_func=lambda: f"__asyncpg_{uuid.uuid4()}__"
+                )
+        elif timeout:
+            if is_async:
+                connect_args["server_settings"] = {"statement_timeout": str(timeout)}
+            else:
+                connect_args["options"] = f"-c statement_timeout={timeout}"
+    if connect_args:
+        options["connect_args"] = connect_args
+
+    options.update(overrides)
+    return options
+
+
+def _set_local_statement_timeout(engine: Engine) -> None:
+    """Behind PgBouncer the timeout is set per transaction instead of per connection"""
+    timeout = settings.DB_STATEMENT_TIMEOUT_MS
+    if not (settings.DB_PGBOUNCER and timeout and engine.url.get_backend_name() == "postgresql"):
+        return
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+
+# -----------------------------------------------------
+# Factory
+# -----------------------------------------------------
+
+def create_db_engine(url: Union[str, URL], **overrides: Any) -> Engine:
+    """Sync engine (psycopg2 / sqlite3) configured from settings"""
+    url = make_url(url)
+    engine = create_engine(url, **_engine_options(url, False, overrides))
+    _set_local_statement_timeout(engine)
+    if url.get_backend_name() == "sqlite":
+        tune_sqlite(engine, in_memory=_is_memory_sqlite(url))
+    return engine
+
+
+def create_async_db_engine(url: Union[str, URL], **overrides: Any) -> AsyncEngine:
+    """Async engine (asyncpg / aiosqlite) for the same database, configured from settings"""
+    url = make_url(async_database_url(url))
+    engine = create_async_engine(url, **_engine_options(url, True, overrides))
+    _set_local_statement_timeout(engine.sync_engine)
+    if url.get_backend_name() == "sqlite":
+        tune_sqlite(engine.sync_engine, in_memory=_is_memory_sqlite(url))
+    return engine
+
+
+# -----------------------------------------------------
+# Warm-up and stats
+# -----------------------------------------------------
+
+def _pool_size(engine: Engine) -> int:
+    size = getattr(engine.pool, "size", None)
+    return size() if callable(size) else 1
+
+
+def warm_pool(engine: Engine) -> int:
+    """Open the pool's connections now instead of on the first requests"""
+    opened = []
+    try:
+        for _ in range(_pool_size(engine)):
+            opened.append(engine.connect())
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+
+async def warm_async_pool(engine: AsyncEngine) -> int:
+    """warm_pool() for an async engine; connections open concurrently"""
+    async def connect():
+        conn = engine.connect()
+        await conn.start()
+        return conn
+
+    results = await asyncio.gather(
+        *(connect() for _ in range(_pool_size(engine.sync_engine))),
+        return_exceptions=True
+    )
+    opened = [conn for conn in results if not isinstance(conn, BaseException)]
+    for conn in opened:
+        await conn.close()
+    errors = [e for e in results if isinstance(e, BaseException)]
+    if errors:
+        raise errors[0]
+    return len(opened)
+
+
+def pool_stats(engine: Union[Engine, AsyncEngine]) -> Dict[str, Any]:
+    """Live pool usage: connections checked out / idle / in overflow, checkout waits"""
+    if isinstance(engine, AsyncEngine):
+        engine = engine.sync_engine
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+
+    stats = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+    }
+    if isinstance(pool, _CheckoutStats):
+        with pool._stats_lock:
+            stats.update(
+                checkouts=pool.checkouts,
+                waits=pool.waits,
+                wait_ms_avg=round(pool.wait_seconds / pool.waits * 1000, 2) if pool.waits else 0.0,
+                wait_ms_max=round(pool.max_wait_seconds * 1000, 2),
+                timeouts=pool.timeouts
+            )
+    write_queue = write_queue_stats(engine)
+    if write_queue:
+        stats["sqlite_write_queue"] = write_queue
+    return stats
@@ -0,0 +1,108 @@
+"""
+Schema migrations (Alembic) from inside the app
+
+    alembic upgrade head            # the same thing from the command line
+
+migrate() brings the database in DATABASE_URL to the latest revision.
+Databases created by the old Base.metadata.create_all() startup are
+stamped with the baseline revision first, so they pick up only the
+migrations that came after it. Workers starting together take turns:
+a PostgreSQL advisory lock, or a lock file next to a SQLite database.
+"""
+import os
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from backend.models.database import engine
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BASELINE_REVISION = "0001"
+
+# Arbitrary key for pg_advisory_lock: one worker migrates, the others wait
+MIGRATION_LOCK_ID = 0x656D6572
+
+
+def alembic_config(connection: Optional[Connection] = None) -> Config:
+    """alembic.ini, leaving the app's logging setup alone"""
+    config = Config(os.path.join(ROOT_DIR, "alembic.ini"))
+    config.attributes["configure_logger"] = False
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(connection: Connection) -> Optional[str]:
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive lock on `path` (created if missing), across processes"""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)  # released when the file closes
+            yield
+            return
+
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:  # still locked after LK_LOCK's 10 s of retries
+                pass
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def _migration_lock(connection: Connection):
+    """One migrating worker at a time; the others wait, then find nothing to do"""
+    url = connection.engine.url
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        connection.commit()
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+            connection.commit()
+    elif connection.dialect.name == "sqlite" and url.database not in (None, "", ":memory:"):
+        with _file_lock(f"{url.database}.migrate-lock"):
+            yield
+    else:
+        yield
+
+
+def migrate(target: str = "head", bind: Engine = engine) -> Optional[str]:
+    """Upgrade to `target`; returns the revision the database was at before"""
+    with bind.connect() as connection, _migration_lock(connection):
+        config = alembic_config(connection)
+        before = current_revision(connection)
+        if before is None and inspect(connection).has_table("users"):
+            command.stamp(config, BASELINE_REVISION)
+            before = BASELINE_REVISION
+        # Alembic manages its own transactions from here
+        connection.commit()
+        command.upgrade(config, target)
+    return before
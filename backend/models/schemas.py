@@ -124,6 +124,39 @@ class PublicEmergencyCard(BaseModel):
     emergency_contacts: List[dict] = []
 
 
+# =====================
+# Offline Card (signed QR payload)
+# =====================
+
+class OfflineCardVerifyRequest(BaseModel):
+    # The most text a QR code can hold
+    payload: str = Field(..., max_length=4296, description="Scanned QR text or its base64url fragment")
+
+
+class OfflineCardFields(BaseModel):
+    public_id: Optional[str] = None
+    updated_at: Optional[str] = None
+    full_name: Optional[str] = None
+    blood_group: Optional[str] = None
+    allergies: Optional[List[str]] = None
+    medical_conditions: Optional[List[str]] = None
+    medications: Optional[List[str]] = None
+    primary_contact: Optional[dict] = None
+
+
+class OfflineCardVerification(BaseModel):
+    valid: bool
+    algorithm: str
+    key_id: str
+    card: OfflineCardFields
+
+
+class OfflineCardKey(BaseModel):
+    algorithm: str
+    key_id: str
+    public_key: Optional[str] = None
+
+
 # =====================
 # Emergency Contacts
 # =====================
@@ -158,6 +191,10 @@ class EmergencyContactResponse(EmergencyContactBase):
 
 class QRCodeResponse(BaseModel):
     qr_code_base64: str
+    qr_code_image_url: Optional[str] = None
+    qr_code_url: Optional[str] = None
+    qr_version: Optional[int] = None
+    qr_modules: Optional[int] = None
     public_url: str
     public_id: str
 
@@ -171,6 +208,11 @@ class PDFCardRequest(BaseModel):
     card_size: str = Field("credit", pattern="^(credit|business)$")
 
 
+class PrintSheetRequest(BaseModel):
+    public_ids: List[str] = Field(..., min_length=1)
+    card_size: str = Field("credit", pattern="^(credit|business)$")
+
+
 # =====================
 # Access Logs
 # =====================
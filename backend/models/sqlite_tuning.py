@@ -0,0 +1,189 @@
+"""
+SQLite production mode
+
+Every connection gets the SQLITE_* pragmas: WAL journal (scans keep
+reading while a write commits), synchronous=NORMAL (durable at each WAL
+checkpoint rather than each commit, safe against corruption), a memory
+map and a busy timeout.
+
+SQLite has one writer at a time. With SQLITE_WRITE_QUEUE, the write
+transactions of an engine queue up for their turn in order (a FIFO
+lock taken at the first INSERT / UPDATE / DELETE, released once the
+commit or rollback returns) instead of polling SQLite's lock in the
+busy handler. Other engines and worker processes wait in the busy
+timeout. Reads never queue. Scans' access logs are already batched into one commit per
+flush by access_log_writer.
+"""
+import asyncio
+import re
+import threading
+import time
+import weakref
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.util import await_only
+
+from backend.config import settings
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+_WRITE_SQL = re.compile(r"\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b", re.IGNORECASE)
+
+# connection.info key of a write transaction holding the queue's turn
+_TURN = "sqlite_write_turn"
+
+
+def sqlite_pragmas(in_memory: bool = False) -> list:
+    journal_mode = settings.SQLITE_JOURNAL_MODE.upper()
+    synchronous = settings.SQLITE_SYNCHRONOUS.upper()
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f"SQLITE_JOURNAL_MODE must be one of {sorted(JOURNAL_MODES)}")
+    if synchronous not in SYNCHRONOUS_MODES:
+        raise ValueError(f"SQLITE_SYNCHRONOUS must be one of {sorted(SYNCHRONOUS_MODES)}")
+
+    pragmas = [f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}"]
+    if not in_memory:
+        pragmas += [
+            f"PRAGMA journal_mode = {journal_mode}",
+            f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}",
+        ]
+    pragmas.append(f"PRAGMA synchronous = {synchronous}")
+    return pragmas
+
+
+class SQLiteWriteQueue:
+    """Write transactions of one engine take turns, first come first served"""
+
+    def __init__(self, timeout_seconds: float):
+        self.timeout_seconds = timeout_seconds
+        self._lock = threading.Lock()
+        self._loop_locks = weakref.WeakKeyDictionary()
+        self._stats_lock = threading.Lock()
+
+        self.writes = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def _loop_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        lock = self._loop_locks.get(loop)
+        if lock is None:
+            lock = self._loop_locks[loop] = asyncio.Lock()
+        return lock
+
+    def acquire(self, is_async: bool, error: type) -> Any:
+        """Wait for the turn; returns the lock to release at commit / rollback"""
+        started = time.perf_counter()
+        if is_async:
+            # Called from SQLAlchemy's greenlet on the event loop thread
+            lock = self._loop_lock()
+            waited = lock.locked()
+            try:
+                await_only(asyncio.wait_for(lock.acquire(), self.timeout_seconds))
+                acquired = True
+            except asyncio.TimeoutError:
+                acquired = False
+        else:
+            lock = self._lock
+            waited = lock.locked()
+            acquired = lock.acquire(timeout=self.timeout_seconds)
+
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            if acquired:
+                self.writes += 1
+            else:
+                self.timeouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_seconds += elapsed
+                self.max_wait_seconds = max(self.max_wait_seconds, elapsed)
+
+        if not acquired:
+            raise error("database is locked (write queue timeout)")
+        return lock
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "write_transactions": self.writes,
+                "waits": self.waits,
+                "wait_ms_avg": round(self.wait_seconds / self.waits * 1000, 2) if self.waits else 0.0,
+                "wait_ms_max": round(self.max_wait_seconds * 1000, 2),
+                "timeouts": self.timeouts,
+            }
+
+
+# Engine -> its write queue
+_write_queues = weakref.WeakKeyDictionary()
+
+
+def tune_sqlite(engine: Engine, in_memory: bool = False) -> None:
+    """Pragmas on every new connection, and the write queue (SQLITE_WRITE_QUEUE)"""
+    pragmas = sqlite_pragmas(in_memory)
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    if not settings.SQLITE_WRITE_QUEUE:
+        return
+
+    queue = _write_queues[engine] = SQLiteWriteQueue(settings.SQLITE_BUSY_TIMEOUT_MS / 1000)
+    is_async = engine.dialect.is_async
+    error = engine.dialect.dbapi.OperationalError
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _take_turn(conn, cursor, statement, parameters, context, executemany):
+        if _TURN in conn.info or not _WRITE_SQL.match(statement):
+            return
+        if conn.get_execution_options().get("isolation_level") == "AUTOCOMMIT":
+            return
+        conn.info[_TURN] = queue.acquire(is_async, error)
+
+    def _end_turn(info: dict) -> None:
+        lock = info.pop(_TURN, None)
+        if lock is not None:
+            lock.release()
+
+    def _connection_info(dbapi_connection) -> dict:
+        try:
+            return dbapi_connection.info
+        except NotImplementedError:  # first-connect setup, before any write
+            return {}
+
+    # The "commit" / "rollback" events fire before the driver's call; the
+    # turn passes on only once SQLite has released its write lock
+    dialect = engine.dialect
+    do_commit, do_rollback = dialect.do_commit, dialect.do_rollback
+
+    def _commit_then_end_turn(dbapi_connection):
+        do_commit(dbapi_connection)
+        _end_turn(_connection_info(dbapi_connection))
+
+    def _rollback_then_end_turn(dbapi_connection):
+        try:
+            do_rollback(dbapi_connection)
+        finally:
+            _end_turn(_connection_info(dbapi_connection))
+
+    dialect.do_commit = _commit_then_end_turn
+    dialect.do_rollback = _rollback_then_end_turn
+
+    # A connection lost mid-transaction is never committed or rolled back
+    @event.listens_for(engine, "invalidate")
+    def _invalidate(dbapi_connection, connection_record, exception):
+        _end_turn(connection_record.info)
+
+
+def write_queue_stats(engine: Engine) -> Dict[str, Any]:
+    queue = _write_queues.get(engine)
+    return queue.stats() if queue is not None else {}
@@ -0,0 +1,160 @@
+"""
+Buffered access-log writer - keeps audit inserts off the request path
+"""
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import insert
+
+from backend.config import settings
+from backend.models.database import SessionLocal, AccessLog, generate_uuid
+
+logger = logging.getLogger(__name__)
+
+
+class AccessLogWriter:
+    """
+    Collect card scans in a bounded in-memory queue and bulk-insert them
+    from a background thread.
+
+    A batch is written once `batch_size` rows are waiting or every
+    `flush_interval` seconds, whichever comes first. When the queue is
+    full new scans are dropped and counted instead of blocking the
+    responder.
+    """
+
+    def __init__(self, max_queue: int, batch_size: int, flush_interval: float):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    # -------------------------------------------------
+    # Producer side (request handlers)
+    # -------------------------------------------------
+    def record(self, user_id: str, ip_address: str, user_agent: str) -> bool:
+        """Queue one scan; returns False if it was dropped"""
+        row = {
+            "id": generate_uuid(),
+            "user_id": user_id,
+            "accessed_at": datetime.utcnow(),
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+        }
+
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                return False
+
+            self._queue.append(row)
+            self.enqueued += 1
+
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    # -------------------------------------------------
+    # Consumer side (background flusher)
+    # -------------------------------------------------
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run,
+            name="access-log-writer",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the flusher and write whatever is still queued"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+        self.flush()
+
+    def flush(self) -> int:
+        """Write every queued row now; returns the number written"""
+        total = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    return total
+                total += self._write(batch)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._queue) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._stopping:
+                    return
+
+            self.flush()
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            return batch
+
+    def _write(self, rows: List[Dict[str, Any]]) -> int:
+        db = SessionLocal()
+        try:
+            db.execute(insert(AccessLog), rows)
+            db.commit()
+            self.written += len(rows)
+            self.flushes += 1
+            return len(rows)
+        except Exception as e:
+            db.rollback()
+            self.failed += len(rows)
+            logger.error(f"❌ Access log batch of {len(rows)} failed: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            queued = len(self._queue)
+        return {
+            "queued": queued,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes,
+        }
+
+
+# Singleton instance (started/stopped by main.py)
+access_log_writer = AccessLogWriter(
+    max_queue=settings.ACCESS_LOG_QUEUE_SIZE,
+    batch_size=settings.ACCESS_LOG_BATCH_SIZE,
+    flush_interval=settings.ACCESS_LOG_FLUSH_SECONDS
+)
@@ -0,0 +1,280 @@
+"""
+Content-addressed stores for rendered artifacts (PDFs, QR images, ...)
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Relative store directories (the *_DIR settings) live under the
+# application, not wherever the server happened to be started from
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def content_key(*parts: Any) -> str:
+    """SHA-256 of the canonical JSON encoding of `parts`"""
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class MemoryArtifactStore:
+    """Byte-capped LRU of artifacts held in the worker's memory"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+
+            self._items[key] = data
+            self._size += len(data)
+
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            data = self._items.pop(key, None)
+            if data is not None:
+                self._size -= len(data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "items": len(self._items),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+class DiskArtifactStore:
+    """
+    Byte-capped LRU of artifacts stored as files under `directory`.
+
+    Files are named by their key (sharded by the first two hex digits)
+    and written atomically, so several workers can share one directory.
+    Recency is tracked through file mtimes, which survive restarts. A
+    relative `directory` is taken relative to APP_ROOT.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = os.path.join(APP_ROOT, directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _load_index(self) -> None:
+        found = []
+        for shard in os.listdir(self.directory):
+            shard_dir = os.path.join(self.directory, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if name.startswith("."):
+                    continue
+                stat = os.stat(os.path.join(shard_dir, name))
+                found.append((stat.st_mtime, name, stat.st_size))
+
+        for _, key, size in sorted(found):
+            self._index[key] = size
+            self._size += size
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                if key in self._index:
+                    self._size -= self._index.pop(key)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            # read-only or foreign-owned cache dir: the hit still counts,
+            # the file just keeps its old place in the LRU after a restart
+            pass
+
+        with self._lock:
+            self.hits += 1
+            if key in self._index:
+                self._index.move_to_end(key)
+            else:
+                # written by another worker sharing the directory
+                self._index[key] = len(data)
+                self._size += len(data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"❌ Could not store artifact {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._size -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._size += len(data)
+
+            while self._size > self.max_bytes and self._index:
+                evicted, size = self._index.popitem(last=False)
+                self._size -= size
+                self.evictions += 1
+                try:
+                    os.remove(self.path_for(evicted))
+                except FileNotFoundError:
+                    pass
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path_for(key))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._size -= self._index.pop(key, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "disk",
+                "directory": self.directory,
+                "items": len(self._index),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+class TieredArtifactStore:
+    """
+    Memory LRU in front of a disk store: hits are served from memory,
+    disk hits are promoted, and new artifacts are written to both.
+    """
+
+    def __init__(self, memory: MemoryArtifactStore, disk: DiskArtifactStore):
+        self.memory = memory
+        self.disk = disk
+
+    def location(self, key: str) -> str:
+        """Where the artifact for `key` lives on disk"""
+        return self.disk.path_for(key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self.memory.get(key)
+        if data is None:
+            data = self.disk.get(key)
+            if data is not None:
+                self.memory.put(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        self.memory.put(key, data)
+        self.disk.put(key, data)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        self.disk.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        memory, disk = self.memory.stats(), self.disk.stats()
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + disk["hits"]
+        return {
+            "backend": "tiered",
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory": memory,
+            "disk": disk,
+        }
+
+
+def make_artifact_store(max_bytes: int, directory: Optional[str] = None):
+    """On-disk store when a directory is configured, in-memory otherwise"""
+    if directory:
+        return DiskArtifactStore(directory, max_bytes)
+    return MemoryArtifactStore(max_bytes)
+
+
+# Rendered card PDFs, keyed by content_key(layout, user_data, qr_url)
+pdf_cache = make_artifact_store(settings.PDF_CACHE_MAX_BYTES, settings.PDF_CACHE_DIR)
+
+# QR images, keyed by content_key("qr", data, size, error level, border, format)
+qr_cache = (
+    TieredArtifactStore(
+        MemoryArtifactStore(settings.QR_CACHE_MEMORY_BYTES),
+        DiskArtifactStore(settings.QR_CACHE_DIR, settings.QR_CACHE_DISK_BYTES)
+    )
+    if settings.QR_CACHE_DIR else MemoryArtifactStore(settings.QR_CACHE_MEMORY_BYTES)
+)
+
+# Lock-screen wallpapers, keyed by content_key("wallpaper", layout version, device, format, card ETag, QR data)
+wallpaper_cache = make_artifact_store(settings.WALLPAPER_CACHE_MAX_BYTES, settings.WALLPAPER_CACHE_DIR)
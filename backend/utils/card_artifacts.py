@@ -0,0 +1,33 @@
+"""
+Everything one card version is served as, rendered in a single pass
+(the unit of work of the pre-render pipeline, see prerender.py)
+
+Pure CPU work on picklable data, so it runs in the render pool.
+"""
+from typing import Dict
+
+from backend.config import settings
+from backend.utils.card_template import RenderedBody, render_card_html
+from backend.utils.pdf_generator import generate_full_page_card
+from backend.utils.qr_generator import render_qr_image
+
+# QR variant that is pre-rendered (the default of the QR endpoints);
+# other sizes are rendered on demand
+QR_SIZE = 10
+
+
+def render_card_artifacts(card: Dict, user_data: Dict, qr_data: str) -> Dict[str, bytes]:
+    """
+    Artifacts by kind: "html" (plus "html.gzip" / "html.br" when
+    precompression is on), "qr.png", "qr.svg" and "pdf"
+    """
+    html = RenderedBody(render_card_html(card).encode("utf-8"), precompress=settings.HTML_PRECOMPRESS)
+    artifacts = {
+        "html": html.body,
+        "qr.png": render_qr_image(qr_data, QR_SIZE, "H", 4, "png"),
+        "qr.svg": render_qr_image(qr_data, QR_SIZE, "H", 4, "svg"),
+        "pdf": generate_full_page_card(user_data, qr_data),
+    }
+    for coding, body in html.encoded.items():
+        artifacts[f"html.{coding}"] = body
+    return artifacts
@@ -0,0 +1,121 @@
+"""
+In-process cache for assembled public emergency cards
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from backend.config import settings
+
+
+class CardCache:
+    """
+    Bounded LRU cache with a per-entry TTL, keyed by public_id.
+
+    The cache lives in the worker process, so every worker keeps its own
+    copy. Write endpoints invalidate the entry they touch; the TTL bounds
+    how long another worker can keep serving an outdated card.
+
+    A loader reads generation() before it goes to the database and hands
+    it to set(), which drops the card if an invalidate() came in while
+    it was loading - otherwise the old card would be cached again.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Generation of each recently invalidated card (from one counter);
+        # a card not listed is at _generation_floor, the newest generation
+        # that was dropped to keep the map bounded
+        self._generations: "OrderedDict[str, int]" = OrderedDict()
+        self._generation_counter = 0
+        self._generation_floor = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, public_id: str) -> Optional[Any]:
+        """Return the cached card, or None on a miss or expired entry"""
+        with self._lock:
+            item = self._entries.get(public_id)
+            if item is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._entries[public_id]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(public_id)
+            self.hits += 1
+            return value
+
+    def generation(self, public_id: str) -> int:
+        """Read before loading a card; pass to set() along with the card"""
+        with self._lock:
+            return self._generations.get(public_id, self._generation_floor)
+
+    def set(self, public_id: str, value: Any, generation: Optional[int] = None) -> None:
+        """
+        Store a card, evicting the least recently used entries if full.
+        Skipped if the card was invalidated since `generation` was read.
+        """
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self._generations.get(public_id, self._generation_floor):
+                return
+
+            self._entries[public_id] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(public_id)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, public_id: str) -> None:
+        """Drop a card after its profile or contacts changed"""
+        with self._lock:
+            self._generation_counter += 1
+            self._generations[public_id] = self._generation_counter
+            self._generations.move_to_end(public_id)
+            while len(self._generations) > max(self.max_entries, 1):
+                _, dropped = self._generations.popitem(last=False)
+                self._generation_floor = max(self._generation_floor, dropped)
+
+            if self._entries.pop(public_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# Singleton instance
+card_cache = CardCache(
+    max_entries=settings.CARD_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.CARD_CACHE_TTL_SECONDS
+)
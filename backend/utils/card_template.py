@@ -0,0 +1,162 @@
+"""
+Precompiled HTML templates for the public emergency card
+"""
+import gzip
+import os
+import re
+from html import escape
+from typing import Dict, List, Optional
+
+from backend.config import settings
+
+try:  # optional dependency - brotli bodies are skipped without it
+    import brotli
+except ImportError:
+    brotli = None
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+
+_SLOT = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class CompiledTemplate:
+    """
+    A template split once into static chunks and named slots.
+
+    Rendering is a single join of the precomputed chunks with the slot
+    values; values are inserted as-is, so callers escape them first.
+    """
+
+    def __init__(self, source: str):
+        self.chunks: List[str] = []
+        self.slots: List[str] = []
+
+        position = 0
+        for match in _SLOT.finditer(source):
+            self.chunks.append(source[position:match.start()])
+            self.slots.append(match.group(1))
+            position = match.end()
+        self.chunks.append(source[position:])
+
+    def render(self, **values: str) -> str:
+        parts = [self.chunks[0]]
+        for slot, chunk in zip(self.slots, self.chunks[1:]):
+            parts.append(values[slot])
+            parts.append(chunk)
+        return "".join(parts)
+
+
+def load_template(name: str) -> CompiledTemplate:
+    with open(os.path.join(TEMPLATE_DIR, name), encoding="utf-8") as f:
+        return CompiledTemplate(f.read())
+
+
+# Compiled once at import (i.e. worker startup)
+CARD_TEMPLATE = load_template("emergency_card.html")
+CONTACT_TEMPLATE = CompiledTemplate(
+    "<div class='contact'><b>{{ name }}</b> ({{ relation }})"
+    "<a class='call' href='tel:{{ phone }}'>Call {{ phone }}</a></div>"
+)
+
+
+def _text(value) -> str:
+    return escape(str(value))
+
+
+def _list(values: Optional[List[str]]) -> str:
+    return escape(", ".join(values)) if values else "None"
+
+
+def render_card_html(card: Dict) -> str:
+    """Render a PublicEmergencyCard dict into the full HTML page"""
+    contacts = "".join(
+        CONTACT_TEMPLATE.render(
+            name=_text(c["name"]),
+            relation=_text(c["relation"]),
+            phone=_text(c["phone"])
+        ) for c in card["emergency_contacts"]
+    )
+
+    return CARD_TEMPLATE.render(
+        full_name=_text(card["full_name"]),
+        age=_text(card["age"]),
+        blood_group=_text(card["blood_group"]),
+        allergies=_list(card["allergies"]),
+        medical_conditions=_list(card["medical_conditions"]),
+        medications=_list(card["medications"]),
+        contacts=contacts
+    )
+
+
+class RenderedBody:
+    """A rendered body plus its precompressed variants (by content-coding)"""
+
+    def __init__(self, body: bytes, precompress: bool = True):
+        self.body = body
+        self.encoded: Dict[str, bytes] = {}
+
+        if precompress:
+            self.encoded["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.encoded["br"] = brotli.compress(body, quality=11)
+
+    def for_coding(self, coding: Optional[str]) -> bytes:
+        """Return the body for a content-coding chosen by negotiate_coding()"""
+        if coding is None:
+            return self.body
+        return self.encoded[coding]
+
+
+def negotiate_coding(accept_encoding: str) -> Optional[str]:
+    """Pick the precompressed variant to serve, without rendering anything"""
+    if not settings.HTML_PRECOMPRESS:
+        return None
+
+    offered = accepted_codings(accept_encoding)
+    if "br" in offered and brotli is not None:
+        return "br"
+    if "gzip" in offered:
+        return "gzip"
+    return None
+
+
+def served_codings() -> List[str]:
+    """Every content-coding negotiate_coding() can pick"""
+    if not settings.HTML_PRECOMPRESS:
+        return []
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def accepted_codings(accept_encoding: str) -> set:
+    """Content-codings with a non-zero q-value in an Accept-Encoding header"""
+    codings = set()
+    for token in accept_encoding.split(","):
+        name, _, params = token.partition(";")
+        quality = 1.0
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name.strip() and quality > 0:
+            codings.add(name.strip().lower())
+    return codings
+
+
+def get_rendered_card(entry: Dict) -> RenderedBody:
+    """
+    Return the rendered HTML for a card entry, rendering it on first use.
+
+    The result is stored on the entry itself; entries are replaced
+    whenever the card version changes, so the render is cached per
+    card version.
+    """
+    rendered = entry.get("html")
+    if rendered is None:
+        rendered = RenderedBody(
+            render_card_html(entry["card"]).encode("utf-8"),
+            precompress=settings.HTML_PRECOMPRESS
+        )
+        entry["html"] = rendered
+    return rendered
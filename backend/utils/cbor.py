@@ -0,0 +1,134 @@
+"""
+Minimal CBOR (RFC 8949) encoder/decoder for compact card payloads
+
+Covers the types cards are made of: int, str, bytes, list, dict, bool,
+None and float. No tags, indefinite lengths or half-precision floats.
+"""
+import struct
+from typing import Any, Tuple
+
+MEDIA_TYPE = "application/cbor"
+
+_UINT, _NEGINT, _BYTES, _TEXT, _ARRAY, _MAP, _TAG, _SIMPLE = range(8)
+
+# Cards nest two levels deep; anything much deeper is hostile input
+# (each level costs a Python stack frame)
+MAX_DEPTH = 32
+
+
+def _head(major: int, value: int) -> bytes:
+    if value < 24:
+        return bytes([major << 5 | value])
+    if value < 0x100:
+        return bytes([major << 5 | 24, value])
+    if value < 0x10000:
+        return bytes([major << 5 | 25]) + struct.pack(">H", value)
+    if value < 0x100000000:
+        return bytes([major << 5 | 26]) + struct.pack(">I", value)
+    return bytes([major << 5 | 27]) + struct.pack(">Q", value)
+
+
+def _encode(value: Any, out: list) -> None:
+    if value is None:
+        out.append(b"\xf6")
+    elif value is True:
+        out.append(b"\xf5")
+    elif value is False:
+        out.append(b"\xf4")
+    elif isinstance(value, int):
+        if value >= 0:
+            out.append(_head(_UINT, value))
+        else:
+            out.append(_head(_NEGINT, -1 - value))
+    elif isinstance(value, float):
+        out.append(b"\xfb" + struct.pack(">d", value))
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        out.append(_head(_TEXT, len(data)))
+        out.append(data)
+    elif isinstance(value, (bytes, bytearray)):
+        out.append(_head(_BYTES, len(value)))
+        out.append(bytes(value))
+    elif isinstance(value, (list, tuple)):
+        out.append(_head(_ARRAY, len(value)))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out.append(_head(_MAP, len(value)))
+        for key, item in value.items():
+            _encode(key, out)
+            _encode(item, out)
+    else:
+        raise TypeError(f"Cannot CBOR-encode {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    out: list = []
+    _encode(value, out)
+    return b"".join(out)
+
+
+def _read_length(data: bytes, pos: int, info: int) -> Tuple[int, int]:
+    if info < 24:
+        return info, pos
+    size = {24: 1, 25: 2, 26: 4, 27: 8}.get(info)
+    if size is None or pos + size > len(data):
+        raise ValueError("Malformed CBOR length")
+    return int.from_bytes(data[pos:pos + size], "big"), pos + size
+
+
+def _decode(data: bytes, pos: int, depth: int = 0) -> Tuple[Any, int]:
+    if pos >= len(data):
+        raise ValueError("Truncated CBOR data")
+    if depth > MAX_DEPTH:
+        raise ValueError(f"CBOR nested deeper than {MAX_DEPTH} levels")
+
+    initial = data[pos]
+    major, info = initial >> 5, initial & 0x1F
+    pos += 1
+
+    if major == _SIMPLE:
+        if info == 20:
+            return False, pos
+        if info == 21:
+            return True, pos
+        if info in (22, 23):
+            return None, pos
+        if info == 27:
+            return struct.unpack(">d", data[pos:pos + 8])[0], pos + 8
+        if info == 26:
+            return struct.unpack(">f", data[pos:pos + 4])[0], pos + 4
+        raise ValueError(f"Unsupported CBOR simple value {info}")
+
+    length, pos = _read_length(data, pos, info)
+
+    if major == _UINT:
+        return length, pos
+    if major == _NEGINT:
+        return -1 - length, pos
+    if major in (_BYTES, _TEXT):
+        if pos + length > len(data):
+            raise ValueError("Truncated CBOR string")
+        chunk = data[pos:pos + length]
+        return (chunk.decode("utf-8") if major == _TEXT else bytes(chunk)), pos + length
+    if major == _ARRAY:
+        items = []
+        for _ in range(length):
+            item, pos = _decode(data, pos, depth + 1)
+            items.append(item)
+        return items, pos
+    if major == _MAP:
+        result = {}
+        for _ in range(length):
+            key, pos = _decode(data, pos, depth + 1)
+            result[key], pos = _decode(data, pos, depth + 1)
+        return result, pos
+
+    raise ValueError("CBOR tags are not supported")
+
+
+def loads(data: bytes) -> Any:
+    value, pos = _decode(data, 0)
+    if pos != len(data):
+        raise ValueError("Trailing bytes after CBOR value")
+    return value
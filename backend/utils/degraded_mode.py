@@ -0,0 +1,465 @@
+"""
+Degraded serving of public cards while the database is slow or down
+
+Every card the public endpoints serve is also kept as a last-known-good
+copy (memory LRU, spilling to LAST_KNOWN_GOOD_DIR when set). A circuit
+breaker counts database errors and slow lookups; once it opens, requests
+stop touching the database and get the last-known-good copy, marked
+stale, while a background thread refreshes the cards that were asked
+for. The first refresh that succeeds after DB_BREAKER_RESET_SECONDS
+closes the breaker again.
+
+Copies are never served once older than LAST_KNOWN_GOOD_MAX_AGE_SECONDS.
+When a card changes, its copy is replaced by a tombstone; copies loaded
+before the tombstone are void, also on workers sharing LAST_KNOWN_GOOD_DIR.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.config import settings
+from backend.models.database import SessionLocal
+from backend.utils.artifact_store import content_key, make_artifact_store
+from backend.utils.card_cache import card_cache
+from backend.utils.public_card import build_public_card, fetch_public_card, load_public_profile
+from backend.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# What a database outage looks like: asyncpg's connect errors
+# (refused, unreachable, timed out) reach us unwrapped
+DATABASE_ERRORS = (SQLAlchemyError, OSError, asyncio.TimeoutError)
+
+
+def _needs_card(entry: Optional[Dict], is_current) -> bool:
+    """
+    A coalesced load that came back as validators only (its leader's
+    client had the card cached) is enough for a caller whose copy is
+    current too; anyone else needs the full card
+    """
+    return entry is not None and "card" not in entry and not (is_current and is_current(entry))
+
+
+def _reason(error: Exception) -> str:
+    """The driver's message, without the SQL statement"""
+    return str(getattr(error, "orig", None) or error)
+
+
+class CircuitBreaker:
+    """
+    closed → `failure_threshold` failures in a row → open.
+    open → `reset_seconds` later one trial call is let through
+    (half-open): success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+
+        self.state = CLOSED
+        self._failures = 0
+        self._changed_at = 0.0
+        self._lock = threading.Lock()
+
+        self.opened = 0
+        self.total_failures = 0
+
+    @property
+    def closed(self) -> bool:
+        return self.state == CLOSED
+
+    def retry_after(self) -> float:
+        """Seconds until a trial call is allowed (0 when closed)"""
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self._changed_at + self.reset_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        """May a call go to the database now? Takes the trial slot if so"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            # a trial that never reported back is retried after another period
+            if time.monotonic() - self._changed_at < self.reset_seconds:
+                return False
+            self.state = HALF_OPEN
+            self._changed_at = time.monotonic()
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("✅ Database is back, circuit breaker closed")
+            self.state = CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self.total_failures += 1
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self._failures >= self.failure_threshold
+            ):
+                if self.state == CLOSED:
+                    self.opened += 1
+                    logger.warning("⚠️ Database failing, circuit breaker open - serving stale cards")
+                self.state = OPEN
+                self._changed_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failure_threshold": self.failure_threshold,
+            "reset_seconds": self.reset_seconds,
+            "consecutive_failures": self._failures,
+            "total_failures": self.total_failures,
+            "opened": self.opened,
+        }
+
+
+class DegradedCardService:
+    """
+    Public card lookups - coalesced per public_id, behind the circuit
+    breaker - with a fallback to last-known-good copies and background
+    refreshes.
+
+    A card's copy is replaced whenever a new version is served and
+    dropped when the card changes or is deleted, so visibility changes
+    are never undone by a stale copy.
+    """
+
+    def __init__(
+        self,
+        store,
+        breaker: CircuitBreaker,
+        slow_seconds: float,
+        max_age_seconds: float,
+        max_queue: int = 1000,
+        enabled: bool = True,
+        session_factory: Callable[[], Session] = SessionLocal
+    ):
+        self.store = store
+        self.breaker = breaker
+        self.slow_seconds = slow_seconds
+        self.max_age_seconds = max_age_seconds
+        self.max_queue = max_queue
+        self.enabled = enabled
+        self.session_factory = session_factory
+        self.flights = SingleFlight()
+
+        self._queue: "OrderedDict[str, None]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+        self.stale_served = 0
+        self.too_old = 0
+        self.unavailable = 0
+        self.slow_lookups = 0
+        self.refreshed = 0
+        self.refresh_failures = 0
+
+    # -------------------------------------------------
+    # Request path
+    # -------------------------------------------------
+    def get_card(
+        self,
+        public_id: str,
+        db: Session,
+        is_current: Optional[Callable[[Dict], bool]] = None
+    ) -> Optional[Dict]:
+        """
+        get_public_card, degrading to the last-known-good copy (with a
+        `stale` age in seconds) when the database fails or the breaker is
+        open; 503 when there is no copy to fall back to. Concurrent loads
+        of the same card share one query.
+        """
+        entry = card_cache.get(public_id)
+        if entry is not None:
+            return self.remember(entry)
+        if self.enabled and not self.breaker.closed:
+            return self.stale_card(public_id)
+
+        try:
+            entry = self.flights.do(public_id, self._fetch, public_id, db, is_current)
+            if _needs_card(entry, is_current):
+                entry = self.flights.do((public_id, "card"), self._fetch, public_id, db, None)
+        except DATABASE_ERRORS:
+            if not self.enabled:
+                raise
+            db.rollback()
+            return self.stale_card(public_id)
+        return self._served(public_id, entry)
+
+    async def get_card_async(
+        self,
+        public_id: str,
+        db: AsyncSession,
+        is_current: Optional[Callable[[Dict], bool]] = None
+    ) -> Optional[Dict]:
+        """
+        get_card for the routers' session (AsyncSession or
+        SyncSessionAdapter); a card_cache hit never touches it
+        """
+        entry = card_cache.get(public_id)
+        if entry is not None:
+            return self.remember(entry)
+        if self.enabled and not self.breaker.closed:
+            return self.stale_card(public_id)
+
+        try:
+            entry = await self.flights.do_async(public_id, self._fetch_async, public_id, db, is_current)
+            if _needs_card(entry, is_current):
+                entry = await self.flights.do_async((public_id, "card"), self._fetch_async, public_id, db, None)
+        except DATABASE_ERRORS:
+            if not self.enabled:
+                raise
+            await db.rollback()
+            return self.stale_card(public_id)
+        return self._served(public_id, entry)
+
+    async def _fetch_async(self, public_id: str, db: AsyncSession, is_current) -> Optional[Dict]:
+        """_fetch on the routers' session, connect errors included"""
+        if not self.enabled:
+            return await db.run_sync(lambda session: fetch_public_card(public_id, session, is_current))
+
+        started = time.monotonic()
+        try:
+            entry = await db.run_sync(lambda session: fetch_public_card(public_id, session, is_current))
+        except DATABASE_ERRORS as e:
+            self._record_failure(public_id, e)
+            raise
+        self._record_lookup(time.monotonic() - started)
+        return entry
+
+    def _fetch(self, public_id: str, db: Session, is_current) -> Optional[Dict]:
+        """One database load, shared by every caller coalesced onto it"""
+        if not self.enabled:
+            return fetch_public_card(public_id, db, is_current)
+
+        started = time.monotonic()
+        try:
+            entry = fetch_public_card(public_id, db, is_current)
+        except DATABASE_ERRORS as e:
+            self._record_failure(public_id, e)
+            raise
+        self._record_lookup(time.monotonic() - started)
+        return entry
+
+    def _record_failure(self, public_id: str, error: Exception) -> None:
+        self.breaker.record_failure()
+        logger.warning(f"⚠️ Database lookup of card {public_id} failed: {_reason(error)}")
+
+    def _served(self, public_id: str, entry: Optional[Dict]) -> Optional[Dict]:
+        if entry is None:
+            self.forget(public_id)
+            return None
+        return self.remember(entry)
+
+    def stale_card(self, public_id: str) -> Dict:
+        self.submit(public_id)
+
+        entry = self.last_known_good(public_id)
+        if entry is None:
+            self.unavailable += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Emergency card temporarily unavailable, please retry",
+                headers={"Retry-After": str(max(1, round(self.breaker.retry_after())))}
+            )
+
+        self.stale_served += 1
+        return entry
+
+    def _record_lookup(self, elapsed: float) -> None:
+        if elapsed > self.slow_seconds:
+            self.slow_lookups += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    # -------------------------------------------------
+    # Last-known-good copies
+    # -------------------------------------------------
+    def _key(self, public_id: str) -> str:
+        return content_key("last-known-good", public_id)
+
+    def _tombstone_key(self, public_id: str) -> str:
+        return content_key("last-known-good-forgotten", public_id)
+
+    def _forgotten_at(self, public_id: str) -> float:
+        data = self.store.get(self._tombstone_key(public_id))
+        return float(data) if data else 0.0
+
+    def remember(self, entry: Dict) -> Dict:
+        """Keep a served card as its last-known-good copy (once per version)"""
+        if not self.enabled or "card" not in entry or entry.get("remembered"):
+            return entry
+
+        # Loaded before the card last changed (on any worker): not worth keeping
+        loaded_at = entry.get("loaded_at", 0.0)
+        if loaded_at > self._forgotten_at(entry["public_id"]):
+            self.store.put(self._key(entry["public_id"]), json.dumps({
+                "public_id": entry["public_id"],
+                "user_id": entry["user_id"],
+                "etag": entry["etag"],
+                "last_modified": entry["last_modified"].isoformat(),
+                "card": entry["card"],
+                "loaded_at": loaded_at,
+            }, separators=(",", ":")).encode())
+        entry["remembered"] = True
+        return entry
+
+    def last_known_good(self, public_id: str) -> Optional[Dict]:
+        data = self.store.get(self._key(public_id))
+        if data is None:
+            return None
+
+        entry = json.loads(data)
+        loaded_at = entry.pop("loaded_at", 0.0)
+        if loaded_at <= self._forgotten_at(public_id):
+            return None
+        age = time.time() - loaded_at
+        if age > self.max_age_seconds:
+            self.too_old += 1
+            return None
+
+        entry["last_modified"] = datetime.fromisoformat(entry["last_modified"])
+        entry["stale"] = max(0, int(age))
+        return entry
+
+    def forget(self, public_id: str) -> None:
+        """Drop a card's copy after it changed or was deleted, leaving a tombstone"""
+        self.store.put(self._tombstone_key(public_id), repr(time.time()).encode())
+        self.store.delete(self._key(public_id))
+
+    # -------------------------------------------------
+    # Background refresh
+    # -------------------------------------------------
+    def submit(self, public_id: str) -> None:
+        with self._cond:
+            if public_id in self._queue or len(self._queue) >= self.max_queue:
+                return
+            self._queue[public_id] = None
+            self._cond.notify()
+
+    def refresh(self, public_id: str) -> Optional[str]:
+        """
+        Reload one card if the breaker lets a call through; returns
+        "refreshed", "removed", "failed" or None (breaker still open)
+        """
+        if not self.breaker.allow():
+            return None
+
+        started = time.monotonic()
+        generation = card_cache.generation(public_id)
+        db = self.session_factory()
+        try:
+            profile = load_public_profile(public_id, db)
+            entry = build_public_card(profile, profile.user.emergency_contacts) if profile else None
+        except DATABASE_ERRORS as e:
+            self.breaker.record_failure()
+            self.refresh_failures += 1
+            logger.warning(f"⚠️ Refresh of card {public_id} failed: {_reason(e)}")
+            return "failed"
+        finally:
+            db.close()
+
+        self._record_lookup(time.monotonic() - started)
+        if entry is None:
+            card_cache.invalidate(public_id)
+            self.forget(public_id)
+            return "removed"
+
+        card_cache.set(public_id, entry, generation)
+        self.remember(entry)
+        self.refreshed += 1
+        return "refreshed"
+
+    def start(self) -> None:
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run,
+            name="degraded-card-refresh",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopping and not self._queue:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+
+                wait = self.breaker.retry_after()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+
+                public_id, _ = self._queue.popitem(last=False)
+
+            try:
+                result = self.refresh(public_id)
+            except Exception as e:
+                result = "failed"
+                logger.error(f"❌ Refresh of card {public_id} failed: {e}")
+
+            if result in (None, "failed"):
+                self.submit(public_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            queued = len(self._queue)
+        return {
+            "enabled": self.enabled,
+            "breaker": self.breaker.stats(),
+            "stale_served": self.stale_served,
+            "too_old": self.too_old,
+            "max_age_seconds": self.max_age_seconds,
+            "unavailable": self.unavailable,
+            "slow_lookups": self.slow_lookups,
+            "refresh_queued": queued,
+            "refreshed": self.refreshed,
+            "refresh_failures": self.refresh_failures,
+            "single_flight": self.flights.stats(),
+            "store": self.store.stats(),
+        }
+
+
+# Singleton instance (refresh thread started/stopped by main.py)
+degraded_cards = DegradedCardService(
+    store=make_artifact_store(settings.LAST_KNOWN_GOOD_MAX_BYTES, settings.LAST_KNOWN_GOOD_DIR),
+    breaker=CircuitBreaker(
+        failure_threshold=settings.DB_BREAKER_FAILURES,
+        reset_seconds=settings.DB_BREAKER_RESET_SECONDS
+    ),
+    slow_seconds=settings.DB_SLOW_LOOKUP_SECONDS,
+    max_age_seconds=settings.LAST_KNOWN_GOOD_MAX_AGE_SECONDS,
+    enabled=settings.DEGRADED_MODE_ENABLED
+)
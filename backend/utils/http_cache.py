@@ -0,0 +1,141 @@
+"""
+HTTP caching helpers for public cards (ETag / Last-Modified / 304)
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, List, Optional
+
+from fastapi import Request, Response
+
+from backend.config import settings
+
+
+def http_date(value: datetime) -> str:
+    """Format a naive UTC datetime as an IMF-fixdate header value"""
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+# Each representation of a card gets its own strong ETag ("<hash>-json",
+# "<hash>-gzip", ...) since the bytes differ; revalidation treats them
+# all as the same card version.
+VARIANT_SUFFIXES = ("-gzip", "-br", "-json", "-cbor")
+
+
+def cache_headers(
+    entry: Dict,
+    variant: Optional[str] = None,
+    vary: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    Validator and Cache-Control headers for a card entry. A stale entry
+    (served from its last-known-good copy) says so and is not cached.
+    """
+    etag = entry["etag"]
+    if variant:
+        etag = f'{etag[:-1]}-{variant}"'
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(entry["last_modified"]),
+        "Cache-Control": settings.PUBLIC_CARD_CACHE_CONTROL,
+    }
+    if entry.get("stale") is not None:
+        headers["Cache-Control"] = "no-cache"
+        headers["Age"] = str(entry["stale"])
+        headers["Warning"] = '110 - "Response is Stale"'
+    if vary:
+        headers["Vary"] = vary
+    return headers
+
+
+def negotiate_media_type(accept: Optional[str], offered: List[str]) -> str:
+    """
+    Pick one of `offered` for an Accept header.
+
+    Highest q-value wins; on a tie an exact type beats a wildcard and
+    earlier entries in `offered` beat later ones. A missing header or a
+    bare */* gets the first offered type.
+    """
+    if not accept:
+        return offered[0]
+
+    best, best_rank = offered[0], None
+    for token in accept.split(","):
+        media_range, _, params = token.partition(";")
+        media_range = media_range.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality <= 0:
+            continue
+
+        for position, media_type in enumerate(offered):
+            major = media_type.split("/")[0]
+            if media_range == media_type:
+                specificity = 2
+            elif media_range == f"{major}/*":
+                specificity = 1
+            elif media_range == "*/*":
+                specificity = 0
+            else:
+                continue
+
+            rank = (quality, specificity, -position)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = media_type, rank
+
+    return best
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match value against an ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        for suffix in VARIANT_SUFFIXES:
+            if candidate.endswith(suffix + '"'):
+                candidate = candidate[:-len(suffix) - 1] + '"'
+        if candidate == etag:
+            return True
+    return False
+
+
+def is_not_modified(request: Request, entry: Dict) -> bool:
+    """
+    Evaluate If-None-Match / If-Modified-Since against a card entry.
+
+    If-None-Match takes precedence (RFC 9110 13.2.2) and uses the weak
+    comparison, so a W/ prefix added by an intermediary still matches.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, entry["etag"])
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        # HTTP dates have one-second resolution
+        return entry["last_modified"].replace(microsecond=0) <= since
+
+    return False
+
+
+def not_modified_response(
+    entry: Dict,
+    variant: Optional[str] = None,
+    vary: Optional[str] = None
+) -> Response:
+    return Response(status_code=304, headers=cache_headers(entry, variant, vary))
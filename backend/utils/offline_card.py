@@ -0,0 +1,255 @@
+"""
+Offline card payload - signed, compressed critical fields carried in
+the QR code itself, for scans with no signal
+
+The payload rides in the URL fragment ({card URL}#{base64url}), so a
+phone with signal still just opens the card, while responder tooling
+can read and check it without contacting the server. Layout:
+
+    version (1) | algorithm (1) | key id (4) | deflate(CBOR map) | signature
+
+The CBOR map is deflated against a preset dictionary of common medical
+terms; the signature (Ed25519: 64 bytes, HMAC-SHA256 truncated: 16
+bytes) covers everything before it. This module needs only `cryptography`
+and backend.utils.cbor (no settings or database), so it can be copied
+into responder tools as is:
+
+    python -m backend.utils.offline_card "<scanned text>" --public-key <base64url>
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import struct
+import sys
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+from backend.utils import cbor
+
+FORMAT_VERSION = 1
+ED25519, HMAC_SHA256 = 1, 2
+ALGORITHM_NAMES = {ED25519: "ed25519", HMAC_SHA256: "hmac-sha256"}
+SIGNATURE_SIZES = {ED25519: 64, HMAC_SHA256: 16}
+HEADER_SIZE = 6
+
+# A QR code holds at most 2953 bytes, so no real payload is bigger; its
+# fields inflate to a few KB at most (anything past the cap is a bomb)
+MAX_PAYLOAD_SIZE = 2953
+MAX_FIELDS_SIZE = 16 * 1024
+
+# Preset deflate dictionary (part of format version 1 - never edit it,
+# add a new version instead). Short card payloads barely compress on
+# their own; common allergy / condition / medication / relation words
+# give deflate something to point back at.
+PRESET_DICTIONARY = (
+    b"Penicillin Peanuts Tree nuts Shellfish Latex Sulfa Aspirin Ibuprofen Codeine "
+    b"Morphine Bee stings Eggs Milk Soy Wheat Diabetes Type 1 diabetes Type 2 diabetes "
+    b"Asthma Epilepsy Hypertension Heart disease Pacemaker Kidney disease COPD Stroke "
+    b"Anaphylaxis Insulin Metformin Salbutamol inhaler Warfarin Levothyroxine "
+    b"Atorvastatin Lisinopril Amlodipine EpiPen Epinephrine A+ A- B+ B- AB+ AB- O+ O- "
+    b"Mother Father Spouse Husband Wife Son Daughter Brother Sister Friend +91 +1 +44 "
+)
+
+# CBOR map keys (one letter each to keep the QR small)
+FIELDS = {
+    "i": "public_id",
+    "t": "updated_at",
+    "n": "full_name",
+    "b": "blood_group",
+    "a": "allergies",
+    "c": "medical_conditions",
+    "m": "medications",
+    "p": "primary_contact",
+}
+
+
+def b64url_encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def b64url_decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+# =====================
+# Signers
+# =====================
+
+class Ed25519Signer:
+    """Public-key signatures; verifiers only need public_key"""
+
+    algorithm = ED25519
+
+    def __init__(self, seed: bytes):
+        self._private_key = Ed25519PrivateKey.from_private_bytes(seed)
+        self.public_key = self._private_key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+        self.key_id = hashlib.sha256(self.public_key).digest()[:4]
+
+    def sign(self, data: bytes) -> bytes:
+        return self._private_key.sign(data)
+
+    def verify(self, data: bytes, signature: bytes) -> bool:
+        return verify_ed25519(self.public_key, data, signature)
+
+
+class HmacSigner:
+    """Shared-secret tags; only holders of the key can verify"""
+
+    algorithm = HMAC_SHA256
+    public_key = None
+
+    def __init__(self, key: bytes):
+        self._key = key
+        self.key_id = hashlib.sha256(b"key-id" + key).digest()[:4]
+
+    def sign(self, data: bytes) -> bytes:
+        return hmac.new(self._key, data, hashlib.sha256).digest()[:SIGNATURE_SIZES[HMAC_SHA256]]
+
+    def verify(self, data: bytes, signature: bytes) -> bool:
+        return hmac.compare_digest(self.sign(data), signature)
+
+
+def verify_ed25519(public_key: bytes, data: bytes, signature: bytes) -> bool:
+    try:
+        Ed25519PublicKey.from_public_bytes(public_key).verify(signature, data)
+        return True
+    except (InvalidSignature, ValueError):
+        return False
+
+
+# =====================
+# Encode
+# =====================
+
+def offline_fields(entry: Dict, primary: Optional[Dict]) -> Dict:
+    """
+    Critical fields of a card entry (already filtered by the profile's
+    visibility flags), keyed for the payload. Hidden / empty fields are
+    left out.
+    """
+    card = entry["card"]
+    fields = {
+        "i": entry["public_id"],
+        "t": int(entry["last_modified"].replace(tzinfo=timezone.utc).timestamp()),
+        "n": card["full_name"],
+        "b": card["blood_group"],
+        "a": card["allergies"],
+        "c": card["medical_conditions"],
+        "m": card["medications"],
+        "p": [primary["name"], primary["phone"]] if primary else None,
+    }
+    return {key: value for key, value in fields.items() if value}
+
+
+def pack_payload(fields: Dict, signer) -> bytes:
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=PRESET_DICTIONARY)
+    body = compressor.compress(cbor.dumps(fields)) + compressor.flush()
+    signed = bytes([FORMAT_VERSION, signer.algorithm]) + signer.key_id + body
+    return signed + signer.sign(signed)
+
+
+# =====================
+# Decode / verify
+# =====================
+
+def extract_payload(text: str) -> bytes:
+    """Payload bytes from scanned QR text (full URL) or a bare base64url string"""
+    if "#" in text:
+        text = text.rsplit("#", 1)[1]
+    return b64url_decode(text.strip())
+
+
+def unpack_payload(payload: bytes) -> Tuple[int, bytes, Dict, bytes, bytes]:
+    """Split a payload into (algorithm, key id, fields, signed bytes, signature)"""
+    if len(payload) < HEADER_SIZE or payload[0] != FORMAT_VERSION:
+        raise ValueError("Not an offline card payload")
+    if len(payload) > MAX_PAYLOAD_SIZE:
+        raise ValueError("Offline card payload too large")
+
+    algorithm = payload[1]
+    if algorithm not in SIGNATURE_SIZES:
+        raise ValueError(f"Unknown signature algorithm {algorithm}")
+
+    signature_size = SIGNATURE_SIZES[algorithm]
+    if len(payload) < HEADER_SIZE + signature_size:
+        raise ValueError("Truncated offline card payload")
+    signed, signature = payload[:-signature_size], payload[-signature_size:]
+    try:
+        decompressor = zlib.decompressobj(-15, zdict=PRESET_DICTIONARY)
+        data = decompressor.decompress(signed[HEADER_SIZE:], MAX_FIELDS_SIZE)
+        if decompressor.unconsumed_tail or len(data) >= MAX_FIELDS_SIZE:
+            raise ValueError(f"fields inflate past {MAX_FIELDS_SIZE} bytes")
+        fields = cbor.loads(data + decompressor.flush())
+    except (zlib.error, struct.error, TypeError, ValueError) as e:
+        raise ValueError(f"Corrupt offline card payload: {e}")
+    if not isinstance(fields, dict):
+        raise ValueError("Corrupt offline card payload: not a map")
+
+    return algorithm, signed[2:HEADER_SIZE], fields, signed, signature
+
+
+def expand_fields(fields: Dict) -> Dict:
+    card = {name: fields.get(key) for key, name in FIELDS.items()}
+    try:
+        if card["updated_at"] is not None:
+            card["updated_at"] = datetime.fromtimestamp(card["updated_at"], timezone.utc).isoformat()
+        if card["primary_contact"]:
+            name, phone = card["primary_contact"]
+            card["primary_contact"] = {"name": name, "phone": phone}
+    # A signed payload can still carry any CBOR value; out-of-range
+    # timestamps raise OverflowError / OSError, not ValueError
+    except (OverflowError, OSError, TypeError, ValueError) as e:
+        raise ValueError(f"Corrupt offline card payload: {e}")
+    return card
+
+
+def verify_payload(payload: bytes, public_key: Optional[bytes] = None, signer=None) -> Dict:
+    """
+    Decode a payload and check its signature, either with a signer
+    (server side, any algorithm) or with an Ed25519 public key alone.
+
+    Returns {"valid", "algorithm", "key_id", "card"}; `valid` is False
+    when the signature does not match or no key for it was given. The
+    card is returned either way - responders may still want to read it.
+    """
+    algorithm, key_id, fields, signed, signature = unpack_payload(payload)
+
+    valid = False
+    if signer is not None and signer.algorithm == algorithm and signer.key_id == key_id:
+        valid = signer.verify(signed, signature)
+    elif public_key is not None and algorithm == ED25519:
+        valid = verify_ed25519(public_key, signed, signature)
+
+    return {
+        "valid": valid,
+        "algorithm": ALGORITHM_NAMES[algorithm],
+        "key_id": key_id.hex(),
+        "card": expand_fields(fields),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Decode and verify an offline emergency card QR")
+    parser.add_argument("text", help="scanned QR text, or just the base64url payload")
+    parser.add_argument("--public-key", help="base64url Ed25519 key from /api/offline-card/key")
+    args = parser.parse_args(argv)
+
+    public_key = b64url_decode(args.public_key) if args.public_key else None
+    try:
+        result = verify_payload(extract_payload(args.text), public_key=public_key)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0 if result["valid"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,86 +1,82 @@
 """
 PDF generation for physical emergency cards
+
+The static parts of each layout (border, header, footer) are drawn once
+per document as a form XObject and placed on every page with doForm();
+only the per-card text and the QR code are drawn fresh.
 """
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
 from io import BytesIO
-from typing import Dict
-import qrcode
+from typing import Dict, List, Tuple
 
+from backend.utils.qr_matrix import qr_matrix, draw_qr
 
-def generate_emergency_card_pdf(user_data: Dict, qr_data: str) -> bytes:
-    """
-    Generate a credit card-sized emergency card PDF
-    
-    Args:
-        user_data: Dictionary containing user emergency information
-        qr_data: URL or data to encode in QR code
-    
-    Returns:
-        PDF as bytes
-    """
-    buffer = BytesIO()
-    
-    # Credit card size: 3.375" x 2.125"
-    card_width = 3.375 * inch
-    card_height = 2.125 * inch
-    
-    # Create PDF with custom page size
-    c = canvas.Canvas(buffer, pagesize=(card_width, card_height))
-    
-    # Set up fonts and colors
-    c.setFillColorRGB(0.8, 0, 0)  # Red color for header
-    
+# Wallet card sizes (PDFCardRequest.card_size)
+CARD_SIZES = {
+    "credit": (3.375 * inch, 2.125 * inch),
+    "business": (3.5 * inch, 2 * inch),
+}
+
+# Wallet card layout - the text column starts right of the QR
+CARD_TEXT_X = 1.8 * inch
+CARD_QR_POSITION = (0.25 * inch, 0.4 * inch)
+CARD_QR_SIZE = 1.3 * inch
+
+
+def card_header_y(card_height: float) -> float:
+    """Baseline of the card header (the first text line sits 0.25" below)"""
+    return card_height - 0.275 * inch
+
+
+# =====================
+# Wallet card
+# =====================
+
+def _draw_card_chrome(c: canvas.Canvas, card_width: float, card_height: float) -> None:
+    """Border, header and footer - identical on every card of a size"""
     # Draw border
     c.setStrokeColorRGB(0, 0, 0)
     c.setLineWidth(2)
     c.rect(0.1*inch, 0.1*inch, card_width-0.2*inch, card_height-0.2*inch)
-    
-    # Generate QR code
-    qr = qrcode.QRCode(version=1, box_size=10, border=2)
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-    qr_img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Save QR to buffer
-    qr_buffer = BytesIO()
-    qr_img.save(qr_buffer, format='PNG')
-    qr_buffer.seek(0)
-    
-    # Draw QR code on left side
-    qr_size = 1.3 * inch
-    c.drawImage(ImageReader(qr_buffer), 0.25*inch, 0.4*inch, 
-                width=qr_size, height=qr_size)
-    
-    # Draw text information on right side
-    text_x = 1.8 * inch
-    
+
     # Header
     c.setFillColorRGB(0.8, 0, 0)
     c.setFont("Helvetica-Bold", 9)
-    c.drawString(text_x, 1.85*inch, "🚨 EMERGENCY CARD")
-    
+    c.drawString(CARD_TEXT_X, card_header_y(card_height), "🚨 EMERGENCY CARD")
+
+    # Footer text
+    c.setFont("Helvetica", 5)
+    c.setFillColorRGB(0.3, 0.3, 0.3)
+    c.drawString(0.25*inch, 0.15*inch, "Scan QR for full medical details")
+
+
+def _draw_card_fields(c: canvas.Canvas, user_data: Dict, qr_data: str, card_height: float) -> None:
+    """The per-card part: QR code and user information"""
+    # Draw QR code on left side (vector modules, no raster image)
+    draw_qr(c, qr_matrix(qr_data), *CARD_QR_POSITION, CARD_QR_SIZE)
+
     # User information
+    text_x = CARD_TEXT_X
     c.setFillColorRGB(0, 0, 0)
     c.setFont("Helvetica-Bold", 7)
-    y_position = 1.6 * inch
-    
+    y_position = card_header_y(card_height) - 0.25 * inch
+
     if user_data.get('name'):
         c.drawString(text_x, y_position, f"Name: {user_data['name']}")
         y_position -= 0.15 * inch
-    
+
     if user_data.get('blood_group'):
         c.setFillColorRGB(0.8, 0, 0)
         c.drawString(text_x, y_position, f"Blood: {user_data['blood_group']}")
         y_position -= 0.15 * inch
         c.setFillColorRGB(0, 0, 0)
-    
+
     if user_data.get('age'):
         c.drawString(text_x, y_position, f"Age: {user_data['age']}")
         y_position -= 0.15 * inch
-    
+
     # Emergency contact
     c.setFont("Helvetica-Bold", 6)
     if user_data.get('emergency_contact'):
@@ -90,72 +86,104 @@ def generate_emergency_card_pdf(user_data: Dict, qr_data: str) -> bytes:
         c.drawString(text_x, y_position, user_data['emergency_contact']['name'])
         y_position -= 0.10 * inch
         c.drawString(text_x, y_position, user_data['emergency_contact']['phone'])
-    
-    # Footer text
-    c.setFont("Helvetica", 5)
-    c.setFillColorRGB(0.3, 0.3, 0.3)
-    c.drawString(0.25*inch, 0.15*inch, "Scan QR for full medical details")
-    
+
+
+def generate_emergency_cards_pdf(cards: List[Dict], card_size: str = "credit") -> bytes:
+    """
+    Generate a wallet-card PDF with one card per page (for card printers)
+
+    Args:
+        cards: {"user_data", "qr_url"} dicts, as for print sheets
+        card_size: "credit" (3.375" x 2.125") or "business" (3.5" x 2")
+
+    Returns:
+        PDF as bytes
+    """
+    buffer = BytesIO()
+    card_width, card_height = CARD_SIZES[card_size]
+    c = canvas.Canvas(buffer, pagesize=(card_width, card_height))
+
+    # Static layout, stored once and referenced from every page
+    c.beginForm("card_chrome")
+    _draw_card_chrome(c, card_width, card_height)
+    c.endForm()
+
+    for card in cards:
+        c.doForm("card_chrome")
+        _draw_card_fields(c, card["user_data"], card["qr_url"], card_height)
+        c.showPage()
+
     c.save()
-    buffer.seek(0)
     return buffer.getvalue()
 
 
-def generate_full_page_card(user_data: Dict, qr_data: str) -> bytes:
+def generate_emergency_card_pdf(user_data: Dict, qr_data: str, card_size: str = "credit") -> bytes:
     """
-    Generate a full letter-sized page with emergency card
-    (for easy printing and cutting)
+    Generate a credit card-sized (or business card-sized) emergency card PDF
+
+    Args:
+        user_data: Dictionary containing user emergency information
+        qr_data: URL or data to encode in QR code
+        card_size: "credit" or "business"
+
+    Returns:
+        PDF as bytes
     """
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    
-    # Draw multiple cards on one page (for easy printing)
-    # You can fit about 6 credit card sized cards on a letter page
-    
-    # For simplicity, we'll just center one large card
+    return generate_emergency_cards_pdf([{"user_data": user_data, "qr_url": qr_data}], card_size)
+
+
+# =====================
+# Full page
+# =====================
+
+# Centered card on a letter page
+FULL_PAGE_CARD_SIZE = (4 * inch, 2.5 * inch)
+
+
+def _full_page_card_origin() -> Tuple[float, float]:
     page_width, page_height = letter
-    
-    # Center the card
-    card_width = 4 * inch
-    card_height = 2.5 * inch
-    x = (page_width - card_width) / 2
-    y = (page_height - card_height) / 2
-    
+    card_width, card_height = FULL_PAGE_CARD_SIZE
+    return (page_width - card_width) / 2, (page_height - card_height) / 2
+
+
+def _draw_full_page_chrome(c: canvas.Canvas) -> None:
+    """Cut lines, header and instructions"""
+    x, y = _full_page_card_origin()
+    card_width, card_height = FULL_PAGE_CARD_SIZE
+
     # Draw cut lines
     c.setDash(3, 3)
     c.setStrokeColorRGB(0.7, 0.7, 0.7)
     c.rect(x, y, card_width, card_height)
-    
-    # Similar content as above, scaled up
-    # Generate QR code
-    qr = qrcode.QRCode(version=1, box_size=10, border=2)
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-    qr_img = qr.make_image(fill_color="black", back_color="white")
-    
-    qr_buffer = BytesIO()
-    qr_img.save(qr_buffer, format='PNG')
-    qr_buffer.seek(0)
-    
+
+    c.setFillColorRGB(0.8, 0, 0)
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(x + 2.5 * inch, y + 2.2*inch, "🚨 EMERGENCY INFO CARD")
+
+    # Instructions
+    c.setFont("Helvetica-Bold", 8)
+    c.setFillColorRGB(0.3, 0.3, 0.3)
+    c.drawString(x + 0.3*inch, y - 0.3*inch,
+                 "Instructions: Cut along dotted line. Scan QR code for complete medical information.")
+
+
+def _draw_full_page_fields(c: canvas.Canvas, user_data: Dict, qr_data: str) -> None:
+    x, y = _full_page_card_origin()
+
     # Draw QR code
     qr_size = 2 * inch
-    c.drawImage(ImageReader(qr_buffer), x + 0.3*inch, y + 0.25*inch, 
-                width=qr_size, height=qr_size)
-    
+    draw_qr(c, qr_matrix(qr_data), x + 0.3*inch, y + 0.25*inch, qr_size)
+
     # Draw text
     text_x = x + 2.5 * inch
-    c.setFillColorRGB(0.8, 0, 0)
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(text_x, y + 2.2*inch, "🚨 EMERGENCY INFO CARD")
-    
     c.setFillColorRGB(0, 0, 0)
     c.setFont("Helvetica-Bold", 10)
     y_pos = y + 1.8*inch
-    
+
     if user_data.get('name'):
         c.drawString(text_x, y_pos, f"Name: {user_data['name']}")
         y_pos -= 0.2 * inch
-    
+
     if user_data.get('blood_group'):
         c.setFillColorRGB(0.8, 0, 0)
         c.setFont("Helvetica-Bold", 12)
@@ -163,11 +191,11 @@ def generate_full_page_card(user_data: Dict, qr_data: str) -> bytes:
         y_pos -= 0.25 * inch
         c.setFillColorRGB(0, 0, 0)
         c.setFont("Helvetica-Bold", 10)
-    
+
     if user_data.get('age'):
         c.drawString(text_x, y_pos, f"Age: {user_data['age']}")
         y_pos -= 0.2 * inch
-    
+
     if user_data.get('emergency_contact'):
         c.drawString(text_x, y_pos, "Emergency Contact:")
         y_pos -= 0.18 * inch
@@ -175,13 +203,32 @@ def generate_full_page_card(user_data: Dict, qr_data: str) -> bytes:
         c.drawString(text_x, y_pos, f"{user_data['emergency_contact']['name']}")
         y_pos -= 0.15 * inch
         c.drawString(text_x, y_pos, f"{user_data['emergency_contact']['phone']}")
-    
-    # Instructions
-    c.setFont("Helvetica-Bold", 8)
-    c.setFillColorRGB(0.3, 0.3, 0.3)
-    c.drawString(x + 0.3*inch, y - 0.3*inch, 
-                 "Instructions: Cut along dotted line. Scan QR code for complete medical information.")
-    
+
+
+def generate_full_page_cards(cards: List[Dict]) -> bytes:
+    """
+    Generate letter-sized pages with one large centered card each
+    (for easy printing and cutting)
+    """
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+
+    c.beginForm("full_page_chrome")
+    _draw_full_page_chrome(c)
+    c.endForm()
+
+    for card in cards:
+        c.doForm("full_page_chrome")
+        _draw_full_page_fields(c, card["user_data"], card["qr_url"])
+        c.showPage()
+
     c.save()
-    buffer.seek(0)
     return buffer.getvalue()
+
+
+def generate_full_page_card(user_data: Dict, qr_data: str) -> bytes:
+    """
+    Generate a full letter-sized page with emergency card
+    (for easy printing and cutting)
+    """
+    return generate_full_page_cards([{"user_data": user_data, "qr_url": qr_data}])
@@ -0,0 +1,148 @@
+"""
+Minimal streaming PDF writer for multi-page print sheets
+
+reportlab keeps a whole document in memory until save(); this writer
+emits the file incrementally - header, then one content stream + page
+object per page, then the page tree and xref - so a thousand-page sheet
+needs no more memory than one page. Pages use the standard Helvetica
+fonts (no embedding) and raw content-stream operators.
+
+Content that repeats on every card (border, header, cut marks) can be
+registered as a form XObject: written once after the fonts, then placed
+with "/Name Do" for the cost of a few bytes each time.
+"""
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+Rect = Tuple[float, float, float, float]
+
+# Resource names used by content streams
+FONT_REGULAR = "F1"
+FONT_BOLD = "F2"
+
+_FONTS = {FONT_REGULAR: "Helvetica", FONT_BOLD: "Helvetica-Bold"}
+
+
+def pdf_string(text: str) -> bytes:
+    """Encode text as a PDF literal string (WinAnsi / Latin-1, escaped)"""
+    data = text.encode("latin-1", errors="replace")
+    data = data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+    return b"(" + data + b")"
+
+
+def compress_content(content: bytes) -> bytes:
+    """Deflate a content stream (done by render workers, not the writer)"""
+    return zlib.compress(content, 6)
+
+
+class StreamingPDFWriter:
+    """
+    Write a PDF piece by piece.
+
+    Object 1 is the catalog, 2 the page tree and 3.. the fonts; page
+    objects are allocated as pages arrive and reference the page tree,
+    which is written last once all kids are known.
+
+    `forms` maps resource names to (bounding box, content stream) pairs;
+    they are written by begin() and available to every page.
+    """
+
+    def __init__(self, page_size: Tuple[float, float], forms: Optional[Dict[str, Tuple[Rect, bytes]]] = None):
+        self.page_size = page_size
+        self.forms = forms or {}
+        self._offset = 0
+        self._offsets: Dict[int, int] = {}
+        self._pages: List[int] = []
+        self._next_id = 3
+        self._font_ids: Dict[str, int] = {}
+        self._form_ids: Dict[str, int] = {}
+
+    def _allocate(self) -> int:
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _emit(self, data: bytes) -> bytes:
+        self._offset += len(data)
+        return data
+
+    def _object(self, obj_id: int, body: bytes) -> bytes:
+        self._offsets[obj_id] = self._offset
+        return self._emit(b"%d 0 obj\n" % obj_id + body + b"\nendobj\n")
+
+    def _stream_object(self, obj_id: int, dictionary: bytes, data: bytes) -> bytes:
+        body = (
+            b"<< " + dictionary + b" /Length %d >>\nstream\n" % len(data) +
+            data + b"\nendstream"
+        )
+        return self._object(obj_id, body)
+
+    def _resources(self, forms: bool = True) -> bytes:
+        fonts = b" ".join(
+            b"/%s %d 0 R" % (name.encode(), obj_id) for name, obj_id in self._font_ids.items()
+        )
+        resources = b"<< /Font << " + fonts + b" >>"
+        if forms and self._form_ids:
+            resources += b" /XObject << " + b" ".join(
+                b"/%s %d 0 R" % (name.encode(), obj_id) for name, obj_id in self._form_ids.items()
+            ) + b" >>"
+        return resources + b" >>"
+
+    def begin(self) -> bytes:
+        """Header, font and form objects"""
+        chunks = [self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")]
+
+        for name, base_font in _FONTS.items():
+            obj_id = self._allocate()
+            self._font_ids[name] = obj_id
+            chunks.append(self._object(
+                obj_id,
+                b"<< /Type /Font /Subtype /Type1 /BaseFont /%s "
+                b"/Encoding /WinAnsiEncoding >>" % base_font.encode()
+            ))
+
+        for name, (bbox, content) in self.forms.items():
+            obj_id = self._allocate()
+            self._form_ids[name] = obj_id
+            chunks.append(self._stream_object(
+                obj_id,
+                b"/Type /XObject /Subtype /Form /BBox [%.2f %.2f %.2f %.2f] /Resources %s "
+                b"/Filter /FlateDecode" % (*bbox, self._resources(forms=False)),
+                compress_content(content)
+            ))
+
+        return b"".join(chunks)
+
+    def add_page(self, compressed_content: bytes) -> bytes:
+        """One page from an already deflated content stream"""
+        content_id = self._allocate()
+        page_id = self._allocate()
+        self._pages.append(page_id)
+
+        width, height = self.page_size
+        return self._stream_object(
+            content_id, b"/Filter /FlateDecode", compressed_content
+        ) + self._object(
+            page_id,
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] "
+            b"/Resources %s /Contents %d 0 R >>" % (width, height, self._resources(), content_id)
+        )
+
+    def finish(self) -> bytes:
+        """Page tree, catalog, cross-reference table and trailer"""
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self._pages)
+        chunks = [
+            self._object(2, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(self._pages)),
+            self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>"),
+        ]
+
+        xref_offset = self._offset
+        size = self._next_id
+        xref = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        for obj_id in range(1, size):
+            xref.append(b"%010d 00000 n \n" % self._offsets[obj_id])
+        xref.append(
+            b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref_offset)
+        )
+        chunks.append(self._emit(b"".join(xref)))
+        return b"".join(chunks)
@@ -0,0 +1,306 @@
+"""
+Write-through pre-rendering of card artifacts
+
+When a profile or its contacts change, the write endpoints queue the
+card's public_id. A background thread renders the new version's HTML
+(with its precompressed variants), PNG / SVG QR code and PDF once, in the
+render pool, and stores them under that version. The public read
+endpoints serve the stored artifacts; they only render on a miss (a card
+not re-rendered since deploy, or evicted), which also queues the card.
+
+Each card has a small manifest with its current version and artifact
+keys, so the previous version's artifacts are deleted as soon as the new
+ones are stored.
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from backend.config import settings
+from backend.models.database import SessionLocal
+from backend.utils.artifact_store import content_key, make_artifact_store
+from backend.utils.card_artifacts import render_card_artifacts
+from backend.utils.card_template import RenderedBody, get_rendered_card, served_codings
+from backend.utils.public_card import build_public_card, card_print_data, load_public_profile
+from backend.utils.render_service import render_service
+from backend.utils.security import card_signer
+from backend.utils.short_link import card_qr_data
+
+logger = logging.getLogger(__name__)
+
+# Part of every card version - bump it when a layout changes
+LAYOUT_VERSION = 1
+
+# Settings that change what a card renders to, besides its data
+RENDER_FINGERPRINT = content_key(
+    LAYOUT_VERSION,
+    settings.FRONTEND_URL,
+    settings.QR_SHORT_LINKS,
+    settings.QR_SHORT_BASE_URL,
+    settings.OFFLINE_QR,
+    card_signer.key_id.hex(),
+    settings.HTML_PRECOMPRESS,
+)
+
+
+def card_version(entry: Dict) -> str:
+    """Version of a card entry's artifacts (its ETag + render settings)"""
+    version = entry.get("version")
+    if version is None:
+        version = entry["version"] = content_key(entry["etag"], RENDER_FINGERPRINT)[:16]
+    return version
+
+
+def artifact_key(public_id: str, version: str, kind: str) -> str:
+    return content_key("card", public_id, version, kind)
+
+
+def manifest_key(public_id: str) -> str:
+    return content_key("card-manifest", public_id)
+
+
+class PrerenderPipeline:
+    """
+    Render card artifacts in a background thread, one card at a time.
+
+    The queue holds public_ids, so a card changed several times before
+    its turn is rendered once, at its latest version. When the queue is
+    full new cards are dropped and counted; their artifacts are then
+    rendered on the first read instead.
+    """
+
+    def __init__(self, store, max_queue: int, enabled: bool = True):
+        self.store = store
+        self.max_queue = max_queue
+        self.enabled = enabled
+
+        self._queue: "OrderedDict[str, None]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.rendered = 0
+        self.current = 0
+        self.removed = 0
+        self.collected = 0
+        self.failed = 0
+        self.hits = 0
+        self.misses = 0
+
+    # -------------------------------------------------
+    # Producer side (write endpoints, read misses)
+    # -------------------------------------------------
+    def submit(self, public_id: str) -> bool:
+        """Queue a card for pre-rendering; returns False if it was dropped"""
+        if not self.enabled:
+            return False
+
+        with self._cond:
+            if public_id in self._queue:
+                return True
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                return False
+
+            self._queue[public_id] = None
+            self.enqueued += 1
+            self._cond.notify()
+        return True
+
+    # -------------------------------------------------
+    # Read side
+    # -------------------------------------------------
+    def get(self, entry: Dict, kind: str) -> Optional[bytes]:
+        """A stored artifact of the entry's version; a miss queues the card"""
+        if not self.enabled:
+            return None
+
+        data = self.store.get(artifact_key(entry["public_id"], card_version(entry), kind))
+        if data is None:
+            self.misses += 1
+            self.submit(entry["public_id"])
+        else:
+            self.hits += 1
+        return data
+
+    def rendered_card(self, entry: Dict) -> RenderedBody:
+        """
+        The entry's HTML with its precompressed variants - from the store
+        when pre-rendered, otherwise rendered now (get_rendered_card).
+        Kept on the entry either way, like get_rendered_card does.
+        """
+        rendered = entry.get("html")
+        if rendered is not None:
+            return rendered
+
+        body = self.get(entry, "html")
+        if body is None:
+            return get_rendered_card(entry)
+
+        rendered = RenderedBody(body, precompress=False)
+        for coding in served_codings():
+            variant = self.store.get(artifact_key(entry["public_id"], card_version(entry), f"html.{coding}"))
+            if variant is None:
+                # Evicted or not stored yet; a partial body would fail requests for that coding
+                return get_rendered_card(entry)
+            rendered.encoded[coding] = variant
+
+        entry["html"] = rendered
+        return rendered
+
+    # -------------------------------------------------
+    # Rendering and garbage collection
+    # -------------------------------------------------
+    def _manifest(self, public_id: str) -> Optional[Dict[str, Any]]:
+        data = self.store.get(manifest_key(public_id))
+        return json.loads(data) if data else None
+
+    def _is_current(self, public_id: str, manifest: Optional[Dict[str, Any]], version: str) -> bool:
+        if not manifest or manifest["version"] != version:
+            return False
+        # artifacts can be evicted from under their manifest
+        return all(
+            self.store.get(artifact_key(public_id, version, kind)) is not None
+            for kind in manifest["kinds"]
+        )
+
+    def _delete_version(self, public_id: str, manifest: Optional[Dict[str, Any]]) -> None:
+        if not manifest:
+            return
+        for kind in manifest["kinds"]:
+            self.store.delete(artifact_key(public_id, manifest["version"], kind))
+            self.collected += 1
+
+    def render(self, public_id: str) -> str:
+        """
+        Bring one card's artifacts up to date; returns "rendered",
+        "current" (nothing to do) or "removed" (the card no longer exists)
+        """
+        db = SessionLocal()
+        try:
+            profile = load_public_profile(public_id, db)
+            entry = build_public_card(profile, profile.user.emergency_contacts) if profile else None
+        finally:
+            db.close()
+
+        manifest = self._manifest(public_id)
+        if entry is None:
+            self._delete_version(public_id, manifest)
+            self.store.delete(manifest_key(public_id))
+            self.removed += 1
+            return "removed"
+
+        version = card_version(entry)
+        if self._is_current(public_id, manifest, version):
+            self.current += 1
+            return "current"
+
+        artifacts = render_service.call(
+            render_card_artifacts, entry["card"], card_print_data(entry), card_qr_data(entry)
+        )
+        for kind, data in artifacts.items():
+            self.store.put(artifact_key(public_id, version, kind), data)
+        self.store.put(
+            manifest_key(public_id),
+            json.dumps({"version": version, "kinds": sorted(artifacts)}).encode()
+        )
+
+        if manifest and manifest["version"] != version:
+            self._delete_version(public_id, manifest)
+
+        self.rendered += 1
+        return "rendered"
+
+    # -------------------------------------------------
+    # Background thread
+    # -------------------------------------------------
+    def start(self) -> None:
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run,
+            name="prerender-pipeline",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop after the card in progress; queued cards render on first read"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def drain(self) -> int:
+        """Render every queued card now; returns the number processed"""
+        processed = 0
+        while True:
+            public_id = self._take()
+            if public_id is None:
+                return processed
+            self._process(public_id)
+            processed += 1
+
+    def _take(self) -> Optional[str]:
+        with self._cond:
+            if not self._queue:
+                return None
+            public_id, _ = self._queue.popitem(last=False)
+            return public_id
+
+    def _process(self, public_id: str) -> None:
+        try:
+            self.render(public_id)
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"❌ Pre-render of card {public_id} failed: {e}")
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopping and not self._queue:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+
+            public_id = self._take()
+            if public_id is not None:
+                self._process(public_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            queued = len(self._queue)
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "queued": queued,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "rendered": self.rendered,
+            "current": self.current,
+            "removed": self.removed,
+            "collected": self.collected,
+            "failed": self.failed,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "store": self.store.stats(),
+        }
+
+
+# Singleton instance (started/stopped by main.py)
+prerender_pipeline = PrerenderPipeline(
+    store=make_artifact_store(settings.PRERENDER_MAX_BYTES, settings.PRERENDER_DIR),
+    max_queue=settings.PRERENDER_QUEUE_SIZE,
+    enabled=settings.PRERENDER_ENABLED
+)
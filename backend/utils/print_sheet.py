@@ -0,0 +1,228 @@
+"""
+Multi-card print sheets - imposition of credit- or business-card-sized
+emergency cards on letter pages, with cut marks
+
+Each card's static chrome (cut marks, border, header, footer) is one
+form XObject per document; a card on the page is that form plus its own
+text and QR code, drawn in card coordinates.
+"""
+from concurrent.futures import Executor
+from collections import deque
+from functools import partial
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from backend.utils.pdf_stream import (
+    FONT_BOLD,
+    FONT_REGULAR,
+    Rect,
+    StreamingPDFWriter,
+    compress_content,
+    pdf_string
+)
+from backend.utils.pdf_generator import (
+    CARD_QR_POSITION,
+    CARD_QR_SIZE,
+    CARD_SIZES,
+    CARD_TEXT_X,
+    card_header_y
+)
+from backend.utils.qr_matrix import qr_matrix, qr_pdf_ops
+
+# Credit card size: 3.375" x 2.125"
+CARD_SIZE = CARD_SIZES["credit"]
+PAGE_SIZE = letter
+PAGE_MARGIN = 0.5 * inch
+GUTTER = 0.25 * inch
+CUT_MARK_LENGTH = 0.09 * inch
+CUT_MARK_OFFSET = 0.03 * inch
+
+# Form XObject resource name for the card chrome
+CARD_FORM = "Card"
+
+_FONT_NAMES = {FONT_REGULAR: "Helvetica", FONT_BOLD: "Helvetica-Bold"}
+
+
+def card_positions(page_size=PAGE_SIZE, card_size=CARD_SIZE) -> List[Tuple[float, float]]:
+    """Bottom-left corners of every card slot on a page, top row first"""
+    page_width, page_height = page_size
+    card_width, card_height = card_size
+
+    cols = int((page_width - 2 * PAGE_MARGIN + GUTTER) // (card_width + GUTTER))
+    rows = int((page_height - 2 * PAGE_MARGIN + GUTTER) // (card_height + GUTTER))
+
+    grid_width = cols * card_width + (cols - 1) * GUTTER
+    grid_height = rows * card_height + (rows - 1) * GUTTER
+    left = (page_width - grid_width) / 2
+    top = (page_height + grid_height) / 2
+
+    return [
+        (left + col * (card_width + GUTTER), top - (row + 1) * card_height - row * GUTTER)
+        for row in range(rows)
+        for col in range(cols)
+    ]
+
+
+CARDS_PER_PAGE = len(card_positions())
+
+# Cards loaded (and decrypted) per query by the sheet builders - a whole
+# number of pages
+CARDS_PER_QUERY = CARDS_PER_PAGE * 25
+
+
+def cards_per_page(card_size: str = "credit") -> int:
+    return len(card_positions(card_size=CARD_SIZES[card_size]))
+
+
+# -----------------------------------------------------
+# Content-stream drawing helpers
+# -----------------------------------------------------
+def _text(x: float, y: float, font: str, size: float, text: str, max_width: float) -> bytes:
+    font_name = _FONT_NAMES[font]
+    while text and stringWidth(text, font_name, size) > max_width:
+        text = text[:-1]
+    return b"BT /%s %.1f Tf %.2f %.2f Td %s Tj ET\n" % (
+        font.encode(), size, x, y, pdf_string(text)
+    )
+
+
+def _cut_marks(x: float, y: float, width: float, height: float) -> bytes:
+    ops = []
+    for cx, dx in ((x, -1), (x + width, 1)):
+        for cy, dy in ((y, -1), (y + height, 1)):
+            # horizontal then vertical tick, both pointing away from the card
+            ops.append(b"%.2f %.2f m %.2f %.2f l\n" % (
+                cx + dx * CUT_MARK_OFFSET, cy, cx + dx * (CUT_MARK_OFFSET + CUT_MARK_LENGTH), cy
+            ))
+            ops.append(b"%.2f %.2f m %.2f %.2f l\n" % (
+                cx, cy + dy * CUT_MARK_OFFSET, cx, cy + dy * (CUT_MARK_OFFSET + CUT_MARK_LENGTH)
+            ))
+    return b"0 0 0 RG 0.5 w\n" + b"".join(ops) + b"S\n"
+
+
+def card_chrome(card_size: str = "credit") -> Tuple[Rect, bytes]:
+    """
+    (bounding box, content) of the form drawn under every card: cut
+    marks, border, header and footer, with the card's corner at 0, 0
+    """
+    width, height = CARD_SIZES[card_size]
+    text_width = width - CARD_TEXT_X - 0.15 * inch
+    reach = CUT_MARK_OFFSET + CUT_MARK_LENGTH
+
+    content = b"".join([
+        _cut_marks(0, 0, width, height),
+        b"q 0 0 0 RG 1 w %.2f %.2f %.2f %.2f re S Q\n" % (
+            0.1 * inch, 0.1 * inch, width - 0.2 * inch, height - 0.2 * inch
+        ),
+        b"0.8 0 0 rg\n",
+        _text(CARD_TEXT_X, card_header_y(height), FONT_BOLD, 9, "EMERGENCY CARD", text_width),
+        b"0.3 0.3 0.3 rg\n",
+        _text(0.25 * inch, 0.15 * inch, FONT_REGULAR, 5,
+              "Scan QR for full medical details", width - 0.5 * inch),
+    ])
+    return (-reach, -reach, width + reach, height + reach), content
+
+
+def _card(x: float, y: float, user_data: Dict, qr_url: str, card_size: str) -> bytes:
+    """One card, laid out like generate_emergency_card_pdf()"""
+    width, height = CARD_SIZES[card_size]
+    text_x = CARD_TEXT_X
+    text_width = width - CARD_TEXT_X - 0.15 * inch
+
+    ops = [
+        b"q 1 0 0 1 %.2f %.2f cm /%s Do\n" % (x, y, CARD_FORM.encode()),
+        qr_pdf_ops(qr_matrix(qr_url), *CARD_QR_POSITION, CARD_QR_SIZE),
+        b"0 0 0 rg\n",
+    ]
+
+    y_position = card_header_y(height) - 0.25 * inch
+    if user_data.get("name"):
+        ops.append(_text(text_x, y_position, FONT_BOLD, 7, f"Name: {user_data['name']}", text_width))
+        y_position -= 0.15 * inch
+
+    if user_data.get("blood_group"):
+        ops.append(b"0.8 0 0 rg\n")
+        ops.append(_text(text_x, y_position, FONT_BOLD, 7, f"Blood: {user_data['blood_group']}", text_width))
+        ops.append(b"0 0 0 rg\n")
+        y_position -= 0.15 * inch
+
+    if user_data.get("age"):
+        ops.append(_text(text_x, y_position, FONT_BOLD, 7, f"Age: {user_data['age']}", text_width))
+        y_position -= 0.15 * inch
+
+    contact = user_data.get("emergency_contact")
+    if contact:
+        ops.append(_text(text_x, y_position, FONT_BOLD, 6, "Emergency Contact:", text_width))
+        y_position -= 0.12 * inch
+        ops.append(_text(text_x, y_position, FONT_REGULAR, 6, contact["name"], text_width))
+        y_position -= 0.10 * inch
+        ops.append(_text(text_x, y_position, FONT_REGULAR, 6, contact["phone"], text_width))
+
+    ops.append(b"Q\n")
+    return b"".join(ops)
+
+
+def render_sheet_page(cards: List[Dict], card_size: str = "credit") -> bytes:
+    """
+    Deflated content stream for one sheet page.
+
+    `cards` holds up to cards_per_page() {"user_data", "qr_url"} dicts.
+    Pure CPU work on picklable data, so pages render in the process pool.
+    """
+    positions = card_positions(card_size=CARD_SIZES[card_size])
+    ops = [
+        _card(x, y, card["user_data"], card["qr_url"], card_size)
+        for (x, y), card in zip(positions, cards)
+    ]
+    return compress_content(b"".join(ops))
+
+
+def sheet_writer(card_size: str = "credit") -> StreamingPDFWriter:
+    """A letter-page writer with the card chrome form registered"""
+    return StreamingPDFWriter(PAGE_SIZE, forms={CARD_FORM: card_chrome(card_size)})
+
+
+def paginate(cards: Iterable[Dict], per_page: int = CARDS_PER_PAGE) -> Iterator[List[Dict]]:
+    """Group cards into per-page lists"""
+    page = []
+    for card in cards:
+        page.append(card)
+        if len(page) == per_page:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def write_print_sheet(
+    cards: Iterable[Dict],
+    out: BinaryIO,
+    executor: Executor,
+    window: int = 8,
+    card_size: str = "credit"
+) -> int:
+    """
+    Render a sheet into `out`, keeping at most `window` pages in flight on
+    `executor`; returns the number of pages written.
+    """
+    writer = sheet_writer(card_size)
+    out.write(writer.begin())
+
+    render_page = partial(render_sheet_page, card_size=card_size)
+    in_flight = deque()
+    pages = 0
+    for page in paginate(cards, cards_per_page(card_size)):
+        in_flight.append(executor.submit(render_page, page))
+        if len(in_flight) >= window:
+            out.write(writer.add_page(in_flight.popleft().result()))
+            pages += 1
+
+    while in_flight:
+        out.write(writer.add_page(in_flight.popleft().result()))
+        pages += 1
+
+    out.write(writer.finish())
+    return pages
@@ -0,0 +1,208 @@
+"""
+Public emergency card assembly (shared by the public endpoints)
+"""
+import hashlib
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+from sqlalchemy.orm import Session, joinedload
+
+from backend.models.database import User, EmergencyProfile, EmergencyContact
+from backend.utils.security import encryptor
+from backend.utils.card_cache import card_cache
+
+
+def card_validators(profile: EmergencyProfile, contacts: List[EmergencyContact]) -> Dict:
+    """
+    Return the card's identity and HTTP validators without decrypting
+    anything.
+
+    The ETag covers the profile's updated_at and the set of contacts, so
+    adding or removing a contact changes it even for rows written before
+    contact changes started touching the profile.
+    """
+    last_modified = profile.updated_at or profile.created_at or datetime(1970, 1, 1)
+    for c in contacts:
+        if c.created_at and c.created_at > last_modified:
+            last_modified = c.created_at
+
+    fingerprint = "|".join(
+        [profile.public_id, last_modified.isoformat()] +
+        [f"{c.id}:{c.priority}" for c in contacts]
+    )
+    return {
+        "public_id": profile.public_id,
+        "user_id": profile.user_id,
+        "etag": '"' + hashlib.sha256(fingerprint.encode()).hexdigest()[:32] + '"',
+        "last_modified": last_modified,
+    }
+
+
+def build_public_card(profile: EmergencyProfile, contacts: List[EmergencyContact]) -> Dict:
+    """
+    Apply the profile's visibility flags, decrypt the medical fields and
+    return the cacheable card entry.
+
+    `card` matches the PublicEmergencyCard schema; `user_id`, `etag`,
+    `last_modified` and `loaded_at` (when it was read from the database)
+    are kept alongside it for logging, HTTP validators and degraded mode,
+    and are never sent to clients.
+    """
+    entry = card_validators(profile, contacts)
+    entry["loaded_at"] = time.time()
+    entry["card"] = {
+        "full_name": profile.full_name if profile.show_name else None,
+        "age": profile.age if profile.show_age else None,
+        "blood_group": profile.blood_group if profile.show_blood_group else None,
+        "allergies": encryptor.decrypt_json(profile.allergies)
+        if profile.show_allergies else None,
+        "medical_conditions": encryptor.decrypt_json(profile.medical_conditions)
+        if profile.show_conditions else None,
+        "medications": encryptor.decrypt_json(profile.medications)
+        if profile.show_medications else None,
+        "organ_donor": profile.organ_donor,
+        "emergency_contacts": [
+            {
+                "name": c.name,
+                "relation": c.relation,
+                "phone": c.phone,
+                "priority": c.priority
+            } for c in contacts
+        ]
+    }
+    return entry
+
+
+def load_public_profile(public_id: str, db: Session) -> Optional[EmergencyProfile]:
+    """
+    Load a profile together with its owner's contacts (ordered by
+    priority) in a single joined query.
+    """
+    return (
+        db.query(EmergencyProfile)
+        .options(
+            joinedload(EmergencyProfile.user)
+            .joinedload(User.emergency_contacts)
+        )
+        .filter(EmergencyProfile.public_id == public_id)
+        .first()
+    )
+
+
+def load_public_cards(public_ids: List[str], db: Session) -> List[Dict]:
+    """
+    Build card entries for a batch of public_ids in one joined query,
+    in the order given (unknown ids are skipped, repeats are kept).
+
+    Used for bulk work, so the entries bypass card_cache rather than
+    evicting the cards that are actually being scanned.
+    """
+    profiles = (
+        db.query(EmergencyProfile)
+        .options(
+            joinedload(EmergencyProfile.user)
+            .joinedload(User.emergency_contacts)
+        )
+        .filter(EmergencyProfile.public_id.in_(set(public_ids)))
+        .all()
+    )
+    entries = {
+        p.public_id: build_public_card(p, p.user.emergency_contacts) for p in profiles
+    }
+    return [entries[public_id] for public_id in public_ids if public_id in entries]
+
+
+def missing_public_ids(public_ids: List[str], db: Session, chunk_size: int = 500) -> Set[str]:
+    """Return the public_ids that have no emergency profile"""
+    wanted = set(public_ids)
+    found = set()
+    ids = list(wanted)
+    for start in range(0, len(ids), chunk_size):
+        rows = (
+            db.query(EmergencyProfile.public_id)
+            .filter(EmergencyProfile.public_id.in_(ids[start:start + chunk_size]))
+            .all()
+        )
+        found.update(row.public_id for row in rows)
+    return wanted - found
+
+
+def primary_contact(entry: Dict) -> Optional[Dict]:
+    """Return the priority-1 contact of a card entry, if any"""
+    for contact in entry["card"]["emergency_contacts"]:
+        if contact["priority"] == 1:
+            return contact
+    return None
+
+
+def card_print_data(entry: Dict) -> Dict:
+    """The user_data dict the PDF renderers take, from a card entry"""
+    card = entry["card"]
+    contact = primary_contact(entry)
+    return {
+        "name": card["full_name"],
+        "blood_group": card["blood_group"],
+        "age": card["age"],
+        "emergency_contact": {
+            "name": contact["name"] if contact else "N/A",
+            "phone": contact["phone"] if contact else "N/A"
+        }
+    }
+
+
+def fetch_public_card(
+    public_id: str,
+    db: Session,
+    is_current: Optional[Callable[[Dict], bool]] = None
+) -> Optional[Dict]:
+    """
+    Load and assemble the card for public_id from the database (no
+    card_cache lookup) and cache the result; None if it does not exist.
+
+    `is_current` is asked whether the client's copy is still valid; if
+    so the medical fields are not decrypted and the returned entry
+    carries only the validators (no `card` key).
+    """
+    # Read first: an edit committed during the load invalidates it
+    generation = card_cache.generation(public_id)
+    profile = load_public_profile(public_id, db)
+
+    if not profile:
+        return None
+
+    contacts = profile.user.emergency_contacts
+
+    if is_current is not None:
+        validators = card_validators(profile, contacts)
+        if is_current(validators):
+            return validators
+
+    entry = build_public_card(profile, contacts)
+    card_cache.set(public_id, entry, generation)
+    return entry
+
+
+def get_public_card(
+    public_id: str,
+    db: Session,
+    is_current: Optional[Callable[[Dict], bool]] = None
+) -> Optional[Dict]:
+    """
+    Return the assembled card entry for public_id, or None if the card
+    does not exist. Served from card_cache when possible, otherwise
+    loaded with fetch_public_card.
+    """
+    entry = card_cache.get(public_id)
+    if entry is not None:
+        return entry
+
+    return fetch_public_card(public_id, db, is_current)
+
+
+async def get_public_card_async(public_id: str, db) -> Optional[Dict]:
+    """get_public_card for async routes (db: AsyncSession or SyncSessionAdapter)"""
+    entry = card_cache.get(public_id)
+    if entry is not None:
+        return entry
+
+    return await db.run_sync(lambda session: fetch_public_card(public_id, session))
@@ -2,39 +2,99 @@
 QR Code generation utilities
 """
 import qrcode
-from io import BytesIO
 import base64
-from typing import Tuple
+from typing import Dict, Tuple
 
+from backend.utils.artifact_store import content_key, qr_cache
+from backend.utils.qr_matrix import qr_matrix, qr_png, qr_svg
+from backend.utils.render_service import render_service
 
-def generate_qr_code(data: str, size: int = 10) -> Tuple[str, bytes]:
+ERROR_LEVELS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+
+MODE_NAMES = {
+    qrcode.util.MODE_NUMBER: "numeric",
+    qrcode.util.MODE_ALPHA_NUM: "alphanumeric",
+    qrcode.util.MODE_8BIT_BYTE: "byte",
+    qrcode.util.MODE_KANJI: "kanji",
+}
+
+QR_MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def qr_cache_key(data: str, size: int = 10, error_level: str = "H", border: int = 4, fmt: str = "png") -> str:
+    """Content address of a rendered QR image (see artifact_store.qr_cache)"""
+    return content_key("qr", data, size, error_level, border, fmt)
+
+
+def qr_version(data: str) -> str:
+    """
+    Version token for QR image URLs. Images depend only on what they
+    encode (plus size / format, which are in the URL as well), so the
+    token changes exactly when the encoded URL does.
+    """
+    return content_key("qr", data)[:16]
+
+
+def qr_info(data: str, error_level: str = "H") -> Dict:
+    """
+    Smallest QR version that holds `data` at `error_level`, its size in
+    modules (without the quiet zone) and the encoding modes used.
+    Cheap: only sizes the data, nothing is rendered.
+    """
+    qr = qrcode.QRCode(error_correction=ERROR_LEVELS[error_level])
+    qr.add_data(data)
+    version = qr.best_fit()
+    return {
+        "version": version,
+        "modules": version * 4 + 17,
+        "error_level": error_level,
+        "modes": sorted({MODE_NAMES[chunk.mode] for chunk in qr.data_list}),
+    }
+
+
+def render_qr_image(data: str, size: int = 10, error_level: str = "H", border: int = 4, fmt: str = "png") -> bytes:
+    """
+    Render a QR image as a 1-bit PNG (`size` pixels per module) or an
+    SVG (`size` sets its default pixel size).
+    """
+    matrix = qr_matrix(data, ERROR_LEVELS[error_level], border)
+    if fmt == "svg":
+        return qr_svg(matrix, size * len(matrix)).encode("utf-8")
+    return qr_png(matrix, size)
+
+
+async def get_qr_image(data: str, size: int = 10, fmt: str = "png") -> Tuple[str, bytes]:
+    """
+    Return (cache key, image bytes), rendering in the render pool only
+    when neither cache tier has the image yet.
+    """
+    key = qr_cache_key(data, size, fmt=fmt)
+    image = qr_cache.get(key)
+    if image is None:
+        image = await render_service.run(render_qr_image, data, size, "H", 4, fmt)
+        qr_cache.put(key, image)
+    return key, image
+
+
+def generate_qr_code(data: str, size: int = 10, error_level: str = "H", border: int = 4) -> Tuple[str, bytes]:
     """
     Generate QR code for given data
     
     Args:
         data: URL or text to encode in QR code
         size: Size of QR code (default: 10)
+        error_level: Error correction level, L / M / Q / H (default: H)
+        border: Quiet zone in modules (default: 4)
     
     Returns:
         Tuple of (base64_encoded_image, raw_bytes)
     """
-    # Create QR code
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=size,
-        border=4,
-    )
-    qr.add_data(data)
-    qr.make(fit=True)
-    
-    # Create image
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Convert to bytes
-    buffer = BytesIO()
-    img.save(buffer, format='PNG')
-    img_bytes = buffer.getvalue()
+    img_bytes = render_qr_image(data, size, error_level, border)
     
     # Convert to base64 for easy transfer
     img_base64 = base64.b64encode(img_bytes).decode('utf-8')
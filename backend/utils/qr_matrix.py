@@ -0,0 +1,118 @@
+"""
+QR module matrix, drawn as vectors (reportlab canvas, raw PDF operators,
+SVG) or encoded as a 1-bit PNG
+
+The matrix is computed once per (data, error correction, border) and
+shared by every output format, so no PNG is encoded and decoded again
+on the way into a PDF.
+"""
+import struct
+import zlib
+from functools import lru_cache
+from typing import List, Tuple
+
+import qrcode
+from qrcode.constants import ERROR_CORRECT_M
+
+Matrix = Tuple[Tuple[bool, ...], ...]
+
+
+@lru_cache(maxsize=512)
+def qr_matrix(data: str, error_correction: int = ERROR_CORRECT_M, border: int = 2) -> Matrix:
+    """Module matrix (True = dark) including the quiet-zone border"""
+    qr = qrcode.QRCode(version=1, error_correction=error_correction, box_size=1, border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return tuple(tuple(row) for row in qr.get_matrix())
+
+
+def module_runs(matrix: Matrix) -> List[Tuple[int, int, int]]:
+    """Horizontal runs of dark modules as (row, first column, length)"""
+    runs = []
+    for row_index, row in enumerate(matrix):
+        col = 0
+        while col < len(row):
+            if not row[col]:
+                col += 1
+                continue
+            start = col
+            while col < len(row) and row[col]:
+                col += 1
+            runs.append((row_index, start, col - start))
+    return runs
+
+
+def draw_qr(c, matrix: Matrix, x: float, y: float, size: float) -> None:
+    """Draw the matrix on a reportlab canvas as one filled path"""
+    module = size / len(matrix)
+    path = c.beginPath()
+    for row, col, length in module_runs(matrix):
+        path.rect(x + col * module, y + size - (row + 1) * module, length * module, module)
+
+    c.saveState()
+    c.setFillColorRGB(0, 0, 0)
+    c.drawPath(path, stroke=0, fill=1)
+    c.restoreState()
+
+
+def qr_pdf_ops(matrix: Matrix, x: float, y: float, size: float) -> bytes:
+    """The same path as raw PDF content-stream operators"""
+    module = size / len(matrix)
+    ops = [b"0 0 0 rg\n"]
+    for row, col, length in module_runs(matrix):
+        ops.append(b"%.3f %.3f %.3f %.3f re\n" % (
+            x + col * module, y + size - (row + 1) * module, length * module, module
+        ))
+    ops.append(b"f\n")
+    return b"".join(ops)
+
+
+def qr_svg(matrix: Matrix, size: int = 0) -> str:
+    """
+    Standalone SVG document in module units (scales without blurring).
+    `size` sets width/height in pixels; 0 leaves sizing to the page.
+    """
+    n = len(matrix)
+    d = "".join(f"M{col} {row}h{length}v1h-{length}z" for row, col, length in module_runs(matrix))
+    dimensions = f' width="{size}" height="{size}"' if size else ""
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {n} {n}"{dimensions} '
+        f'shape-rendering="crispEdges">'
+        f'<rect width="{n}" height="{n}" fill="#fff"/>'
+        f'<path d="{d}" fill="#000"/></svg>'
+    )
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def qr_png(matrix: Matrix, scale: int = 10) -> bytes:
+    """
+    1-bit grayscale PNG, `scale` pixels per module.
+
+    Each module row is written once; the scale - 1 repeats use the PNG
+    "Up" filter, which turns them into all-zero bytes that deflate to
+    almost nothing.
+    """
+    width = len(matrix) * scale
+    row_bytes = (width + 7) // 8
+    repeat = (b"\x02" + bytes(row_bytes)) * (scale - 1)
+
+    raw = bytearray()
+    for row in matrix:
+        line = bytearray(row_bytes)
+        for col, dark in enumerate(row):
+            if dark:
+                continue
+            # white module: set its `scale` bits (1 = white in grayscale)
+            for i in range(col * scale, (col + 1) * scale):
+                line[i >> 3] |= 0x80 >> (i & 7)
+        raw += b"\x00" + line + repeat
+
+    return (
+        b"\x89PNG\r\n\x1a\n" +
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, width, 1, 0, 0, 0, 0)) +
+        _png_chunk(b"IDAT", zlib.compress(bytes(raw), 9)) +
+        _png_chunk(b"IEND", b"")
+    )
@@ -0,0 +1,300 @@
+"""
+Read-replica routing
+
+With DATABASE_READ_URL set, the read-only endpoints (public card GETs,
+the owner's profile and contacts) get a session on the replica. They
+read from the primary instead when:
+
+- the replica is more than DB_REPLICA_MAX_LAG_SECONDS behind, or its
+  last lag check failed (a background thread checks every
+  DB_REPLICA_CHECK_SECONDS; until the first check passes, too), or
+- the client wrote in the last DB_READ_YOUR_WRITES_SECONDS
+  (read-your-writes). Responses to requests that wrote carry a signed
+  write mark, as a cookie and an X-Last-Write header; the client sends
+  either back, so any worker can tell. Cards written through this worker
+  are also read from the primary for that window, for every client.
+
+Writes always go through get_db (the primary).
+"""
+import hashlib
+import hmac
+import logging
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from backend.config import settings
+from backend.models.database import (
+    AsyncReadSessionLocal,
+    AsyncSessionLocal,
+    ReadSessionLocal,
+    SessionLocal,
+    session_scope
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds of replay lag; 0 when the replica has replayed everything it received
+# (an idle primary would otherwise look further behind every second)
+POSTGRES_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+WRITE_MARK_COOKIE = "last_write"
+WRITE_MARK_HEADER = "X-Last-Write"
+
+# Keys written by the current request (a list per request, set by ReadYourWritesMiddleware)
+_request_writes: ContextVar[Optional[list]] = ContextVar("request_writes", default=None)
+
+
+def card_key(public_id: str) -> str:
+    return f"card:{public_id}"
+
+
+def user_key(email: str) -> str:
+    return f"user:{email}"
+
+
+def replica_lag(engine: Engine) -> float:
+    """How far the replica is behind, in seconds (0 for databases without replication)"""
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            return float(conn.execute(text(POSTGRES_LAG_QUERY)).scalar() or 0)
+        conn.execute(text("SELECT 1"))
+        return 0.0
+
+
+def _mark_signature(stamp: str) -> str:
+    message = f"last-write:{stamp}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+
+def write_mark(written_at: Optional[float] = None) -> str:
+    """Signed timestamp of a client's last write"""
+    stamp = str(int((time.time() if written_at is None else written_at) * 1000))
+    return f"{stamp}.{_mark_signature(stamp)}"
+
+
+def mark_written_at(mark: Optional[str]) -> Optional[float]:
+    """When the client holding `mark` last wrote; None for a missing or forged mark"""
+    stamp, _, signature = (mark or "").partition(".")
+    if not stamp.isdigit() or not hmac.compare_digest(signature, _mark_signature(stamp)):
+        return None
+    return int(stamp) / 1000
+
+
+def client_written_at(conn: HTTPConnection) -> Optional[float]:
+    return mark_written_at(conn.headers.get(WRITE_MARK_HEADER) or conn.cookies.get(WRITE_MARK_COOKIE))
+
+
+class RecentWrites:
+    """Keys written in the last `window_seconds`"""
+
+    def __init__(self, window_seconds: float, max_keys: int = 100_000):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, *keys: str) -> None:
+        until = time.monotonic() + self.window_seconds
+        with self._lock:
+            if len(self._until) >= self.max_keys:
+                now = time.monotonic()
+                self._until = {k: t for k, t in self._until.items() if t > now}
+            for key in keys:
+                self._until[key] = until
+
+    def recent(self, *keys: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            return any(self._until.get(key, 0) > now for key in keys)
+
+    def __len__(self) -> int:
+        return len(self._until)
+
+
+class ReadRouter:
+    def __init__(
+        self,
+        replica_sessions: Optional[sessionmaker],
+        async_replica_sessions: Optional[async_sessionmaker],
+        max_lag_seconds: float,
+        check_seconds: float,
+        read_your_writes_seconds: float
+    ):
+        self.replica_sessions = replica_sessions
+        self.async_replica_sessions = async_replica_sessions
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self.recent_writes = RecentWrites(read_your_writes_seconds)
+
+        # None until the first successful lag check
+        self.lag: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.replica_reads = 0
+        self.primary_reads = {"lagging": 0, "unavailable": 0, "read_your_writes": 0}
+
+    @property
+    def configured(self) -> bool:
+        return self.replica_sessions is not None
+
+    # -----------------------------------------------------
+    # Routing
+    # -----------------------------------------------------
+
+    def wrote(self, *keys: str) -> None:
+        """
+        Send reads of these keys on this worker, and the client's reads on
+        every worker (write mark), to the primary for the read-your-writes window
+        """
+        if not self.configured:
+            return
+        self.recent_writes.mark(*keys)
+        writes = _request_writes.get()
+        if writes is not None:
+            writes.extend(keys)
+
+    def _client_wrote_recently(self, written_at: Optional[float]) -> bool:
+        return written_at is not None and time.time() - written_at < self.recent_writes.window_seconds
+
+    def use_replica(self, *keys: str, written_at: Optional[float] = None) -> bool:
+        """`written_at`: the client's last write (client_written_at), if it sent a mark"""
+        if not self.configured:
+            return False
+
+        if self.lag is None:
+            reason = "unavailable"
+        elif self.lag > self.max_lag_seconds:
+            reason = "lagging"
+        elif self._client_wrote_recently(written_at) or self.recent_writes.recent(*keys):
+            reason = "read_your_writes"
+        else:
+            self.replica_reads += 1
+            return True
+
+        self.primary_reads[reason] += 1
+        return False
+
+    @asynccontextmanager
+    async def session(self, *keys: str, written_at: Optional[float] = None):
+        """Read session for data identified by `keys`: replica when safe, else primary"""
+        if self.use_replica(*keys, written_at=written_at):
+            async with session_scope(self.replica_sessions, self.async_replica_sessions) as db:
+                yield db
+        else:
+            async with session_scope(SessionLocal, AsyncSessionLocal) as db:
+                yield db
+
+    # -----------------------------------------------------
+    # Lag checks
+    # -----------------------------------------------------
+
+    def check(self) -> Optional[float]:
+        try:
+            self.lag = replica_lag(self.replica_sessions.kw["bind"])
+            self.last_error = None
+        except Exception as e:
+            if self.lag is not None or self.last_error is None:
+                logger.warning(f"⚠️ Read replica unavailable, reading from the primary: {e}")
+            self.lag = None
+            self.last_error = str(e).splitlines()[0]
+        return self.lag
+
+    def start(self) -> None:
+        if not self.configured or (self._thread and self._thread.is_alive()):
+            return
+
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="read-replica-lag",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self.check()
+            self._stopping.wait(self.check_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.configured:
+            return {"configured": False}
+        return {
+            "configured": True,
+            "lag_seconds": None if self.lag is None else round(self.lag, 3),
+            "max_lag_seconds": self.max_lag_seconds,
+            "last_error": self.last_error,
+            "replica_reads": self.replica_reads,
+            "primary_reads": dict(self.primary_reads),
+            "recent_writes": len(self.recent_writes),
+        }
+
+
+class ReadYourWritesMiddleware:
+    """Give the client a write mark with the response to any request that wrote"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not read_router.configured:
+            await self.app(scope, receive, send)
+            return
+
+        writes = []
+        token = _request_writes.set(writes)
+
+        async def send_with_mark(message):
+            if message["type"] == "http.response.start" and writes:
+                mark = write_mark()
+                max_age = math.ceil(read_router.recent_writes.window_seconds)
+                headers = MutableHeaders(scope=message)
+                headers.append(WRITE_MARK_HEADER, mark)
+                headers.append(
+                    "Set-Cookie",
+                    f"{WRITE_MARK_COOKIE}={mark}; Max-Age={max_age}; Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_mark)
+        finally:
+            _request_writes.reset(token)
+
+
+# Singleton instance (lag checks started/stopped by main.py)
+read_router = ReadRouter(
+    replica_sessions=ReadSessionLocal,
+    async_replica_sessions=AsyncReadSessionLocal,
+    max_lag_seconds=settings.DB_REPLICA_MAX_LAG_SECONDS,
+    check_seconds=settings.DB_REPLICA_CHECK_SECONDS,
+    read_your_writes_seconds=settings.DB_READ_YOUR_WRITES_SECONDS
+)
@@ -0,0 +1,190 @@
+"""
+Process-pool render service for CPU-bound QR / PDF work
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RenderService:
+    """
+    Run pure-CPU render functions (reportlab, qrcode, PIL) in a dedicated
+    process pool so they never hold the anyio threadpool that the cheap
+    DB-bound endpoints need.
+
+    At most `max_pending` renders may be queued or running at once;
+    beyond that callers get a 503 instead of piling up. A render that
+    takes longer than `timeout` seconds is answered with a 504; the
+    worker process still finishes it, and it counts as pending until
+    it does.
+
+    With `workers=0`, or before start() is called, renders run in a
+    thread executor instead.
+    """
+
+    def __init__(self, workers: int, max_pending: int, timeout: float, start_method: str):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.render_seconds = 0.0
+
+    def start(self) -> None:
+        if self._executor is not None or self.workers <= 0:
+            return
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(self.start_method)
+        )
+        logger.info(f"🖨️ Render pool started with {self.workers} workers")
+
+    def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._threads is not None:
+            self._threads.shutdown(wait=True, cancel_futures=True)
+            self._threads = None
+
+    def _submit(self, fn: Callable[..., Any], *args: Any, limit: Optional[int] = None) -> "asyncio.Future":
+        """
+        Start fn(*args); pending until it finishes, whether or not anyone
+        still waits for it. With a `limit`, the pending count is checked
+        and taken in one step and a full service answers 503.
+        """
+        with self._pending_lock:
+            full = limit is not None and self._pending >= limit
+            if not full:
+                self._pending += 1
+            executor = self._executor
+            if executor is None:
+                if self._threads is None:
+                    self._threads = ThreadPoolExecutor(thread_name_prefix="render")
+                executor = self._threads
+        if full:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Renderer busy, please retry",
+                headers={"Retry-After": "1"}
+            )
+
+        self.submitted += 1
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            with self._pending_lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._finished)
+        return asyncio.wrap_future(future)
+
+    def _finished(self, future: Future) -> None:
+        with self._pending_lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(*args) in the pool; fn and its arguments must be picklable"""
+        return await self._collect(self._submit(fn, *args, limit=self.max_pending), time.perf_counter())
+
+    async def _collect(self, future: "asyncio.Future", started: float) -> Any:
+        try:
+            result = await asyncio.wait_for(future, self.timeout)
+            self.completed += 1
+            return result
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Rendering timed out"
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.render_seconds += time.perf_counter() - started
+
+    async def map(
+        self,
+        fn: Callable[[Any], Any],
+        items: AsyncIterable[Any],
+        window: int
+    ) -> AsyncIterator[Any]:
+        """
+        Yield fn(item) for each item, in order, keeping at most `window`
+        renders in flight so a large job spreads over every worker
+        without queueing all of its input at once.
+
+        Bulk jobs are bounded by their window rather than max_pending
+        (they count towards it, so single renders see the load).
+        """
+        in_flight = deque()
+        try:
+            async for item in items:
+                in_flight.append((self._submit(fn, item), time.perf_counter()))
+                if len(in_flight) >= window:
+                    yield await self._collect(*in_flight.popleft())
+
+            while in_flight:
+                yield await self._collect(*in_flight.popleft())
+        finally:
+            # client went away mid-stream: drop renders not yet started
+            while in_flight:
+                future, _ = in_flight.popleft()
+                future.cancel()
+
+    def call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run fn(*args) in the pool from a background (non-async) thread and
+        wait for it; inline when the pool is not running. Not bounded by
+        max_pending - background jobs are paced by their own queue.
+        """
+        if self._executor is None:
+            return fn(*args)
+        return self._executor.submit(fn, *args).result()
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed + self.timeouts
+        return {
+            "mode": "process" if self._executor is not None else "thread",
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "avg_render_ms": round(self.render_seconds / finished * 1000, 2) if finished else 0.0,
+        }
+
+
+# Singleton instance (started/stopped by main.py)
+render_service = RenderService(
+    workers=settings.RENDER_WORKERS,
+    max_pending=settings.RENDER_MAX_PENDING,
+    timeout=settings.RENDER_TIMEOUT_SECONDS,
+    start_method=settings.RENDER_START_METHOD
+)
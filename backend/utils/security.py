@@ -6,7 +6,10 @@ from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from backend.config import settings
+from backend.utils.offline_card import Ed25519Signer, HmacSigner
 import base64
 import json
 
@@ -116,3 +119,34 @@ class DataEncryption:
 
 # Singleton instance
 encryptor = DataEncryption()
+
+
+# =====================
+# Offline card signing
+# =====================
+
+def make_card_signer():
+    """
+    Signer for offline QR payloads. The key comes from
+    OFFLINE_QR_SIGNING_KEY (base64url, 32 bytes) or is derived from
+    SECRET_KEY, so every worker signs with the same key.
+    """
+    if settings.OFFLINE_QR_SIGNING_KEY:
+        key = base64.urlsafe_b64decode(
+            settings.OFFLINE_QR_SIGNING_KEY + "=" * (-len(settings.OFFLINE_QR_SIGNING_KEY) % 4)
+        )
+    else:
+        key = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=f"emergency-card offline qr {settings.OFFLINE_QR_SIGNATURE}".encode()
+        ).derive(settings.SECRET_KEY.encode())
+
+    if settings.OFFLINE_QR_SIGNATURE == "hmac":
+        return HmacSigner(key)
+    return Ed25519Signer(key)
+
+
+# Singleton instance
+card_signer = make_card_signer()
@@ -0,0 +1,84 @@
+"""
+What a card's QR code encodes: the card URL (optionally a short link)
+and, in offline mode, a signed payload in its fragment
+
+Short links are {HOST}/E/{BASE36 ID}, for QR alphanumeric mode.
+
+Alphanumeric mode packs 11 bits per two characters (byte mode: 16) but
+only allows 0-9, A-Z and " $%*+-./:", so the short link is all upper
+case: scheme and host are case-insensitive, the /E/ route is upper case
+and the 8-hex-digit public_id becomes at most 7 base-36 digits.
+"""
+import string
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from backend.config import settings
+from backend.utils.offline_card import b64url_encode, offline_fields, pack_payload
+from backend.utils.public_card import primary_contact
+from backend.utils.security import card_signer
+
+ALPHABET = string.digits + string.ascii_uppercase
+SHORT_PATH = "/E/"
+
+# public_ids are the first 8 hex digits of a UUID
+_PUBLIC_ID_LIMIT = 16 ** 8
+
+# int() would also take a sign, underscores and surrounding whitespace
+_HEX_DIGITS = frozenset(string.hexdigits)
+_SHORT_DIGITS = frozenset(ALPHABET + ALPHABET.lower())
+
+
+def encode_short_id(public_id: str) -> Optional[str]:
+    """Base-36 short id for a public_id (None if it is not 8 hex digits)"""
+    if len(public_id) != 8 or not _HEX_DIGITS.issuperset(public_id):
+        return None
+    value = int(public_id, 16)
+
+    digits = ""
+    while True:
+        value, digit = divmod(value, 36)
+        digits = ALPHABET[digit] + digits
+        if not value:
+            return digits
+
+
+def decode_short_id(code: str) -> Optional[str]:
+    """public_id for a short id (any case); None if it is not valid"""
+    if not code or len(code) > 7 or not _SHORT_DIGITS.issuperset(code):
+        return None
+    value = int(code, 36)
+    if value >= _PUBLIC_ID_LIMIT:
+        return None
+    return format(value, "08x")
+
+
+def short_card_url(public_id: str) -> Optional[str]:
+    base = urlsplit(settings.QR_SHORT_BASE_URL or settings.FRONTEND_URL)
+    code = encode_short_id(public_id)
+    if code is None:
+        return None
+    return f"{base.scheme.upper()}://{base.netloc.upper()}{SHORT_PATH}{code}"
+
+
+def card_qr_url(public_id: str) -> str:
+    """The URL printed in a card's QR code (short link when enabled)"""
+    if settings.QR_SHORT_LINKS:
+        short_url = short_card_url(public_id)
+        if short_url:
+            return short_url
+    return f"{settings.FRONTEND_URL}/emergency/{public_id}"
+
+
+def card_qr_data(entry: Dict) -> str:
+    """
+    Full QR content for a card entry: card_qr_url(), plus the signed
+    offline payload as the URL fragment when OFFLINE_QR is on (the
+    fragment is never sent to the server, so online scans are unchanged).
+    """
+    url = card_qr_url(entry["public_id"])
+    if not settings.OFFLINE_QR:
+        return url
+
+    payload = pack_payload(offline_fields(entry, primary_contact(entry)), card_signer)
+    return f"{url}#{b64url_encode(payload)}"
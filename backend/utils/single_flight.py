@@ -0,0 +1,131 @@
+"""
+Single-flight call coalescing
+
+Concurrent calls for the same key share one execution: the first caller
+(the leader) runs the function, everyone who asks for the key while it
+is running waits for and gets the same result - or the same exception.
+Nothing is kept once the call finishes; caching is left to the caller.
+Works from threads (sync routes) and from the event loop (async routes,
+which wait without holding a threadpool thread).
+"""
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # (loop, future) of async followers; None once the call finished
+        self.waiters = []
+        self.followers = 0
+
+
+def _wake(future: "asyncio.Future") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.coalesced = 0
+        self.max_followers = 0
+
+    def _join(self, key: Hashable) -> Tuple[_Call, bool]:
+        """The call in flight for key and whether this caller leads it"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.coalesced += 1
+                return call, False
+
+            call = self._calls[key] = _Call()
+            self.calls += 1
+            return call, True
+
+    def _finish(self, key: Hashable, call: _Call) -> None:
+        with self._lock:
+            del self._calls[key]
+            waiters, call.waiters = call.waiters, None
+            self.max_followers = max(self.max_followers, call.followers)
+        call.done.set()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def _execute(self, key: Hashable, call: _Call, fn: Callable[..., Any], args: tuple) -> None:
+        try:
+            call.result = fn(*args)
+        except BaseException as e:
+            call.error = e
+        finally:
+            self._finish(key, call)
+
+    async def _execute_async(self, key: Hashable, call: _Call, fn: Callable[..., Any], args: tuple) -> None:
+        try:
+            call.result = await fn(*args)
+        except BaseException as e:
+            call.error = e
+        finally:
+            self._finish(key, call)
+
+    @staticmethod
+    def _outcome(call: _Call) -> Any:
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        """fn(*args), shared with concurrent callers of the same key"""
+        call, leader = self._join(key)
+        if leader:
+            self._execute(key, call, fn, args)
+        else:
+            call.done.wait()
+        return self._outcome(call)
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Like do(), from the event loop: the leader awaits fn (a coroutine
+        function) or runs it in the threadpool, followers await its
+        result without a thread. The call finishes even if the leader's
+        request is cancelled.
+        """
+        call, leader = self._join(key)
+        if leader:
+            if asyncio.iscoroutinefunction(fn):
+                await asyncio.shield(asyncio.ensure_future(self._execute_async(key, call, fn, args)))
+            else:
+                await run_in_threadpool(self._execute, key, call, fn, args)
+            return self._outcome(call)
+
+        future = asyncio.get_running_loop().create_future()
+        with self._lock:
+            waiting = call.waiters is not None
+            if waiting:
+                call.waiters.append((future.get_loop(), future))
+        if waiting:
+            await future
+        return self._outcome(call)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = len(self._calls)
+        requests = self.calls + self.coalesced
+        return {
+            "in_flight": in_flight,
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / requests, 4) if requests else 0.0,
+            "max_followers": self.max_followers,
+        }
@@ -0,0 +1,195 @@
+"""
+Static-site export of every public card - a hot standby that any static
+file server can serve while the database or the app is down
+
+    OUT/
+      manifest.json                      what was exported, per card
+      emergency/{public_id}/index.html   (+ index.html.gz for gzip_static)
+      emergency/{public_id}/card.json    PublicEmergencyCard
+      E/{SHORT ID}/index.html            short-link copy (QR_SHORT_LINKS)
+
+Exports are incremental: profiles are streamed (public_id, updated_at
+only) through a server-side cursor and compared with the manifest, and
+only new or changed cards are loaded, decrypted and rendered; cards that
+no longer exist are removed. Contact changes touch the profile's
+updated_at, so they are picked up too. A template change (or a new
+export format) re-renders everything.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import Executor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.models.database import EmergencyProfile
+from backend.utils.card_template import TEMPLATE_DIR, render_card_html
+from backend.utils.public_card import load_public_cards
+from backend.utils.short_link import encode_short_id
+
+EXPORT_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+
+# Cards loaded (and decrypted) per query
+EXPORT_BATCH_SIZE = 500
+
+
+def export_fingerprint() -> str:
+    """Changes whenever every card has to be re-rendered"""
+    digest = hashlib.sha256(b"%d" % EXPORT_FORMAT)
+    with open(os.path.join(TEMPLATE_DIR, "emergency_card.html"), "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def card_dirs(out_dir: str, public_id: str, short_links: bool) -> List[str]:
+    """Directories holding a card's files (its short-link copy too)"""
+    dirs = [os.path.join(out_dir, "emergency", public_id)]
+    code = encode_short_id(public_id) if short_links else None
+    if code:
+        dirs.append(os.path.join(out_dir, "E", code))
+    return dirs
+
+
+def write_cards(out_dir: str, cards: List[Tuple[str, Dict]], short_links: bool) -> List[Tuple[str, str]]:
+    """
+    Render and write a batch of (public_id, card) pairs; returns
+    (public_id, sha256 of the HTML) pairs. Pure CPU and file work on
+    picklable data, so batches run in the process pool.
+    """
+    written = []
+    for public_id, card in cards:
+        html = render_card_html(card).encode("utf-8")
+        compressed = gzip.compress(html, compresslevel=9, mtime=0)
+        for directory in card_dirs(out_dir, public_id, short_links):
+            _write_atomic(os.path.join(directory, "index.html"), html)
+            _write_atomic(os.path.join(directory, "index.html.gz"), compressed)
+
+        card_json = json.dumps(card, separators=(",", ":")).encode("utf-8")
+        _write_atomic(os.path.join(out_dir, "emergency", public_id, "card.json"), card_json)
+        written.append((public_id, hashlib.sha256(html).hexdigest()))
+    return written
+
+
+def load_manifest(out_dir: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def profile_versions(db: Session, yield_per: int = 1000) -> Iterator[Tuple[str, str]]:
+    """(public_id, updated_at) for every profile, streamed from a server-side cursor"""
+    stmt = select(
+        EmergencyProfile.public_id,
+        EmergencyProfile.updated_at,
+        EmergencyProfile.created_at
+    ).execution_options(stream_results=True, yield_per=yield_per)
+
+    for public_id, updated_at, created_at in db.execute(stmt):
+        version = updated_at or created_at
+        yield public_id, version.isoformat() if version else ""
+
+
+def _batches(items: Iterator, size: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_static_site(
+    out_dir: str,
+    db: Session,
+    executor: Executor,
+    short_links: bool = False,
+    full: bool = False,
+    window: int = 8
+) -> Dict[str, int]:
+    """
+    Bring the export in `out_dir` up to date; returns counts of
+    rendered, unchanged and removed cards.
+
+    Changed cards are loaded EXPORT_BATCH_SIZE at a time and written by
+    `executor`, with at most `window` batches in flight. The manifest is
+    written last, so an interrupted export redoes its cards next time.
+    """
+    fingerprint = export_fingerprint()
+    manifest = load_manifest(out_dir) or {"cards": {}, "short_links": False}
+    exported = manifest["cards"]
+    if full or manifest.get("fingerprint") != fingerprint or manifest["short_links"] != short_links:
+        previous = {}
+    else:
+        previous = exported
+
+    cards: Dict[str, Dict] = {}
+    versions: Dict[str, str] = {}
+    stats = {"rendered": 0, "unchanged": 0, "removed": 0}
+
+    def changed_ids() -> Iterator[str]:
+        for public_id, version in profile_versions(db):
+            versions[public_id] = version
+            known = previous.get(public_id)
+            if known and known["updated_at"] == version:
+                cards[public_id] = known
+                stats["unchanged"] += 1
+            else:
+                yield public_id
+
+    def collect(written: List[Tuple[str, str]]) -> None:
+        for public_id, sha256 in written:
+            cards[public_id] = {"updated_at": versions[public_id], "sha256": sha256}
+            stats["rendered"] += 1
+
+    in_flight = deque()
+    for public_ids in _batches(changed_ids(), EXPORT_BATCH_SIZE):
+        batch = [(entry["public_id"], entry["card"]) for entry in load_public_cards(public_ids, db)]
+        in_flight.append(executor.submit(write_cards, out_dir, batch, short_links))
+        if len(in_flight) >= window:
+            collect(in_flight.popleft().result())
+
+    while in_flight:
+        collect(in_flight.popleft().result())
+
+    # Cards deleted since the last export
+    for public_id in set(exported) - set(versions):
+        for directory in card_dirs(out_dir, public_id, manifest["short_links"]):
+            shutil.rmtree(directory, ignore_errors=True)
+        stats["removed"] += 1
+
+    if manifest["short_links"] and not short_links:
+        shutil.rmtree(os.path.join(out_dir, "E"), ignore_errors=True)
+
+    _write_atomic(os.path.join(out_dir, MANIFEST_NAME), json.dumps({
+        "format": EXPORT_FORMAT,
+        "fingerprint": fingerprint,
+        "short_links": short_links,
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "cards": cards,
+    }, indent=1, sort_keys=True).encode("utf-8"))
+    return stats
@@ -0,0 +1,169 @@
+"""
+Lock-screen wallpaper rendering - QR code plus key medical facts, sized
+for common phone screens
+"""
+import os
+from functools import lru_cache
+from io import BytesIO
+from typing import Dict, List
+
+import reportlab
+from PIL import Image, ImageDraw, ImageFont
+
+from backend.utils.qr_generator import ERROR_LEVELS
+from backend.utils.qr_matrix import qr_matrix
+
+# Portrait screen sizes in pixels
+DEVICE_RESOLUTIONS = {
+    "iphone-se": (750, 1334),
+    "iphone-15": (1179, 2556),
+    "iphone-15-pro-max": (1290, 2796),
+    "android-fhd": (1080, 2400),
+    "android-qhd": (1440, 3200),
+}
+
+WALLPAPER_MEDIA_TYPES = {"png": "image/png", "webp": "image/webp"}
+
+# Part of every cache key - bump it when the layout changes
+LAYOUT_VERSION = 1
+
+BACKGROUND = (20, 20, 28)
+PANEL = (255, 255, 255)
+RED = (214, 40, 40)
+TEXT = (20, 20, 20)
+MUTED = (110, 110, 110)
+
+# Bitstream Vera ships with reportlab, so no extra font dependency
+_FONT_DIR = os.path.join(os.path.dirname(reportlab.__file__), "fonts")
+
+
+@lru_cache(maxsize=64)
+def _font(size: int, bold: bool = False) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(os.path.join(_FONT_DIR, "VeraBd.ttf" if bold else "Vera.ttf"), size)
+
+
+def _wrap(draw: ImageDraw.ImageDraw, text: str, font, width: int, max_lines: int) -> List[str]:
+    lines, line = [], ""
+    for word in text.split():
+        candidate = f"{line} {word}".strip()
+        if draw.textlength(candidate, font=font) <= width:
+            line = candidate
+            continue
+        if line:
+            lines.append(line)
+        line = word
+    if line:
+        lines.append(line)
+
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        while lines[-1] and draw.textlength(lines[-1] + "...", font=font) > width:
+            lines[-1] = lines[-1][:-1]
+        lines[-1] += "..."
+    return lines
+
+
+def _qr_image(data: str, size: int) -> Image.Image:
+    """QR at a whole number of pixels per module (crisp, no resampling blur)"""
+    matrix = qr_matrix(data, ERROR_LEVELS["H"], 2)
+    image = Image.new("1", (len(matrix), len(matrix)), 1)
+    image.putdata([0 if dark else 1 for row in matrix for dark in row])
+    scale = max(size // len(matrix), 1)
+    return image.resize((len(matrix) * scale,) * 2, Image.NEAREST)
+
+
+def render_wallpaper(card: Dict, qr_data: str, device: str, fmt: str = "png") -> bytes:
+    """
+    Render a lock-screen image for a public card (PublicEmergencyCard
+    fields). The top of the screen is left clear for the clock; the
+    panel with the QR and facts sits below it.
+    """
+    width, height = DEVICE_RESOLUTIONS[device]
+    unit = width / 30
+
+    image = Image.new("RGB", (width, height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+
+    margin = int(width * 0.06)
+    padding = int(unit)
+    panel_top = int(height * 0.30)
+    panel_bottom = int(height * 0.90)
+    inner_width = width - 2 * margin - 2 * padding
+    draw.rounded_rectangle(
+        (margin, panel_top, width - margin, panel_bottom), radius=int(unit), fill=PANEL
+    )
+
+    # Header band
+    header_height = int(unit * 2.4)
+    draw.rounded_rectangle(
+        (margin, panel_top, width - margin, panel_top + header_height), radius=int(unit), fill=RED
+    )
+    draw.rectangle(
+        (margin, panel_top + header_height - int(unit), width - margin, panel_top + header_height), fill=RED
+    )
+    draw.text(
+        (width / 2, panel_top + header_height / 2), "EMERGENCY MEDICAL INFO",
+        font=_font(int(unit * 1.1), bold=True), fill=PANEL, anchor="mm"
+    )
+    y = panel_top + header_height + padding
+
+    # Name and blood group
+    if card.get("full_name"):
+        for line in _wrap(draw, card["full_name"], _font(int(unit * 1.3), bold=True), inner_width, 1):
+            draw.text((margin + padding, y), line, font=_font(int(unit * 1.3), bold=True), fill=TEXT)
+            y += int(unit * 1.7)
+    if card.get("blood_group"):
+        draw.text(
+            (margin + padding, y), f"Blood group {card['blood_group']}",
+            font=_font(int(unit * 1.3), bold=True), fill=RED
+        )
+        y += int(unit * 1.7)
+
+    # Emergency contact (highest priority) before anything that may not fit
+    contacts = card.get("emergency_contacts") or []
+    contact = next((c for c in contacts if c.get("priority") == 1), contacts[0] if contacts else None)
+    if contact:
+        ice = f"ICE: {contact['name']}  {contact['phone']}"
+        for line in _wrap(draw, ice, _font(int(unit * 1.0), bold=True), inner_width, 1):
+            draw.text((margin + padding, y), line, font=_font(int(unit * 1.0), bold=True), fill=TEXT)
+        y += int(unit * 1.6)
+    y += int(unit * 0.3)
+
+    # QR code
+    qr = _qr_image(qr_data, int(min(width * 0.5, height * 0.22)))
+    image.paste(qr, ((width - qr.width) // 2, y))
+    y += qr.height + int(unit * 0.3)
+    draw.text(
+        (width / 2, y), "Scan for full medical details",
+        font=_font(int(unit * 0.8)), fill=MUTED, anchor="mt"
+    )
+    y += int(unit * 1.6)
+
+    # Medical facts
+    label_font, value_font = _font(int(unit * 0.85), bold=True), _font(int(unit * 0.95))
+    facts = [
+        ("ALLERGIES", card.get("allergies")),
+        ("CONDITIONS", card.get("medical_conditions")),
+        ("MEDICATIONS", card.get("medications")),
+    ]
+
+    for label, values in facts:
+        if not values:
+            continue
+        lines = _wrap(draw, ", ".join(values), value_font, inner_width, 2)
+        needed = int(unit * 1.1) + len(lines) * int(unit * 1.25)
+        if y + needed > panel_bottom - padding:
+            break
+        draw.text((margin + padding, y), label, font=label_font, fill=RED)
+        y += int(unit * 1.1)
+        for line in lines:
+            draw.text((margin + padding, y), line, font=value_font, fill=TEXT)
+            y += int(unit * 1.25)
+        y += int(unit * 0.4)
+
+    buffer = BytesIO()
+    if fmt == "webp":
+        image.save(buffer, format="WEBP", lossless=True, method=4)
+    else:
+        image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
@@ -0,0 +1,121 @@
+"""
+Benchmark: static card chrome as a form XObject vs redrawn per card
+
+    python -m benchmarks.bench_card_chrome [cards]
+
+"redrawn" draws the border, header and footer again for every card (the
+old layout code); "form" stores them once per document and places them
+with doForm() / "Do". Wallet-card PDFs have one card per page; print
+sheets put eight on a letter page. QR matrices are computed up front
+(keep `cards` within the qr_matrix cache) and each time is the best of
+three runs, so the numbers compare layout cost only.
+"""
+import sys
+import time
+import zlib
+from io import BytesIO
+
+from benchmarks.harness import setup_env
+
+setup_env()
+
+from reportlab.pdfgen import canvas  # noqa: E402
+
+from backend.utils.pdf_generator import (  # noqa: E402
+    CARD_SIZES,
+    _draw_card_chrome,
+    _draw_card_fields,
+    generate_emergency_cards_pdf
+)
+from backend.utils.pdf_stream import StreamingPDFWriter  # noqa: E402
+from backend.utils.qr_matrix import qr_matrix  # noqa: E402
+from backend.utils.print_sheet import (  # noqa: E402
+    CARD_FORM,
+    PAGE_SIZE,
+    _card,
+    card_chrome,
+    card_positions,
+    paginate,
+    render_sheet_page,
+    sheet_writer
+)
+
+USER_DATA = {
+    "name": "Asha Rao",
+    "blood_group": "B+",
+    "age": 34,
+    "emergency_contact": {"name": "Ravi Rao", "phone": "+919876543210"},
+}
+
+
+def make_cards(count: int):
+    return [
+        {"user_data": dict(USER_DATA, name=f"Person {i}"), "qr_url": f"https://emergency-card.onrender.com/E/{i:X}"}
+        for i in range(count)
+    ]
+
+
+def redrawn_cards_pdf(cards, card_size: str = "credit") -> bytes:
+    buffer = BytesIO()
+    card_width, card_height = CARD_SIZES[card_size]
+    c = canvas.Canvas(buffer, pagesize=(card_width, card_height))
+    for card in cards:
+        c.saveState()
+        _draw_card_chrome(c, card_width, card_height)
+        c.restoreState()
+        _draw_card_fields(c, card["user_data"], card["qr_url"], card_height)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def redrawn_sheet_page(cards, card_size: str = "credit") -> bytes:
+    # the chrome inlined where the form is referenced
+    _, chrome = card_chrome(card_size)
+    ops = [
+        _card(x, y, card["user_data"], card["qr_url"], card_size).replace(b"/%s Do" % CARD_FORM.encode(), chrome)
+        for (x, y), card in zip(card_positions(), cards)
+    ]
+    return zlib.compress(b"".join(ops), 6)
+
+
+def sheet_pdf(cards, writer, render_page) -> bytes:
+    chunks = [writer.begin()]
+    for page in paginate(cards):
+        chunks.append(writer.add_page(render_page(page)))
+    chunks.append(writer.finish())
+    return b"".join(chunks)
+
+
+def timed(fn, repeat: int = 3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    cards = make_cards(count)
+    for card in cards:
+        qr_matrix(card["qr_url"])
+    generate_emergency_cards_pdf(cards[:8])  # warm up fonts
+
+    print(f"{count} cards")
+    print(f"  {'document':<28} {'ms':>8} {'bytes':>10}")
+    rows = [
+        ("wallet cards, redrawn", lambda: redrawn_cards_pdf(cards)),
+        ("wallet cards, form", lambda: generate_emergency_cards_pdf(cards)),
+        ("print sheet, redrawn", lambda: sheet_pdf(cards, StreamingPDFWriter(PAGE_SIZE), redrawn_sheet_page)),
+        ("print sheet, form", lambda: sheet_pdf(cards, sheet_writer(), render_sheet_page)),
+    ]
+    for name, fn in rows:
+        ms, pdf = timed(fn)
+        print(f"  {name:<28} {ms:8.1f} {len(pdf):10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Benchmark: public card HTML render cost per view, before and after the
+precompiled template engine.
+
+    python -m benchmarks.bench_card_render [iterations]
+
+"legacy f-string*" is the per-request f-string the view used to build
+(* it did no HTML escaping, so it is not a like-for-like baseline);
+"compiled template" renders the precompiled shell; "cached per version"
+is what a repeat view of an unchanged card costs (render stored on the
+card entry). gzip/brotli sizes are the precompressed bodies stored next
+to the rendered HTML.
+"""
+import sys
+import time
+
+from benchmarks.harness import setup_env
+
+setup_env()
+
+from backend.utils.card_template import (  # noqa: E402
+    RenderedBody,
+    get_rendered_card,
+    render_card_html
+)
+
+CARD = {
+    "full_name": "Asha Rao",
+    "age": 34,
+    "blood_group": "B+",
+    "allergies": ["Penicillin", "Peanuts", "Latex"],
+    "medical_conditions": ["Type 1 diabetes", "Asthma"],
+    "medications": ["Insulin glargine", "Salbutamol inhaler"],
+    "organ_donor": True,
+    "emergency_contacts": [
+        {"name": "Ravi Rao", "relation": "Spouse", "phone": "+919876543210", "priority": 1},
+        {"name": "Dr. Menon", "relation": "Physician", "phone": "+914012345678", "priority": 2},
+    ],
+}
+
+
+def legacy_render(card):
+    allergies = card["allergies"] or []
+    conditions = card["medical_conditions"] or []
+    medications = card["medications"] or []
+
+    html_content = f"""
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Emergency Medical Card</title>
+
+<style>
+body {{
+    font-family: 'Segoe UI', Arial, sans-serif;
+    background: linear-gradient(135deg, #667eea, #764ba2);
+    min-height: 100vh;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    padding: 20px;
+}}
+
+.card {{
+    background: #fff;
+    width: 100%;
+    max-width: 420px;
+    border-radius: 22px;
+    box-shadow: 0 25px 60px rgba(0,0,0,0.35);
+    overflow: hidden;
+}}
+
+.header {{
+    background: linear-gradient(135deg, #ff416c, #ff4b2b);
+    color: white;
+    text-align: center;
+    padding: 25px;
+}}
+
+.header h1 {{
+    font-size: 22px;
+}}
+
+.content {{
+    padding: 22px;
+}}
+
+.section {{
+    margin-bottom: 18px;
+}}
+
+.section-title {{
+    font-weight: 700;
+    margin-bottom: 8px;
+}}
+
+.info {{
+    background: #f7f9fc;
+    padding: 10px;
+    border-radius: 8px;
+    margin-bottom: 6px;
+}}
+
+.blood {{
+    background: #e63946;
+    color: white;
+    font-size: 26px;
+    font-weight: bold;
+    padding: 8px 22px;
+    border-radius: 30px;
+    display: inline-block;
+}}
+
+.contact {{
+    background: #e8f5e9;
+    padding: 12px;
+    border-radius: 10px;
+    border-left: 5px solid #28a745;
+    margin-bottom: 10px;
+}}
+
+.call {{
+    display: block;
+    margin-top: 8px;
+    background: #28a745;
+    color: white;
+    padding: 10px;
+    text-align: center;
+    border-radius: 8px;
+    text-decoration: none;
+    font-weight: bold;
+}}
+
+.footer {{
+    text-align: center;
+    font-size: 12px;
+    color: #777;
+    padding: 12px;
+    background: #fafafa;
+}}
+</style>
+</head>
+
+<body>
+<div class="card">
+    <div class="header">
+        <h1>EMERGENCY MEDICAL INFO</h1>
+        <p>For first responders</p>
+    </div>
+
+    <div class="content">
+
+        <div class="section">
+            <div class="section-title">Personal Details</div>
+            <div class="info">Name: {card['full_name']}</div>
+            <div class="info">Age: {card['age']}</div>
+        </div>
+
+        <div class="section">
+            <div class="section-title">Blood Group</div>
+            <div style="text-align:center;">
+                <span class="blood">{card['blood_group']}</span>
+            </div>
+        </div>
+
+        <div class="section">
+            <div class="section-title">Allergies</div>
+            <div>{", ".join(allergies) if allergies else "None"}</div>
+        </div>
+
+        <div class="section">
+            <div class="section-title">Medical Conditions</div>
+            <div>{", ".join(conditions) if conditions else "None"}</div>
+        </div>
+
+        <div class="section">
+            <div class="section-title">Medications</div>
+            <div>{", ".join(medications) if medications else "None"}</div>
+        </div>
+
+        <div class="section">
+            <div class="section-title">Emergency Contacts</div>
+            {"".join([f"<div class='contact'><b>{c['name']}</b> ({c['relation']})<a class='call' href='tel:{c['phone']}'>Call {c['phone']}</a></div>" for c in card['emergency_contacts']])}
+        </div>
+
+    </div>
+
+    <div class="footer">
+        Emergency Info Card • Powered by QR Access
+    </div>
+</div>
+</body>
+</html>
+"""
+    return html_content
+
+
+def per_view_us(fn, iterations: int) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    def cached():
+        get_rendered_card(entry)
+
+    entry = {"card": CARD}
+    get_rendered_card(entry)
+
+    results = [
+        ("legacy f-string*", per_view_us(lambda: legacy_render(CARD), iterations)),
+        ("compiled template", per_view_us(lambda: render_card_html(CARD), iterations)),
+        ("cached per version", per_view_us(cached, iterations)),
+        ("render + precompress", per_view_us(
+            lambda: RenderedBody(render_card_html(CARD).encode("utf-8")),
+            max(iterations // 20, 1)
+        )),
+    ]
+
+    print(f"Card render cost per view ({iterations} iterations)")
+    for name, micros in results:
+        print(f"  {name:<22} {micros:10.2f} us")
+
+    rendered = entry["html"]
+    print("Body size")
+    print(f"  {'identity':<22} {len(rendered.body):10d} bytes")
+    for coding, body in rendered.encoded.items():
+        print(f"  {coding:<22} {len(body):10d} bytes")
+
+
+if __name__ == "__main__":
+    main()
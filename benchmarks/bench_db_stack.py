@@ -0,0 +1,116 @@
+"""
+Load test: async database stack vs the sync driver in the threadpool
+
+    python -m benchmarks.bench_db_stack [requests] [concurrency,...]
+
+Runs the same load once per stack, each in a fresh process (DB_ASYNC is
+read at import): "async" (asyncpg / aiosqlite) and "sync" (psycopg2 /
+sqlite3 behind SyncSessionAdapter, one threadpool hop per call). Each
+level sends `requests` requests from `concurrency` concurrent clients,
+half to the public card JSON (card_cache off, so every request loads
+and decrypts the card) and half to GET /profile/contacts (JWT user
+lookup + one query). Point DATABASE_URL at Postgres for production-like
+numbers; the default is a throwaway SQLite file. Pool settings
+(DB_POOL_SIZE, DB_MAX_OVERFLOW, ...) are read from the environment, and
+each stack's checkout waits are printed at the end.
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import seed_cards, setup_env
+
+STACKS = ("async", "sync")
+CARDS = 200
+
+
+def run_stack(total: int, levels, public_ids):
+    os.environ["CARD_CACHE_MAX_ENTRIES"] = "0"
+    os.environ["DEGRADED_MODE_ENABLED"] = "False"
+
+    from benchmarks.harness import asgi_request, run
+    from main import app
+    from backend.models.database import async_engine, engine
+    from backend.models.engine import pool_stats
+    from backend.utils.security import create_access_token
+
+    token = create_access_token(data={"sub": "bench0@example.com"})
+    auth = [("authorization", f"Bearer {token}")]
+
+    async def load(concurrency: int):
+        latencies = []
+        errors = 0
+        queue = asyncio.Queue()
+        for i in range(total):
+            queue.put_nowait(i)
+
+        async def client():
+            nonlocal errors
+            while not queue.empty():
+                i = queue.get_nowait()
+                if i % 2:
+                    path, headers = "/profile/contacts", auth
+                else:
+                    path, headers = f"/api/emergency/{public_ids[i % len(public_ids)]}", ()
+                started = time.perf_counter()
+                status, _, _ = await asgi_request(app, path, headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if status != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            "rps": total / elapsed,
+            "p50": latencies[len(latencies) // 2],
+            "p95": latencies[int(len(latencies) * 0.95) - 1],
+            "errors": errors,
+        }
+
+    run(load(4))  # warm up pools and imports
+    results = {concurrency: run(load(concurrency)) for concurrency in levels}
+    results["pool"] = pool_stats(async_engine if async_engine is not None else engine)
+    return results
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--stack":
+        total, levels = int(sys.argv[2]), [int(c) for c in sys.argv[3].split(",")]
+        print(json.dumps(run_stack(total, levels, sys.argv[4].split(","))))
+        return
+
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    levels = sys.argv[2] if len(sys.argv) > 2 else "1,16,64,256"
+
+    # Seed once; both stacks run against the same database
+    setup_env()
+    public_ids = ",".join(seed_cards(CARDS))
+
+    results = {}
+    for stack in STACKS:
+        env = dict(os.environ, DB_ASYNC=str(stack == "async"))
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_db_stack", "--stack", str(total), levels, public_ids],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        results[stack] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{total} requests per level (public card JSON + /profile/contacts)")
+    print(f"  {'clients':>7} {'stack':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for concurrency in levels.split(","):
+        for stack in STACKS:
+            r = results[stack][concurrency]
+            print(f"  {concurrency:>7} {stack:<6} {r['rps']:8.0f} {r['p50']:8.2f} {r['p95']:8.2f} {r['errors']:7d}")
+    for stack in STACKS:
+        pool = results[stack]["pool"]
+        print(f"  {stack} pool: {pool['checkouts']} checkouts, {pool['waits']} waited "
+              f"(avg {pool['wait_ms_avg']} ms, max {pool['wait_ms_max']} ms), {pool['timeouts']} timed out")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark: contact and access-log lookups at 1M rows, before and after
+the hot-path indexes (migration 0002)
+
+    python -m benchmarks.bench_indexes [rows] [samples]
+
+Migrates a fresh database to the baseline revision (0001), inserts
+`rows` contacts and `rows` access logs (5 per user), then prints the
+query plan and median / p95 latency of each lookup the app makes. It then
+runs the 0002 migration, reports how long the indexes took to build, and
+measures again. Point DATABASE_URL at an empty PostgreSQL database to
+benchmark that instead of a throwaway SQLite file.
+"""
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.harness import setup_env
+
+setup_env()
+
+from sqlalchemy import delete, insert, select, text  # noqa: E402
+
+from backend.models.database import AccessLog, EmergencyContact, User, engine  # noqa: E402
+from backend.models.migrations import migrate  # noqa: E402
+
+PER_USER = 5
+CHUNK = 50_000
+
+
+def user_id(i: int) -> str:
+    return f"user-{i:08d}"
+
+
+def seed(rows: int) -> int:
+    users = rows // PER_USER
+    epoch = datetime(2026, 1, 1)
+    rng = random.Random(7)
+
+    def chunks(make, total):
+        for start in range(0, total, CHUNK):
+            yield [make(n) for n in range(start, min(start + CHUNK, total))]
+
+    with engine.begin() as conn:
+        for batch in chunks(lambda i: {
+            "id": user_id(i), "email": f"u{i}@example.com", "username": f"u{i}",
+            "password_hash": "x", "is_active": True
+        }, users):
+            conn.execute(insert(User), batch)
+        # Rows of one user are spread over the table, as they are after years of writes
+        for batch in chunks(lambda n: {
+            "id": f"c-{n:09d}", "user_id": user_id(n % users), "name": "Contact",
+            "relation": "Family", "phone": f"+91{n:010d}", "priority": n // users + 1
+        }, rows):
+            conn.execute(insert(EmergencyContact), batch)
+        for batch in chunks(lambda n: {
+            "id": f"a-{n:09d}", "user_id": user_id(n % users),
+            "accessed_at": epoch + timedelta(seconds=rng.randrange(365 * 86400)),
+            "ip_address": "203.0.113.7", "user_agent": "bench"
+        }, rows):
+            conn.execute(insert(AccessLog), batch)
+    return users
+
+
+def lookups(users: int):
+    """(name, statement for a random user) - the app's queries on these tables"""
+    return [
+        ("contacts of a user, by priority", lambda rng: (
+            select(EmergencyContact)
+            .where(EmergencyContact.user_id == user_id(rng.randrange(users)))
+            .order_by(EmergencyContact.priority)
+        )),
+        ("contacts of 50 cards (print sheet)", lambda rng: (
+            select(EmergencyContact)
+            .where(EmergencyContact.user_id.in_([user_id(rng.randrange(users)) for _ in range(50)]))
+            .order_by(EmergencyContact.priority)
+        )),
+        ("latest 20 accesses of a user", lambda rng: (
+            select(AccessLog)
+            .where(AccessLog.user_id == user_id(rng.randrange(users)))
+            .order_by(AccessLog.accessed_at.desc())
+            .limit(20)
+        )),
+        ("delete a user's access logs", lambda rng: (
+            delete(AccessLog).where(AccessLog.user_id == user_id(rng.randrange(users)))
+        )),
+    ]
+
+
+def plan(conn, statement) -> str:
+    sql = str(statement.compile(conn, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        return "; ".join(row[3] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    return "; ".join(row[0].strip() for row in conn.execute(text(f"EXPLAIN {sql}")))
+
+
+def measure(users: int, samples: int, label: str) -> None:
+    print(f"\n{label}")
+    with engine.connect() as conn:
+        for name, make in lookups(users):
+            rng = random.Random(42)
+            timings = []
+            for _ in range(samples):
+                statement = make(rng)
+                started = time.perf_counter()
+                conn.execute(statement).close()
+                timings.append((time.perf_counter() - started) * 1000)
+                conn.rollback()  # keep the deleted rows
+            timings.sort()
+            p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+            print(f"  {name:<36} median {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms")
+            print(f"    plan: {plan(conn, make(rng))}")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+
+    migrate("0001")
+    started = time.perf_counter()
+    users = seed(rows)
+    print(f"{rows:,} contacts + {rows:,} access logs for {users:,} users "
+          f"({engine.url.get_backend_name()}), seeded in {time.perf_counter() - started:.0f} s")
+
+    measure(users, samples, "revision 0001 (no index on user_id)")
+
+    started = time.perf_counter()
+    migrate()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    print(f"\nmigration 0002 built the indexes in {time.perf_counter() - started:.1f} s")
+
+    measure(users, samples, "revision 0002 (composite indexes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: QR scan latency with and without the 302 hop
+
+    python -m benchmarks.bench_qr_entry [iterations]
+
+"redirect + /view" replays the old flow (GET /emergency/{id} answered
+with a 302, then GET /emergency/{id}/view); "direct" is the negotiated
+entry URL. Server time is measured in-process; the modelled scan latency
+adds one network round trip per request for typical mobile RTTs.
+"""
+import sys
+
+from benchmarks.harness import setup_env, seed_cards, asgi_request, measure, run
+
+setup_env()
+
+from fastapi.responses import RedirectResponse  # noqa: E402
+
+from main import app  # noqa: E402
+
+RTTS_MS = [50, 150, 300, 600]
+BROWSER_ACCEPT = ("accept", "text/html,application/xhtml+xml,*/*;q=0.8")
+
+
+def legacy_redirect(public_id: str):
+    return RedirectResponse(url=f"/emergency/{public_id}/view", status_code=302)
+
+
+app.add_api_route("/legacy/emergency/{public_id}", legacy_redirect)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    public_id = seed_cards(1)[0]
+
+    async def legacy_flow():
+        status, headers, _ = await asgi_request(app, f"/legacy/emergency/{public_id}", [BROWSER_ACCEPT])
+        assert status == 302
+        status, _, body = await asgi_request(app, headers["location"], [BROWSER_ACCEPT])
+        assert status == 200
+        return body
+
+    async def direct_flow():
+        status, _, body = await asgi_request(app, f"/emergency/{public_id}", [BROWSER_ACCEPT])
+        assert status == 200
+        return body
+
+    flows = [
+        ("redirect + /view", 2, measure(lambda: run(legacy_flow()), iterations)),
+        ("direct", 1, measure(lambda: run(direct_flow()), iterations)),
+    ]
+
+    print(f"QR scan: server time per scan ({iterations} iterations, warm card cache)")
+    for name, trips, stats in flows:
+        print(f"  {name:<18} round trips={trips}  mean={stats['mean']:.3f} ms  p95={stats['p95']:.3f} ms")
+
+    print("Modelled scan latency (server mean + round trips x RTT)")
+    print("  " + "RTT".ljust(10) + "".join(name.ljust(20) for name, _, _ in flows) + "saved")
+    for rtt in RTTS_MS:
+        totals = [stats["mean"] + trips * rtt for _, trips, stats in flows]
+        row = "".join(f"{t:.1f} ms".ljust(20) for t in totals)
+        print(f"  {str(rtt) + ' ms':<10}{row}{totals[0] - totals[1]:.1f} ms")
+
+    print("Body size per representation")
+    for accept in ("text/html", "application/json", "application/cbor"):
+        _, headers, body = run(asgi_request(app, f"/emergency/{public_id}", [("accept", accept)]))
+        print(f"  {accept:<18} {len(body):6d} bytes")
+    _, _, body = run(asgi_request(
+        app, f"/emergency/{public_id}", [BROWSER_ACCEPT, ("accept-encoding", "gzip")]
+    ))
+    print(f"  {'text/html (gzip)':<18} {len(body):6d} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: QR on the PDF canvas - PNG round trip vs vector modules
+
+    python -m benchmarks.bench_qr_vector [iterations]
+
+"png round trip" is the old path (qrcode -> PIL image -> PNG in a
+BytesIO -> ImageReader -> drawImage); "vector" draws the shared module
+matrix as one filled path. "vector (matrix cached)" is a repeat render
+of the same URL, where qr_matrix() is served from its LRU cache.
+Sizes are whole PDFs; the card and full-page rows are the real
+generators.
+"""
+import sys
+import time
+from io import BytesIO
+
+from benchmarks.harness import setup_env
+
+setup_env()
+
+import qrcode  # noqa: E402
+from reportlab.lib.units import inch  # noqa: E402
+from reportlab.lib.utils import ImageReader  # noqa: E402
+from reportlab.pdfgen import canvas  # noqa: E402
+
+from backend.utils.qr_matrix import qr_matrix, draw_qr, qr_svg  # noqa: E402
+from backend.utils.pdf_generator import (  # noqa: E402
+    generate_emergency_card_pdf,
+    generate_full_page_card
+)
+
+QR_URL = "https://emergency-card.onrender.com/emergency/3f9a1c7e-5b2d-4e8a-9c1f-7d6e5a4b3c2d"
+USER_DATA = {
+    "name": "Asha Rao",
+    "blood_group": "B+",
+    "age": 34,
+    "emergency_contact": {"name": "Ravi Rao", "phone": "+919876543210"},
+}
+CARD_SIZE = (3.375 * inch, 2.125 * inch)
+
+
+def png_qr_pdf(data: str) -> bytes:
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=CARD_SIZE)
+    qr = qrcode.QRCode(version=1, box_size=10, border=2)
+    qr.add_data(data)
+    qr.make(fit=True)
+    qr_img = qr.make_image(fill_color="black", back_color="white")
+    qr_buffer = BytesIO()
+    qr_img.save(qr_buffer, format="PNG")
+    qr_buffer.seek(0)
+    c.drawImage(ImageReader(qr_buffer), 0.25 * inch, 0.4 * inch, width=1.3 * inch, height=1.3 * inch)
+    c.save()
+    return buffer.getvalue()
+
+
+def vector_qr_pdf(data: str) -> bytes:
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=CARD_SIZE)
+    draw_qr(c, qr_matrix(data), 0.25 * inch, 0.4 * inch, 1.3 * inch)
+    c.save()
+    return buffer.getvalue()
+
+
+def per_call_ms(fn, iterations: int) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    counter = iter(range(10 ** 9))
+
+    def fresh_url() -> str:
+        # a new URL each call, so the matrix cache never helps
+        return f"{QR_URL}?n={next(counter)}"
+
+    results = [
+        ("png round trip", per_call_ms(lambda: png_qr_pdf(fresh_url()), iterations), len(png_qr_pdf(QR_URL))),
+        ("vector", per_call_ms(lambda: vector_qr_pdf(fresh_url()), iterations), len(vector_qr_pdf(QR_URL))),
+        ("vector (matrix cached)", per_call_ms(lambda: vector_qr_pdf(QR_URL), iterations), len(vector_qr_pdf(QR_URL))),
+    ]
+
+    print(f"QR-only card PDF ({iterations} iterations)")
+    for name, ms, size in results:
+        print(f"  {name:<24} {ms:8.3f} ms  {size:7d} bytes")
+
+    print("Generators (vector QR)")
+    for name, fn in (("credit card", generate_emergency_card_pdf), ("full page", generate_full_page_card)):
+        ms = per_call_ms(lambda: fn(USER_DATA, fresh_url()), iterations)
+        print(f"  {name:<24} {ms:8.3f} ms  {len(fn(USER_DATA, QR_URL)):7d} bytes")
+
+    print(f"SVG: {len(qr_svg(qr_matrix(QR_URL))):d} bytes")
+
+
+if __name__ == "__main__":
+    main()
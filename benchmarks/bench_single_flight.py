@@ -0,0 +1,88 @@
+"""
+Benchmark: a burst of simultaneous scans of one card, with and without
+single-flight coalescing
+
+    python -m benchmarks.bench_single_flight [scans] [db_ms]
+
+Each round clears card_cache and starts `scans` threads that load the
+same card at once - the burst after a card is shared or its cache entry
+expires. "independent" calls fetch_public_card from every thread (the
+old loader); "single-flight" goes through degraded_cards.get_card.
+`db_ms` adds latency to every statement, like a remote database.
+"""
+import sys
+import threading
+import time
+
+from benchmarks.harness import seed_cards, setup_env
+
+setup_env()
+
+from sqlalchemy import event  # noqa: E402
+
+from backend.models.database import SessionLocal, engine  # noqa: E402
+from backend.utils.card_cache import card_cache  # noqa: E402
+from backend.utils.degraded_mode import degraded_cards  # noqa: E402
+from backend.utils.public_card import fetch_public_card  # noqa: E402
+from backend.utils.security import encryptor  # noqa: E402
+
+
+def burst(load, public_id: str, scans: int):
+    start_line = threading.Barrier(scans)
+
+    def scan():
+        session = SessionLocal()
+        try:
+            start_line.wait()
+            load(public_id, session)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=scan) for _ in range(scans)]
+    card_cache.clear()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    scans = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    db_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    public_id = seed_cards(1)[0]
+
+    queries = 0
+    decrypts = 0
+
+    def on_query(*args):
+        nonlocal queries
+        queries += 1
+        time.sleep(db_ms / 1000)
+
+    decrypt_json = encryptor.decrypt_json
+
+    def counting_decrypt(value):
+        nonlocal decrypts
+        decrypts += 1
+        return decrypt_json(value)
+
+    encryptor.decrypt_json = counting_decrypt
+    event.listen(engine, "before_cursor_execute", on_query)
+
+    print(f"{scans} simultaneous scans, +{db_ms:g} ms per query (best of 5)")
+    print(f"  {'loader':<14} {'ms':>8} {'queries':>8} {'decrypts':>9}")
+    for name, load in (("independent", fetch_public_card), ("single-flight", degraded_cards.get_card)):
+        best = None
+        for _ in range(5):
+            queries = decrypts = 0
+            elapsed = burst(load, public_id, scans)
+            if best is None or elapsed < best[0]:
+                best = (elapsed, queries, decrypts)
+        print(f"  {name:<14} {best[0]:8.1f} {best[1]:8d} {best[2]:9d}")
+    print(degraded_cards.flights.stats())
+
+
+if __name__ == "__main__":
+    main()
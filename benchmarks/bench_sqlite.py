@@ -0,0 +1,167 @@
+"""
+Benchmark: SQLite defaults vs production mode, with several worker processes
+
+    python -m benchmarks.bench_sqlite [seconds] [workers,...]
+
+Each run copies one seeded SQLite file and starts `workers` processes,
+like `uvicorn --workers N` on one machine. Every worker drives the app
+through ASGI with CLIENTS concurrent clients for `seconds`. Nine in ten
+requests are card scans (public card JSON with card_cache off, plus an
+access log row through access_log_writer), and one in ten is a PUT
+/profile by the client's own user. Every run is done twice:
+
+- "default": SQLite's own settings (rollback journal, synchronous=FULL,
+  no mmap, no write queue)
+- "tuned": the SQLITE_* defaults (WAL, synchronous=NORMAL, mmap, write
+  queue)
+
+Reports scans/s, profile writes/s, p95 write latency, failed requests
+("database is locked") and access logs lost.
+"""
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import setup_env
+
+CLIENTS = 16
+WRITE_EVERY = 10
+CARDS = 8 * CLIENTS
+
+MODES = {
+    "default": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_WRITE_QUEUE": "False",
+    },
+    "tuned": {},
+}
+
+
+def run_worker(worker: int, seconds: float):
+    os.environ["CARD_CACHE_MAX_ENTRIES"] = "0"
+    os.environ["DEGRADED_MODE_ENABLED"] = "False"
+    os.environ["ACCESS_LOG_FLUSH_SECONDS"] = "0.5"
+
+    from benchmarks.harness import asgi_request, run
+    from main import app
+    from backend.models.database import async_engine, engine
+    from backend.models.engine import pool_stats
+    from backend.utils.access_log_writer import access_log_writer
+    from backend.utils.security import create_access_token
+
+    counts = {"scans": 0, "writes": 0, "errors": 0}
+    write_latencies = []
+
+    async def client(n: int):
+        card = worker * CLIENTS + n
+        public_id = f"{card:08x}"
+        token = create_access_token(data={"sub": f"bench{card}@example.com"})
+        auth = [("authorization", f"Bearer {token}"), ("content-type", "application/json")]
+        i = n
+        while time.time() < start_at + seconds:
+            i += 1
+            if i % WRITE_EVERY:
+                status, _, _ = await asgi_request(app, f"/api/emergency/{public_id}")
+                kind = "scans"
+            else:
+                body = json.dumps({"full_name": f"Bench Person {card}", "age": 20 + i % 60}).encode()
+                started = time.perf_counter()
+                status, _, _ = await asgi_request(app, "/profile", auth, method="PUT", body=body)
+                write_latencies.append((time.perf_counter() - started) * 1000)
+                kind = "writes"
+            if status == 200:
+                counts[kind] += 1
+            else:
+                counts["errors"] += 1
+
+    async def load():
+        await asyncio.sleep(max(start_at - time.time(), 0))
+        await asyncio.gather(*(client(n) for n in range(CLIENTS)))
+
+    access_log_writer.start()
+    # Ready; the parent answers with the common start time
+    print("ready", flush=True)
+    start_at = float(sys.stdin.readline())
+    run(load())
+    access_log_writer.stop()
+
+    write_latencies.sort()
+    counts["write_p95"] = write_latencies[int(len(write_latencies) * 0.95) - 1] if write_latencies else 0.0
+    counts["access_logs"] = access_log_writer.stats()
+    counts["write_queue"] = pool_stats(async_engine if async_engine is not None else engine).get("sqlite_write_queue")
+    return counts
+
+
+def run_level(template: str, tmp_dir: str, mode: str, workers: int, seconds: float):
+    path = os.path.join(tmp_dir, f"{mode}-{workers}.db")
+    shutil.copy(template, path)
+    env = dict(os.environ, **MODES[mode], DATABASE_URL=f"sqlite:///{path}")
+
+    # Workers import the app first, then all start at the same moment
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_sqlite", "--worker", str(w), str(seconds)],
+            env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        for w in range(workers)
+    ]
+    for p in procs:
+        while p.stdout.readline().strip() != "ready":
+            pass
+    start_at = time.time() + 0.5
+    results = [json.loads(p.communicate(f"{start_at}\n")[0].strip().splitlines()[-1]) for p in procs]
+
+    logs = [r["access_logs"] for r in results]
+    queues = [r["write_queue"] for r in results if r["write_queue"]]
+    return {
+        "scans": sum(r["scans"] for r in results) / seconds,
+        "writes": sum(r["writes"] for r in results) / seconds,
+        "write_p95": max(r["write_p95"] for r in results),
+        "errors": sum(r["errors"] for r in results),
+        "logs_written": sum(log["written"] for log in logs),
+        "logs_lost": sum(log["failed"] + log["dropped"] for log in logs),
+        "queue_waits": sum(q["waits"] for q in queues) if queues else None,
+    }
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        print(json.dumps(run_worker(int(sys.argv[2]), float(sys.argv[3]))))
+        return
+
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    levels = [int(w) for w in (sys.argv[2] if len(sys.argv) > 2 else "1,2,4,8").split(",")]
+
+    # Seed a rollback-journal file once; every run starts from a copy of it
+    tmp_dir = setup_env()
+    os.environ.update(MODES["default"])
+    from benchmarks.harness import seed_cards
+    from backend.models.database import engine
+
+    if engine.url.get_backend_name() != "sqlite":
+        sys.exit("bench_sqlite needs a SQLite DATABASE_URL")
+    seed_cards(CARDS)
+    engine.dispose()
+    template = engine.url.database
+    for key in MODES["default"]:
+        del os.environ[key]
+
+    print(f"{seconds:.0f} s per run, {CLIENTS} clients per worker, 1 in {WRITE_EVERY} requests a profile write")
+    print(f"  {'workers':>7} {'mode':<8} {'scans/s':>8} {'writes/s':>8} {'write p95':>10} "
+          f"{'errors':>7} {'logs':>7} {'lost':>5} {'queued':>7}")
+    for workers in levels:
+        for mode in MODES:
+            r = run_level(template, tmp_dir, mode, workers, seconds)
+            queued = "-" if r["queue_waits"] is None else r["queue_waits"]
+            print(f"  {workers:>7} {mode:<8} {r['scans']:8.0f} {r['writes']:8.1f} {r['write_p95']:8.1f} ms "
+                  f"{r['errors']:7d} {r['logs_written']:7d} {r['logs_lost']:5d} {queued:>7}")
+
+
+if __name__ == "__main__":
+    main()
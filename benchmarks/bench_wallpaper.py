@@ -0,0 +1,60 @@
+"""
+Benchmark: lock-screen wallpaper rendering per device resolution
+
+    python -m benchmarks.bench_wallpaper [iterations]
+
+"render" is a cold render_wallpaper() call (what a new card version
+costs once per device and format); "cached" is a wallpaper_cache hit,
+which is what every repeat download costs. Sizes are the encoded image.
+"""
+import sys
+import time
+
+from benchmarks.harness import setup_env
+
+setup_env()
+
+from backend.utils.artifact_store import MemoryArtifactStore, content_key  # noqa: E402
+from backend.utils.wallpaper import DEVICE_RESOLUTIONS, WALLPAPER_MEDIA_TYPES, render_wallpaper  # noqa: E402
+
+QR_DATA = "https://emergency-card.onrender.com/emergency/54371b1f"
+CARD = {
+    "full_name": "Asha Rao",
+    "age": 34,
+    "blood_group": "B+",
+    "allergies": ["Penicillin", "Peanuts", "Latex"],
+    "medical_conditions": ["Type 1 diabetes", "Asthma"],
+    "medications": ["Insulin glargine", "Salbutamol inhaler"],
+    "emergency_contacts": [
+        {"name": "Ravi Rao", "relation": "Spouse", "phone": "+919876543210", "priority": 1}
+    ],
+}
+
+
+def per_call_ms(fn, iterations: int) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    cache = MemoryArtifactStore(256 * 1024 * 1024)
+
+    print(f"Wallpaper render ({iterations} iterations)")
+    print(f"  {'device':<20} {'format':<6} {'render ms':>10} {'cached ms':>10} {'bytes':>8}")
+    for device, (width, height) in DEVICE_RESOLUTIONS.items():
+        for fmt in WALLPAPER_MEDIA_TYPES:
+            key = content_key("wallpaper", device, fmt, QR_DATA)
+            image = render_wallpaper(CARD, QR_DATA, device, fmt)
+            cache.put(key, image)
+
+            render_ms = per_call_ms(lambda: render_wallpaper(CARD, QR_DATA, device, fmt), iterations)
+            cached_ms = per_call_ms(lambda: cache.get(key), iterations * 100)
+            print(f"  {device:<20} {fmt:<6} {render_ms:10.1f} {cached_ms:10.4f} {len(image):8d}")
+
+
+if __name__ == "__main__":
+    main()
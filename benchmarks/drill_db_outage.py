@@ -0,0 +1,97 @@
+"""
+Drill: public cards while the database goes away and comes back
+
+    python -m benchmarks.drill_db_outage [seconds] [--manual]
+
+Seeds cards, serves each once (so they have a last-known-good copy),
+then scans random cards - plus a few never served - for `seconds` and
+prints one line per second: fresh / stale / 503 / 500 responses, p95
+latency and the breaker state.
+
+With the default SQLite database the drill kills it itself: from 1/3 to
+2/3 of the run the database file is moved away and the pool dropped, so
+new connections find an empty file. With --manual nothing is touched -
+point DATABASE_URL at a Postgres stand-in and stop / start it mid-run
+(e.g. `docker stop pg` ... `docker start pg`).
+"""
+import logging
+import os
+import random
+import sys
+import time
+
+from benchmarks.harness import request, seed_cards, setup_env
+
+setup_env()
+# short enough that the drill sees card_cache expire and the breaker retry
+os.environ.setdefault("CARD_CACHE_TTL_SECONDS", "2")
+os.environ.setdefault("DB_BREAKER_RESET_SECONDS", "3")
+
+from main import app  # noqa: E402
+from backend.models.database import engine  # noqa: E402
+from backend.utils.degraded_mode import degraded_cards  # noqa: E402
+
+CARDS = 200
+
+
+def sqlite_path() -> str:
+    return engine.url.database if engine.url.get_backend_name() == "sqlite" else None
+
+
+def move_database(src: str, dst: str) -> None:
+    os.replace(src, dst)
+    engine.dispose()
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    seconds = int(args[0]) if args else 30
+    manual = "--manual" in sys.argv or sqlite_path() is None
+
+    logging.disable(logging.WARNING)
+    public_ids = seed_cards(CARDS)
+    for public_id in public_ids:
+        request(app, f"/api/emergency/{public_id}")
+    degraded_cards.start()
+
+    db_path = sqlite_path()
+    kill_at, restore_at = seconds // 3, seconds * 2 // 3
+
+    print(f"{'t':>4} {'fresh':>6} {'stale':>6} {'503':>5} {'500':>5} {'p95 ms':>8}  breaker")
+    started = time.monotonic()
+    for second in range(seconds):
+        if not manual and second == kill_at:
+            move_database(db_path, db_path + ".down")
+            print("---- database killed")
+        if not manual and second == restore_at:
+            move_database(db_path + ".down", db_path)
+            print("---- database restored")
+
+        counts = {"fresh": 0, "stale": 0, 503: 0, 500: 0}
+        latencies = []
+        while time.monotonic() - started < second + 1:
+            if random.random() < 0.05:
+                path = f"/api/emergency/never{random.randrange(1000):03d}"
+            else:
+                path = f"/api/emergency/{random.choice(public_ids)}"
+
+            t0 = time.perf_counter()
+            status, headers, _ = request(app, path)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+            if status == 200:
+                counts["stale" if "warning" in headers else "fresh"] += 1
+            elif status in counts:
+                counts[status] += 1
+
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+        print(f"{second:4d} {counts['fresh']:6d} {counts['stale']:6d} {counts[503]:5d} "
+              f"{counts[500]:5d} {p95:8.2f}  {degraded_cards.breaker.state}")
+
+    degraded_cards.stop()
+    print(degraded_cards.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Shared helpers for the benchmark scripts
+
+Benchmarks run the app in-process against a throwaway SQLite database
+(or whatever DATABASE_URL points at) and drive it through ASGI directly,
+so no server, network or extra HTTP client is needed.
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+
+def setup_env() -> str:
+    """Point settings at a temporary SQLite database unless already configured"""
+    tmp_dir = tempfile.mkdtemp(prefix="emergency-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tmp_dir}/bench.db")
+    os.environ.setdefault("SECRET_KEY", "bench-secret-key")
+    os.environ.setdefault("ENCRYPTION_KEY", "bench-encryption-key")
+    return tmp_dir
+
+
+def seed_cards(count: int, contacts_per_card: int = 2) -> List[str]:
+    """Create `count` users with profiles and contacts; returns their public_ids"""
+    from backend.models.database import (
+        Base, engine, SessionLocal, User, EmergencyProfile, EmergencyContact
+    )
+    from backend.utils.security import encryptor
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    public_ids = []
+    try:
+        for i in range(count):
+            user = User(email=f"bench{i}@example.com", username=f"bench{i}", password_hash="x")
+            db.add(user)
+            db.flush()
+            public_id = f"{i:08x}"
+            db.add(EmergencyProfile(
+                user_id=user.id,
+                public_id=public_id,
+                full_name=f"Bench Person {i}",
+                age=30 + i % 50,
+                blood_group="O+",
+                allergies=encryptor.encrypt_json(["Penicillin", "Peanuts"]),
+                medical_conditions=encryptor.encrypt_json(["Asthma"]),
+                medications=encryptor.encrypt_json(["Salbutamol"])
+            ))
+            for p in range(contacts_per_card):
+                db.add(EmergencyContact(
+                    user_id=user.id,
+                    name=f"Contact {p}",
+                    relation="Family",
+                    phone=f"+9198765{i:05d}",
+                    priority=p + 1
+                ))
+            public_ids.append(public_id)
+        db.commit()
+    finally:
+        db.close()
+    return public_ids
+
+
+async def asgi_request(
+    app,
+    path: str,
+    headers: Iterable[Tuple[str, str]] = (),
+    method: str = "GET",
+    body: bytes = b""
+) -> Tuple[int, Dict[str, str], bytes]:
+    """Send one request straight into an ASGI app"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    sent = False
+    status, response_headers, chunks = 0, {}, []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            for k, v in message.get("headers", []):
+                response_headers[k.decode().lower()] = v.decode()
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, response_headers, b"".join(chunks)
+
+
+_loop = None
+
+
+def run(coro):
+    """
+    Run a coroutine on the benchmark's event loop - one loop for the
+    whole run, since the async engine's pooled connections belong to
+    the loop that opened them
+    """
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+
+def request(app, path: str, headers: Iterable[Tuple[str, str]] = (), **kwargs):
+    return run(asgi_request(app, path, headers, **kwargs))
+
+
+def measure(fn: Callable[[], object], iterations: int) -> Dict[str, float]:
+    """Run fn repeatedly; returns mean / p50 / p95 in milliseconds"""
+    fn()  # warm up
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p95": samples[int(len(samples) * 0.95) - 1],
+    }
@@ -7,11 +7,20 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import text
 
 from backend.config import settings
-from backend.models.database import init_db
-from backend.api import auth, profile, public
+from backend.models.database import async_engine, async_read_engine, engine, init_db, read_engine
+from backend.models.engine import pool_stats, warm_async_pool, warm_pool
+from backend.api import auth, profile, public, print_sheets
+from backend.utils.card_cache import card_cache
+from backend.utils.access_log_writer import access_log_writer
+from backend.utils.artifact_store import pdf_cache, qr_cache, wallpaper_cache
+from backend.utils.render_service import render_service
+from backend.utils.prerender import prerender_pipeline
+from backend.utils.degraded_mode import degraded_cards
+from backend.utils.read_routing import WRITE_MARK_HEADER, ReadYourWritesMiddleware, read_router
 
 # =====================================================
 # LOGGING SETUP
@@ -39,12 +48,54 @@ app = FastAPI(
 @app.on_event("startup")
 async def startup_event():
     """Initialize database on application startup"""
+    logger.info("🚀 Starting Emergency Info Card System...")
     try:
-        logger.info("🚀 Starting Emergency Info Card System...")
         init_db()
-        logger.info("✅ Application started successfully!")
     except Exception as e:
-        logger.error(f"❌ Startup failed: {e}", exc_info=True)
+        # Don't serve from a schema that may not match the code
+        logger.critical(f"❌ Database migration failed, not starting: {e}", exc_info=True)
+        raise
+
+    try:
+        access_log_writer.start()
+        render_service.start()
+        prerender_pipeline.start()
+        degraded_cards.start()
+        read_router.start()
+    except Exception as e:
+        # Without them access logs stop being written, and stale cards
+        # and replica lag are never rechecked - don't serve like that
+        logger.critical(f"❌ Background services failed to start, not starting: {e}", exc_info=True)
+        raise
+
+    if settings.DB_POOL_WARMUP:
+        try:
+            if async_engine is not None:
+                warmed = await warm_async_pool(async_engine)
+            else:
+                warmed = await run_in_threadpool(warm_pool, engine)
+            logger.info(f"🔥 Opened {warmed} pooled database connections")
+        except Exception as e:
+            # Connections are opened on demand instead
+            logger.warning(f"⚠️ Database pool warm-up failed: {e}")
+
+    logger.info("✅ Application started successfully!")
+
+# =====================================================
+# SHUTDOWN EVENT - Flush buffered access logs
+# =====================================================
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write any queued access logs, stop the render pool and close the async pools"""
+    read_router.stop()
+    degraded_cards.stop()
+    prerender_pipeline.stop()
+    render_service.stop()
+    access_log_writer.stop()
+    logger.info(f"👋 Access log writer stopped: {access_log_writer.stats()}")
+    for pool in (async_engine, async_read_engine):
+        if pool is not None:
+            await pool.dispose()
 
 # =====================================================
 # GLOBAL EXCEPTION HANDLER (SHOWS FULL ERROR)
@@ -71,8 +122,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[WRITE_MARK_HEADER],
 )
 
+# Write marks for read-your-writes across workers (with a read replica)
+app.add_middleware(ReadYourWritesMiddleware)
+
 # =====================================================
 # STATIC FILES (OPTIONAL)
 # =====================================================
@@ -88,6 +143,7 @@ if os.path.exists(static_dir):
 app.include_router(auth.router)
 app.include_router(profile.router)
 app.include_router(public.router)
+app.include_router(print_sheets.router)
 
 logger.info("✅ All API routers registered")
 
@@ -130,5 +186,25 @@ def health_check():
         "status": "healthy",
         "app_name": settings.APP_NAME,
         "version": settings.APP_VERSION,
-        "database": db_status
+        "database": db_status,
+        "database_driver": "async" if async_engine is not None else "sync (threadpool)",
+        "database_pool": {
+            name: pool_stats(pool)
+            for name, pool in (
+                ("sync", engine),
+                ("async", async_engine),
+                ("replica_sync", read_engine),
+                ("replica_async", async_read_engine)
+            )
+            if pool is not None
+        },
+        "read_replica": read_router.stats(),
+        "card_cache": card_cache.stats(),
+        "access_log": access_log_writer.stats(),
+        "pdf_cache": pdf_cache.stats(),
+        "qr_cache": qr_cache.stats(),
+        "wallpaper_cache": wallpaper_cache.stats(),
+        "prerender": prerender_pipeline.stats(),
+        "degraded_mode": degraded_cards.stats(),
+        "render_service": render_service.stats()
     }
@@ -182,7 +182,10 @@ def test_public_access(public_id):
     """Test public emergency card access"""
     print_section("8. Testing Public Emergency Card Access")
     try:
-        response = requests.get(f"{BASE_URL}/emergency/{public_id}")
+        response = requests.get(
+            f"{BASE_URL}/emergency/{public_id}",
+            headers={"Accept": "application/json"}
+        )
         if response.status_code == 200:
             card_data = response.json()
             print_success("Public emergency card accessed")
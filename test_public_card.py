@@ -0,0 +1,1162 @@
+"""
+Query-count tests for the public emergency card read path
+Run with: python -m pytest -q test_public_card.py
+"""
+import asyncio
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Point the app at a throwaway SQLite database before anything imports settings
+_tmp_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_dir}/test_public_card.db"
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("ENCRYPTION_KEY", "test-encryption-key")
+
+import pytest
+from PIL import Image
+from pypdf import PdfReader
+from xml.etree import ElementTree
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from fastapi import HTTPException
+from sqlalchemy import event, select
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from backend.models.database import (
+    Base,
+    engine,
+    async_engine,
+    AsyncSessionLocal,
+    SessionLocal,
+    SyncSessionAdapter,
+    User,
+    EmergencyProfile,
+    EmergencyContact,
+    AccessLog
+)
+from backend.models.engine import create_async_db_engine, create_db_engine, pool_stats, warm_pool
+from backend.models.migrations import BASELINE_REVISION, current_revision, head_revision, migrate
+from backend.utils.render_service import RenderService
+from backend.utils.security import encryptor
+from backend.utils.card_cache import card_cache
+from backend.utils import cbor
+from backend.utils import card_template
+from backend.utils.card_template import RenderedBody, render_card_html
+from backend.utils.public_card import load_public_cards, card_print_data, get_public_card
+from backend.utils.offline_card import (
+    FORMAT_VERSION,
+    PRESET_DICTIONARY,
+    b64url_encode,
+    extract_payload,
+    pack_payload,
+    verify_payload
+)
+from backend.utils.security import card_signer
+from backend.utils.short_link import card_qr_data, decode_short_id, encode_short_id
+from backend.utils.qr_matrix import qr_matrix, qr_png, qr_svg
+from backend.utils import access_log_writer as access_log_module
+from backend.utils.access_log_writer import AccessLogWriter
+from backend.utils import artifact_store
+from backend.utils.artifact_store import DiskArtifactStore, MemoryArtifactStore, TieredArtifactStore
+from backend.utils.prerender import prerender_pipeline, artifact_key, card_version, manifest_key
+from backend.utils.static_export import export_static_site, load_manifest
+from backend.utils.degraded_mode import CircuitBreaker, DegradedCardService, degraded_cards
+from backend.utils import read_routing
+from backend.utils.read_routing import (
+    WRITE_MARK_HEADER,
+    ReadRouter,
+    ReadYourWritesMiddleware,
+    card_key,
+    mark_written_at,
+    write_mark
+)
+from backend.api.public import (
+    get_emergency_card,
+    get_public_emergency_card_json,
+    view_emergency_card_html,
+    download_emergency_card_pdf,
+    render_card_pdf,
+    get_emergency_card_short,
+    verify_offline_card
+)
+from backend.api import public as public_api
+
+from backend.api.print_sheets import create_print_sheet
+from backend.api import profile as profile_api
+from backend.api.auth import get_current_user
+from backend.utils.qr_generator import ERROR_LEVELS
+from backend.utils.wallpaper import DEVICE_RESOLUTIONS
+from backend.utils.pdf_generator import (
+    CARD_QR_POSITION,
+    CARD_QR_SIZE,
+    generate_emergency_card_pdf,
+    generate_emergency_cards_pdf,
+    generate_full_page_cards
+)
+from backend.models.schemas import OfflineCardVerifyRequest, PrintSheetRequest
+
+PUBLIC_ID = "abcd1234"
+
+
+class QueryCounter:
+    """Count SQL statements sent to the engine"""
+
+    def __init__(self, target=engine):
+        self.target = target
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.target, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.target, "before_cursor_execute", self)
+
+
+def serve(route, *args):
+    """Call an async route, with the test's sync session (last argument) as its db"""
+    *args, db = args
+    return asyncio.run(route(*args, SyncSessionAdapter(db)))
+
+
+def make_request(**headers) -> Request:
+    raw_headers = [(b"user-agent", b"pytest")] + [
+        (name.replace("_", "-").encode(), value.encode())
+        for name, value in headers.items()
+    ]
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": f"/emergency/{PUBLIC_ID}",
+        "headers": raw_headers,
+        "client": ("203.0.113.7", 5000),
+    })
+
+
+@pytest.fixture(scope="module", autouse=True)
+def seeded_db():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(email="card@example.com", username="card", password_hash="x")
+    db.add(user)
+    db.flush()
+    db.add(EmergencyProfile(
+        user_id=user.id,
+        public_id=PUBLIC_ID,
+        full_name="Test Person",
+        age=42,
+        blood_group="AB-",
+        allergies=encryptor.encrypt_json(["Penicillin"]),
+        medical_conditions=encryptor.encrypt_json(["Asthma"]),
+        medications=encryptor.encrypt_json(["Salbutamol"])
+    ))
+    db.add_all([
+        EmergencyContact(user_id=user.id, name="Second", relation="Friend", phone="222", priority=2),
+        EmergencyContact(user_id=user.id, name="First", relation="Spouse", phone="111", priority=1),
+    ])
+    db.commit()
+    db.close()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db():
+    card_cache.clear()
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def test_json_card_uses_one_query(db):
+    with QueryCounter() as queries:
+        response = serve(get_public_emergency_card_json, PUBLIC_ID, make_request(), db)
+
+    card = json.loads(response.body)
+    assert queries.count == 1
+    assert card["blood_group"] == "AB-"
+    assert card["allergies"] == ["Penicillin"]
+    assert [c["name"] for c in card["emergency_contacts"]] == ["First", "Second"]
+
+
+def test_html_card_uses_one_query(db):
+    with QueryCounter() as queries:
+        response = serve(view_emergency_card_html, PUBLIC_ID, make_request(), db)
+
+    assert queries.count == 1
+    assert response.status_code == 200
+    assert b"Salbutamol" in response.body
+
+
+def test_pdf_card_uses_one_query(db):
+    with QueryCounter() as queries:
+        response = serve(download_emergency_card_pdf, PUBLIC_ID, make_request(), db)
+
+    assert queries.count == 1
+    assert response.media_type == "application/pdf"
+
+
+def test_async_session_serves_card_in_one_query():
+    card_cache.clear()
+
+    async def scan():
+        async with AsyncSessionLocal() as session:
+            response = await get_public_emergency_card_json(PUBLIC_ID, make_request(), session)
+        # pooled connections belong to this event loop
+        await async_engine.dispose()
+        return response
+
+    with QueryCounter(async_engine.sync_engine) as queries:
+        response = asyncio.run(scan())
+
+    assert queries.count == 1
+    assert json.loads(response.body)["medications"] == ["Salbutamol"]
+
+
+def test_cached_card_uses_no_queries(db):
+    serve(get_public_emergency_card_json, PUBLIC_ID, make_request(), db)
+
+    with QueryCounter() as queries:
+        serve(get_public_emergency_card_json, PUBLIC_ID, make_request(), db)
+
+    assert queries.count == 0
+
+
+def test_card_edited_during_a_load_is_not_cached(db, monkeypatch):
+    from backend.utils import public_card
+
+    load = public_card.load_public_profile
+
+    def load_then_edit(public_id, session):
+        profile = load(public_id, session)
+        card_cache.invalidate(public_id)
+        return profile
+
+    monkeypatch.setattr(public_card, "load_public_profile", load_then_edit)
+    assert get_public_card(PUBLIC_ID, db)["public_id"] == PUBLIC_ID
+    assert card_cache.get(PUBLIC_ID) is None
+
+    monkeypatch.setattr(public_card, "load_public_profile", load)
+    get_public_card(PUBLIC_ID, db)
+    assert card_cache.get(PUBLIC_ID) is not None
+
+
+def test_matching_etag_returns_304_without_decrypting(db, monkeypatch):
+    response = serve(view_emergency_card_html, PUBLIC_ID, make_request(), db)
+    etag = response.headers["etag"]
+    card_cache.clear()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("card was decrypted for a 304")
+
+    monkeypatch.setattr(encryptor, "decrypt_json", fail)
+    response = serve(view_emergency_card_html, PUBLIC_ID, make_request(if_none_match=etag), db)
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert "stale-if-error" in response.headers["cache-control"]
+
+
+@pytest.mark.parametrize("accept, media_type", [
+    ("text/html,application/xhtml+xml,*/*;q=0.8", "text/html"),
+    ("application/json", "application/json"),
+    ("application/cbor", "application/cbor"),
+    ("*/*", "text/html"),
+])
+def test_entry_url_serves_card_without_redirect(db, accept, media_type):
+    response = serve(get_emergency_card, PUBLIC_ID, make_request(accept=accept), db)
+
+    assert response.status_code == 200
+    assert response.media_type == media_type
+    if media_type == "application/cbor":
+        assert cbor.loads(response.body)["blood_group"] == "AB-"
+
+
+def test_print_sheet_batch_uses_one_query(db):
+    with QueryCounter() as queries:
+        entries = load_public_cards([PUBLIC_ID, "missing", PUBLIC_ID], db)
+
+    assert queries.count == 1
+    assert [e["public_id"] for e in entries] == [PUBLIC_ID, PUBLIC_ID]
+    assert card_print_data(entries[0])["emergency_contact"] == {"name": "First", "phone": "111"}
+
+
+def test_timed_out_render_stays_pending_until_the_pool_finishes_it():
+    renders = RenderService(workers=1, max_pending=1, timeout=0.05, start_method="fork")
+    renders.start()
+
+    async def scan():
+        with pytest.raises(HTTPException) as timed_out:
+            await renders.run(time.sleep, 0.5)
+        with pytest.raises(HTTPException) as rejected:
+            await renders.run(time.sleep, 0)
+        return timed_out.value.status_code, rejected.value.status_code
+
+    try:
+        assert asyncio.run(scan()) == (504, 503)
+        assert renders.stats()["pending"] == 1
+        deadline = time.time() + 5
+        while renders.stats()["pending"] and time.time() < deadline:
+            time.sleep(0.01)
+        assert renders.stats()["pending"] == 0
+    finally:
+        renders.stop()
+
+
+def test_concurrent_renders_never_exceed_max_pending():
+    renders = RenderService(workers=0, max_pending=2, timeout=5, start_method="fork")
+    start = threading.Barrier(8)
+
+    def request():
+        start.wait()
+        try:
+            asyncio.run(renders.run(time.sleep, 0.3))
+            return 200
+        except HTTPException as e:
+            return e.status_code
+
+    try:
+        with ThreadPoolExecutor(8) as clients:
+            statuses = list(clients.map(lambda _: request(), range(8)))
+    finally:
+        renders.stop()
+    assert sorted(statuses) == [200, 200] + [503] * 6
+    assert renders.stats()["pending"] == 0
+
+
+def test_print_sheets_are_logged_and_charged_to_a_quota(db, monkeypatch):
+    monkeypatch.setattr("backend.api.print_sheets.settings.PRINT_SHEET_QUOTA_CARDS", 3)
+    logged = []
+    monkeypatch.setattr("backend.api.public.access_log_writer.record", lambda **row: logged.append(row))
+    user = db.scalar(select(User).where(User.email == "card@example.com"))
+
+    def print_sheet(*public_ids):
+        return serve(create_print_sheet, PrintSheetRequest(public_ids=list(public_ids)), make_request(), user, db)
+
+    async def read(response):
+        return b"".join([chunk async for chunk in response.body_iterator])
+
+    # Unknown ids are not named back, and still use up the quota
+    with pytest.raises(HTTPException) as unknown:
+        print_sheet(PUBLIC_ID, "nosuchid")
+    assert unknown.value.status_code == 400
+    assert "nosuchid" not in unknown.value.detail
+
+    assert asyncio.run(read(print_sheet(PUBLIC_ID))).startswith(b"%PDF")
+    assert [row["user_id"] for row in logged] == [user.id]
+    assert logged[0]["ip_address"] == "203.0.113.7"
+
+    with pytest.raises(HTTPException) as over_quota:
+        print_sheet(PUBLIC_ID)
+    assert over_quota.value.status_code == 429
+
+
+def test_short_link_serves_the_card_and_404s_bad_codes(db, monkeypatch):
+    monkeypatch.setattr("backend.utils.short_link.settings.QR_SHORT_LINKS", True)
+    monkeypatch.setattr("backend.utils.short_link.settings.QR_SHORT_BASE_URL", "https://card.example")
+    url = card_qr_data(get_public_card(PUBLIC_ID, db))
+    assert url == f"HTTPS://CARD.EXAMPLE/E/{encode_short_id(PUBLIC_ID)}"
+
+    code = url.rsplit("/", 1)[1]
+    for scanned in (code, code.lower()):
+        response = serve(get_emergency_card_short, scanned, make_request(accept="text/html"), db)
+        assert response.status_code == 200
+        assert b"AB-" in response.body
+
+    for bad in ("ZZZZZZZ", "1_0", "-1", "E!", encode_short_id("deadbeef")):
+        response = serve(get_emergency_card_short, bad, make_request(accept="text/html"), db)
+        assert response.status_code == 404, bad
+
+
+@pytest.mark.parametrize("scale", [1, 3, 10])
+def test_qr_png_and_svg_draw_the_qr_matrix(scale):
+    matrix = qr_matrix("HTTPS://CARD.EXAMPLE/E/1BRE2N5", border=4)
+    n = len(matrix)
+
+    image = Image.open(io.BytesIO(qr_png(matrix, scale)))
+    assert image.size == (n * scale, n * scale)
+    for row in range(n):
+        for col in range(n):
+            for dy, dx in ((0, 0), (scale - 1, scale - 1)):
+                dark = image.getpixel((col * scale + dx, row * scale + dy)) == 0
+                assert dark == matrix[row][col], (row, col)
+
+    svg = ElementTree.fromstring(qr_svg(matrix, size=200))
+    assert svg.get("viewBox") == f"0 0 {n} {n}" and svg.get("width") == "200"
+    drawn = [[False] * n for _ in range(n)]
+    path = svg.find("{http://www.w3.org/2000/svg}path").get("d")
+    for col, row, length in re.findall(r"M(\d+) (\d+)h(\d+)v1h-\3z", path):
+        for i in range(int(col), int(col) + int(length)):
+            drawn[int(row)][i] = True
+    assert tuple(map(tuple, drawn)) == matrix
+
+
+def test_short_ids_round_trip_and_reject_bad_codes():
+    for public_id in ("00000000", "ffffffff", PUBLIC_ID, "0badf00d"):
+        code = encode_short_id(public_id)
+        assert len(code) <= 7 and code == code.upper()
+        assert decode_short_id(code) == public_id
+        assert decode_short_id(code.lower()) == public_id
+    assert decode_short_id(encode_short_id("ABCD1234")) == PUBLIC_ID
+
+    for public_id in ("", "abcd123", "abcd12345", "ghijklmn", "-1234567", "+1234567", "1234_567", " 1234567"):
+        assert encode_short_id(public_id) is None, public_id
+    for code in ("", "ZZZZZZZ", "12345678", "-1", "+1", "1_0", " 1", "1 ", "E/1", "١"):
+        assert decode_short_id(code) is None, code
+
+
+def logged_rows(db, ip_address: str) -> int:
+    db.expire_all()
+    return len(db.scalars(select(AccessLog).where(AccessLog.ip_address == ip_address)).all())
+
+
+def wait_for(condition, seconds: float = 5.0) -> bool:
+    deadline = time.time() + seconds
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_access_logs_are_written_in_batches_by_size_and_interval(db):
+    user = db.scalar(select(User).where(User.email == "card@example.com"))
+    by_size = AccessLogWriter(max_queue=100, batch_size=3, flush_interval=60)
+    by_size.start()
+    try:
+        for _ in range(2):
+            by_size.record(user.id, "198.51.100.1", "pytest")
+        time.sleep(0.2)
+        assert by_size.stats()["written"] == 0
+
+        by_size.record(user.id, "198.51.100.1", "pytest")
+        assert wait_for(lambda: by_size.stats()["written"] == 3)
+        assert by_size.stats()["flushes"] == 1
+    finally:
+        by_size.stop()
+    assert logged_rows(db, "198.51.100.1") == 3
+
+    by_interval = AccessLogWriter(max_queue=100, batch_size=100, flush_interval=0.05)
+    by_interval.start()
+    try:
+        by_interval.record(user.id, "198.51.100.2", "pytest")
+        assert wait_for(lambda: by_interval.stats()["written"] == 1)
+    finally:
+        by_interval.stop()
+    assert logged_rows(db, "198.51.100.2") == 1
+
+
+def test_access_log_overflow_is_counted_and_failed_batches_do_not_stop_the_writer(db, monkeypatch):
+    user = db.scalar(select(User).where(User.email == "card@example.com"))
+    writer = AccessLogWriter(max_queue=3, batch_size=2, flush_interval=60)
+
+    assert [writer.record(user.id, "198.51.100.3", "pytest") for _ in range(5)] == [True] * 3 + [False] * 2
+    writer.stop()
+    assert logged_rows(db, "198.51.100.3") == 3
+    stats = writer.stats()
+    assert (stats["enqueued"], stats["dropped"], stats["written"], stats["queued"]) == (3, 2, 3, 0)
+
+    # A database without the table: the batch fails, is counted, and the writer carries on
+    empty = create_db_engine(f"sqlite:///{tempfile.mkdtemp()}/empty.db")
+    monkeypatch.setattr(access_log_module, "SessionLocal", sessionmaker(bind=empty))
+    writer.record(user.id, "198.51.100.4", "pytest")
+    assert writer.flush() == 0
+    assert writer.stats()["failed"] == 1
+    empty.dispose()
+
+    monkeypatch.undo()
+    writer.record(user.id, "198.51.100.4", "pytest")
+    writer.start()
+    writer.stop()
+    assert logged_rows(db, "198.51.100.4") == 1
+    assert writer.stats()["written"] == 4
+
+
+def test_tiered_store_promotes_disk_hits_and_evicts_by_bytes(monkeypatch):
+    directory = tempfile.mkdtemp()
+    store = TieredArtifactStore(MemoryArtifactStore(250), DiskArtifactStore(directory, 250))
+    keys = [artifact_store.content_key("qr", n) for n in range(3)]
+    for key in keys:
+        store.put(key, key[:1].encode() * 100)
+
+    # 300 bytes into 250: the oldest left both tiers
+    assert store.get(keys[0]) is None
+    assert not os.path.exists(store.location(keys[0]))
+
+    # A new worker starts with an empty memory tier; disk hits are promoted
+    restarted = TieredArtifactStore(MemoryArtifactStore(250), DiskArtifactStore(directory, 250))
+    assert restarted.get(keys[1]) == keys[1][:1].encode() * 100
+    assert restarted.memory.get(keys[1]) is not None
+    assert restarted.stats()["disk"]["hits"] == 1
+
+    # A cache dir that can't be touched still serves its hits
+    def read_only(*args):
+        raise PermissionError(13, "Permission denied")
+
+    monkeypatch.setattr(artifact_store.os, "utime", read_only)
+    assert restarted.disk.get(keys[2]) == keys[2][:1].encode() * 100
+
+
+def test_relative_store_directories_live_under_the_app():
+    assert artifact_store.qr_cache.disk.directory == os.path.join(artifact_store.APP_ROOT, "artifacts", "qr")
+    assert os.path.isfile(os.path.join(artifact_store.APP_ROOT, "main.py"))
+
+
+def test_wallpaper_renders_every_device_once_per_layout_version(db, monkeypatch):
+    monkeypatch.setattr(profile_api, "wallpaper_cache", MemoryArtifactStore(64 * 1024 * 1024))
+    user = db.scalar(select(User).where(User.email == "card@example.com"))
+    renders = []
+    render = profile_api.render_service.run
+
+    async def counted(fn, *args):
+        renders.append(args[2:])
+        return await render(fn, *args)
+
+    monkeypatch.setattr(profile_api.render_service, "run", counted)
+
+    def wallpaper(device, fmt):
+        return serve(profile_api.get_wallpaper, make_request(), device, fmt, user, db)
+
+    for device, size in DEVICE_RESOLUTIONS.items():
+        for fmt in ("png", "webp"):
+            response = wallpaper(device, fmt)
+            image = Image.open(io.BytesIO(response.body))
+            assert (image.format, image.size) == (fmt.upper(), size)
+            assert response.media_type == f"image/{fmt}"
+    assert len(renders) == 2 * len(DEVICE_RESOLUTIONS)
+
+    # Cache hit: same bytes, no render
+    again = wallpaper("iphone-se", "png")
+    assert len(renders) == 2 * len(DEVICE_RESOLUTIONS)
+
+    # The QR on the wallpaper is the card's QR, module for module. Its
+    # dark modules are the only pure black pixels on the screen.
+    image = Image.open(io.BytesIO(again.body)).convert("RGB")
+    black = image.convert("L").point(lambda v: 255 if v == 0 else 0)
+    left, top, right, _ = black.getbbox()
+    matrix = qr_matrix(card_qr_data(get_public_card(PUBLIC_ID, db)), ERROR_LEVELS["H"], 2)
+    scale = (right - left) // (len(matrix) - 4)
+    left, top = left - 2 * scale, top - 2 * scale
+    for row in range(len(matrix)):
+        for col in range(len(matrix)):
+            pixel = image.getpixel((left + col * scale + scale // 2, top + row * scale + scale // 2))
+            assert (pixel == (0, 0, 0)) == matrix[row][col], (row, col)
+
+    # A new layout version is a new cache key
+    monkeypatch.setattr(profile_api, "LAYOUT_VERSION", profile_api.LAYOUT_VERSION + 1)
+    assert wallpaper("iphone-se", "png").status_code == 200
+    assert len(renders) == 2 * len(DEVICE_RESOLUTIONS) + 1
+
+
+def test_wallpaper_rejects_unknown_devices(db):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    user = db.scalar(select(User).where(User.email == "card@example.com"))
+    app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        client = TestClient(app)
+        assert client.get("/profile/wallpaper/devices").json()["iphone-se"] == {"width": 750, "height": 1334}
+        assert client.get("/profile/wallpaper", params={"device": "nokia-3310"}).status_code == 422
+        assert client.get("/profile/wallpaper", params={"format": "gif"}).status_code == 422
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize("generate", [generate_emergency_cards_pdf, generate_full_page_cards])
+def test_card_pdfs_store_the_chrome_once_and_place_it_on_every_page(db, generate):
+    entry = get_public_card(PUBLIC_ID, db)
+    cards = [{"user_data": card_print_data(entry), "qr_url": card_qr_data(entry)}] * 3
+
+    reader = PdfReader(io.BytesIO(generate(cards)))
+    assert len(reader.pages) == 3
+
+    forms = set()
+    for page in reader.pages:
+        xobjects = page["/Resources"]["/XObject"]
+        for name, ref in xobjects.items():
+            assert ref.get_object()["/Subtype"] == "/Form"
+            assert f"{name} Do".encode() in page.get_contents().get_data()
+            forms.add(ref.idnum)
+    assert len(forms) == 1
+
+
+def test_card_pdf_draws_the_qr_as_vector_modules(db):
+    entry = get_public_card(PUBLIC_ID, db)
+    qr_data = card_qr_data(entry)
+    page = PdfReader(io.BytesIO(generate_emergency_card_pdf(card_print_data(entry), qr_data))).pages[0]
+
+    # No raster anywhere: the page and its forms hold no /Image XObject
+    xobjects = [ref.get_object() for ref in page["/Resources"]["/XObject"].values()]
+    assert all(x["/Subtype"] != "/Image" for x in xobjects)
+    assert all("/XObject" not in x.get("/Resources", {}) for x in xobjects)
+
+    # Rebuild the modules from the page's rectangles
+    matrix = qr_matrix(qr_data)
+    n, module = len(matrix), CARD_QR_SIZE / len(matrix)
+    x0, y0 = CARD_QR_POSITION
+    drawn = [[False] * n for _ in range(n)]
+    number = rb"(-?[\d.]+)"
+    for x, y, w, h in re.findall(rb" ".join([number] * 4) + rb" re", page.get_contents().get_data()):
+        x, y, w, h = map(float, (x, y, w, h))
+        if abs(h - module) > 0.01:
+            continue
+        row = n - 1 - round((y - y0) / module)
+        first = round((x - x0) / module)
+        for col in range(first, first + round(w / module)):
+            drawn[row][col] = True
+    assert tuple(map(tuple, drawn)) == matrix
+
+
+def test_card_template_escapes_every_user_field():
+    hostile = "<script>alert(1)</script>' onmouseover='alert(2)"
+    html = render_card_html({
+        "full_name": hostile,
+        "age": hostile,
+        "blood_group": hostile,
+        "allergies": [hostile],
+        "medical_conditions": [hostile],
+        "medications": [hostile],
+        "emergency_contacts": [{"name": hostile, "relation": hostile, "phone": hostile}],
+    })
+
+    assert "<script>" not in html and "' onmouseover" not in html
+    # six card fields, and the contact's name, relation and phone (link and text)
+    assert html.count("&lt;script&gt;alert(1)&lt;/script&gt;&#x27; onmouseover=&#x27;alert(2)") == 10
+
+
+def test_precompressed_card_variants_decode_to_the_body(db):
+    body = render_card_html(get_public_card(PUBLIC_ID, db)["card"]).encode()
+    rendered = RenderedBody(body)
+
+    assert rendered.for_coding(None) is body
+    assert gzip.decompress(rendered.for_coding("gzip")) == body
+    if card_template.brotli is not None:
+        assert card_template.brotli.decompress(rendered.for_coding("br")) == body
+    assert RenderedBody(body, precompress=False).encoded == {}
+
+
+def test_rendered_pdfs_are_served_from_pdf_cache(db, monkeypatch):
+    monkeypatch.setattr(public_api, "pdf_cache", MemoryArtifactStore(16 * 1024 * 1024))
+    entry = get_public_card(PUBLIC_ID, db)
+    user_data, qr_url = card_print_data(entry), card_qr_data(entry)
+    renders = []
+    render = public_api.render_service.run
+
+    async def counted(fn, *args):
+        renders.append(fn.__name__)
+        return await render(fn, *args)
+
+    monkeypatch.setattr(public_api.render_service, "run", counted)
+
+    async def download(*args):
+        return [await render_card_pdf(user_data, qr_url, *args) for _ in range(2)]
+
+    full_page = asyncio.run(download())
+    wallet = asyncio.run(download("credit"))
+
+    assert renders == ["generate_full_page_card", "generate_emergency_card_pdf"]
+    assert full_page[0] == full_page[1] and wallet[0] == wallet[1]
+    assert full_page[0] != wallet[0]
+
+
+def test_offline_payload_verifies_with_public_key_only(db, monkeypatch):
+    monkeypatch.setattr("backend.utils.short_link.settings.OFFLINE_QR", True)
+    qr_text = card_qr_data(get_public_card(PUBLIC_ID, db))
+    payload = extract_payload(qr_text)
+
+    result = verify_payload(payload, public_key=card_signer.public_key)
+    assert result["valid"]
+    assert result["card"]["blood_group"] == "AB-"
+    assert result["card"]["primary_contact"] == {"name": "First", "phone": "111"}
+
+    tampered = payload[:-1] + bytes([payload[-1] ^ 1])
+    assert not verify_payload(tampered, public_key=card_signer.public_key)["valid"]
+
+
+@pytest.mark.parametrize("fields", [
+    {"t": 2 ** 62},
+    {"t": -2 ** 62},
+    {"t": float("inf")},
+    {"t": 10 ** 12},
+    {"t": "yesterday"},
+    {"p": 5},
+    {"p": ["only a name"]},
+])
+def test_offline_payload_with_bad_fields_is_rejected_as_corrupt(fields):
+    payload = pack_payload(fields, card_signer)
+
+    with pytest.raises(ValueError, match="Corrupt offline card payload"):
+        verify_payload(payload, signer=card_signer)
+    with pytest.raises(HTTPException) as rejected:
+        verify_offline_card(OfflineCardVerifyRequest(payload=b64url_encode(payload)))
+    assert rejected.value.status_code == 400
+
+
+def signed_payload(body: bytes) -> str:
+    """A correctly signed payload around raw CBOR bytes, as a hostile scanner could send"""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=PRESET_DICTIONARY)
+    signed = bytes([FORMAT_VERSION, card_signer.algorithm]) + card_signer.key_id
+    signed += compressor.compress(body) + compressor.flush()
+    return b64url_encode(signed + card_signer.sign(signed))
+
+
+@pytest.mark.parametrize("body", [
+    b"\x81" * 5000 + b"\x00",                 # arrays nested 5000 deep
+    b"\xa1\x61n\x5a\x00\x10\x00\x00" + bytes(1 << 20),  # 1 MB string: a deflate bomb
+])
+def test_hostile_offline_payloads_are_rejected(body):
+    payload = signed_payload(body)
+    assert len(payload) < 4096
+
+    with pytest.raises(HTTPException) as rejected:
+        verify_offline_card(OfflineCardVerifyRequest(payload=payload))
+    assert rejected.value.status_code == 400
+
+    with pytest.raises(ValueError):
+        OfflineCardVerifyRequest(payload="A" * 5000)
+
+
+def test_prerender_serves_stored_artifacts_and_collects_old_versions(db, monkeypatch):
+    monkeypatch.setattr(prerender_pipeline, "store", MemoryArtifactStore(16 * 1024 * 1024))
+
+    assert prerender_pipeline.render(PUBLIC_ID) == "rendered"
+    assert prerender_pipeline.render(PUBLIC_ID) == "current"
+    old_version = card_version(get_public_card(PUBLIC_ID, db))
+
+    response = serve(download_emergency_card_pdf, PUBLIC_ID, make_request(), db)
+    assert response.body == prerender_pipeline.store.get(artifact_key(PUBLIC_ID, old_version, "pdf"))
+
+    profile = db.query(EmergencyProfile).filter_by(public_id=PUBLIC_ID).one()
+    profile.blood_group = "O-"
+    db.commit()
+    card_cache.clear()
+
+    assert prerender_pipeline.render(PUBLIC_ID) == "rendered"
+    new_entry = get_public_card(PUBLIC_ID, db)
+    assert card_version(new_entry) != old_version
+    assert prerender_pipeline.store.get(artifact_key(PUBLIC_ID, old_version, "pdf")) is None
+    assert b"O-" in prerender_pipeline.rendered_card(new_entry).body
+
+    profile.blood_group = "AB-"
+    db.commit()
+
+
+def test_prerendered_html_missing_a_variant_is_rendered_in_full(db, monkeypatch):
+    monkeypatch.setattr(prerender_pipeline, "store", MemoryArtifactStore(16 * 1024 * 1024))
+    card_cache.clear()
+    prerender_pipeline.render(PUBLIC_ID)
+
+    # A re-render replaced the manifest between reading the HTML and its variants
+    entry = dict(get_public_card(PUBLIC_ID, db))
+    entry.pop("html", None)
+    prerender_pipeline.store.put(manifest_key(PUBLIC_ID), json.dumps({"version": "newer", "kinds": []}).encode())
+    prerender_pipeline.store.delete(artifact_key(PUBLIC_ID, card_version(entry), "html.gzip"))
+
+    rendered = prerender_pipeline.rendered_card(entry)
+    assert gzip.decompress(rendered.for_coding("gzip")) == rendered.body
+    assert entry["html"] is rendered
+
+
+def test_static_export_is_incremental(db):
+    out_dir = tempfile.mkdtemp()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        stats = export_static_site(out_dir, db, executor)
+        assert stats == {"rendered": 1, "unchanged": 0, "removed": 0}
+        with open(os.path.join(out_dir, "emergency", PUBLIC_ID, "card.json")) as f:
+            assert json.load(f)["blood_group"] == "AB-"
+        assert os.path.exists(os.path.join(out_dir, "emergency", PUBLIC_ID, "index.html.gz"))
+
+        assert export_static_site(out_dir, db, executor) == {"rendered": 0, "unchanged": 1, "removed": 0}
+
+        manifest = load_manifest(out_dir)
+        manifest["cards"]["gone1234"] = {"updated_at": "", "sha256": ""}
+        os.makedirs(os.path.join(out_dir, "emergency", "gone1234"))
+        with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+
+        assert export_static_site(out_dir, db, executor, full=True) == {"rendered": 1, "unchanged": 0, "removed": 1}
+        assert not os.path.exists(os.path.join(out_dir, "emergency", "gone1234"))
+
+
+def test_database_outage_serves_last_known_good_copy(db, monkeypatch):
+    monkeypatch.setattr(degraded_cards, "store", MemoryArtifactStore(1024 * 1024))
+    monkeypatch.setattr(degraded_cards, "breaker", CircuitBreaker(failure_threshold=2, reset_seconds=60))
+
+    fresh = serve(view_emergency_card_html, PUBLIC_ID, make_request(), db)
+    assert "Warning" not in fresh.headers
+    card_cache.clear()
+
+    calls = []
+
+    def database_down(*args):
+        calls.append(args)
+        raise OperationalError("SELECT", {}, Exception("server closed the connection unexpectedly"))
+
+    event.listen(engine, "before_cursor_execute", database_down)
+    try:
+        for _ in range(4):
+            response = serve(view_emergency_card_html, PUBLIC_ID, make_request(), db)
+            assert response.status_code == 200
+            assert response.headers["Warning"] == '110 - "Response is Stale"'
+            assert response.headers["Cache-Control"] == "no-cache"
+            assert response.headers["ETag"] == fresh.headers["ETag"]
+            assert b"AB-" in response.body
+
+        # breaker opened after two failures; later requests never reach the pool
+        assert degraded_cards.breaker.state == "open"
+        assert len(calls) == 2
+
+        with pytest.raises(HTTPException) as unavailable:
+            serve(get_public_emergency_card_json, "unknown1", make_request(), db)
+        assert unavailable.value.status_code == 503
+        assert degraded_cards.refresh(PUBLIC_ID) is None
+    finally:
+        event.remove(engine, "before_cursor_execute", database_down)
+
+    degraded_cards.breaker.reset_seconds = 0
+    assert degraded_cards.refresh(PUBLIC_ID) == "refreshed"
+    assert degraded_cards.breaker.state == "closed"
+    assert "Warning" not in serve(view_emergency_card_html, PUBLIC_ID, make_request(), db).headers
+
+
+def test_async_connect_errors_trip_the_breaker_and_serve_the_copy(db):
+    cards = DegradedCardService(
+        MemoryArtifactStore(1024 * 1024),
+        CircuitBreaker(failure_threshold=2, reset_seconds=60),
+        slow_seconds=5.0,
+        max_age_seconds=3600.0
+    )
+    cards.remember(get_public_card(PUBLIC_ID, db))
+    card_cache.clear()
+
+    # Nothing listens on port 9: asyncpg raises a bare ConnectionRefusedError
+    dead = create_async_db_engine("postgresql://user:pw@127.0.0.1:9/cards")
+
+    async def scan():
+        entries = []
+        for _ in range(3):
+            async with AsyncSession(dead) as session:
+                entries.append(await cards.get_card_async(PUBLIC_ID, session))
+        await dead.dispose()
+        return entries
+
+    entries = asyncio.run(scan())
+    assert [e["public_id"] for e in entries] == [PUBLIC_ID] * 3
+    assert all("stale" in e for e in entries)
+    assert cards.breaker.state == "open"
+    assert cards.stale_served == 3
+
+
+def test_edited_card_copies_are_void_on_every_worker(db):
+    shared_dir = tempfile.mkdtemp()
+
+    def worker(max_age_seconds=3600):
+        return DegradedCardService(
+            store=DiskArtifactStore(shared_dir, 1024 * 1024),
+            breaker=CircuitBreaker(failure_threshold=2, reset_seconds=60),
+            slow_seconds=2,
+            max_age_seconds=max_age_seconds
+        )
+
+    worker_a, worker_b = worker(), worker()
+    before_edit = get_public_card(PUBLIC_ID, db)
+    worker_b.remember(dict(before_edit))
+    assert worker_b.last_known_good(PUBLIC_ID)["etag"] == before_edit["etag"]
+
+    # The owner hides a field through worker A; B can't serve or re-store its old copy
+    worker_a.forget(PUBLIC_ID)
+    assert worker_b.last_known_good(PUBLIC_ID) is None
+    worker_b.remember(dict(before_edit))
+    assert worker_b.last_known_good(PUBLIC_ID) is None
+
+    card_cache.clear()
+    worker_b.remember(dict(get_public_card(PUBLIC_ID, db)))
+    assert worker_b.last_known_good(PUBLIC_ID) is not None
+
+    # Too old to serve, whatever happened since
+    assert worker(max_age_seconds=0).last_known_good(PUBLIC_ID) is None
+
+
+def test_concurrent_scans_share_one_load(monkeypatch):
+    def slow_database(*args):
+        time.sleep(0.2)
+
+    sessions = [SessionLocal() for _ in range(6)]
+    card_cache.clear()
+    flights = degraded_cards.flights
+    calls, coalesced = flights.calls, flights.coalesced
+
+    event.listen(engine, "before_cursor_execute", slow_database)
+    try:
+        with QueryCounter() as counter:
+            threads = [
+                threading.Thread(target=degraded_cards.get_card, args=(PUBLIC_ID, session))
+                for session in sessions
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        assert counter.count == 1
+
+        card_cache.clear()
+
+        async def scan_all():
+            async_sessions = [AsyncSessionLocal() for _ in range(6)]
+            try:
+                return await asyncio.gather(*(
+                    degraded_cards.get_card_async(PUBLIC_ID, session) for session in async_sessions
+                ))
+            finally:
+                for session in async_sessions:
+                    await session.close()
+                await async_engine.dispose()
+
+        with QueryCounter(async_engine.sync_engine) as counter:
+            entries = asyncio.run(scan_all())
+        assert counter.count == 1
+        assert all(entry is entries[0] for entry in entries)
+    finally:
+        event.remove(engine, "before_cursor_execute", slow_database)
+        for session in sessions:
+            session.close()
+
+    assert flights.calls - calls == 2
+    assert flights.coalesced - coalesced == 10
+
+
+def test_pool_stats_count_checkout_waits():
+    pool_engine = create_db_engine(engine.url, pool_size=1, max_overflow=0, pool_timeout=0.2)
+    try:
+        assert warm_pool(pool_engine) == 1
+        holder = pool_engine.connect()
+        assert pool_stats(pool_engine)["checked_out"] == 1
+
+        # The only connection comes back after ~50 ms; the second checkout waits for it
+        threading.Timer(0.05, holder.close).start()
+        with pool_engine.connect():
+            pass
+
+        # Nobody returns it this time: the checkout times out
+        holder = pool_engine.connect()
+        with pytest.raises(PoolTimeoutError):
+            pool_engine.connect()
+        holder.close()
+
+        stats = pool_stats(pool_engine)
+        assert stats["checked_out"] == 0
+        assert stats["waits"] == 2 and stats["timeouts"] == 1
+        assert stats["wait_ms_max"] >= 150
+    finally:
+        pool_engine.dispose()
+
+
+def test_sqlite_runs_in_wal_and_queues_writers():
+    sqlite_engine = create_db_engine(f"sqlite:///{tempfile.mkdtemp()}/wal.db")
+    try:
+        with sqlite_engine.begin() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+            conn.exec_driver_sql("CREATE TABLE scans (n INTEGER)")
+
+        # A writer holds its turn until commit; a reader is not held up by it
+        writer = sqlite_engine.connect()
+        writer.exec_driver_sql("INSERT INTO scans VALUES (0)")
+        with sqlite_engine.connect() as reader:
+            assert reader.exec_driver_sql("SELECT count(*) FROM scans").scalar() == 0
+
+        # Other writers wait in the queue instead of failing with "database is locked",
+        # and get their turn only once the previous commit is through (a slow one here)
+        writers = {writer.connection.driver_connection}
+        overlapping = []
+
+        @event.listens_for(sqlite_engine, "commit")
+        def slow_commit(conn):
+            time.sleep(0.02)
+
+        @event.listens_for(sqlite_engine, "before_cursor_execute")
+        def check_turn(conn, cursor, statement, *args):
+            if statement.startswith("INSERT"):
+                own = conn.connection.driver_connection
+                overlapping.extend(other for other in writers if other is not own and other.in_transaction)
+                writers.add(own)
+
+        def write(n):
+            with sqlite_engine.begin() as conn:
+                conn.exec_driver_sql(f"INSERT INTO scans VALUES ({n})")
+
+        with ThreadPoolExecutor(4) as pool:
+            futures = [pool.submit(write, n) for n in range(1, 5)]
+            time.sleep(0.05)
+            writer.commit()
+            writer.close()
+            for future in futures:
+                future.result()
+
+        assert overlapping == []
+        with sqlite_engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT count(*) FROM scans").scalar() == 5
+        queue = pool_stats(sqlite_engine)["sqlite_write_queue"]
+        assert queue["waits"] >= 1 and queue["wait_ms_max"] >= 40 and queue["timeouts"] == 0
+    finally:
+        sqlite_engine.dispose()
+
+
+def test_startup_fails_without_background_services_but_not_without_warm_pools(monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "init_db", lambda: None)
+    for service in ("access_log_writer", "render_service", "prerender_pipeline", "degraded_cards", "read_router"):
+        monkeypatch.setattr(getattr(main, service), "start", lambda: None)
+
+    def broken(*args):
+        raise RuntimeError("no threads left")
+
+    monkeypatch.setattr(main.degraded_cards, "start", broken)
+    with pytest.raises(RuntimeError):
+        asyncio.run(main.startup_event())
+
+    async def pool_down(*args):
+        raise ConnectionRefusedError("database not up yet")
+
+    monkeypatch.setattr(main.degraded_cards, "start", lambda: None)
+    monkeypatch.setattr(main.settings, "DB_POOL_WARMUP", True)
+    monkeypatch.setattr(main, "warm_async_pool", pool_down)
+    monkeypatch.setattr(main, "warm_pool", broken)
+    asyncio.run(main.startup_event())
+
+
+def test_migrations_build_the_model_schema_and_upgrade_old_databases():
+    tmp_dir = tempfile.mkdtemp()
+    fresh = create_db_engine(f"sqlite:///{tmp_dir}/fresh.db")
+    legacy = create_db_engine(f"sqlite:///{tmp_dir}/legacy.db")
+    try:
+        assert migrate(bind=fresh) is None
+
+        # What create_all() at startup left behind: tables, no hot-path indexes
+        Base.metadata.create_all(legacy)
+        with legacy.begin() as conn:
+            conn.exec_driver_sql("DROP INDEX ix_emergency_contacts_user_id_priority")
+            conn.exec_driver_sql("DROP INDEX ix_access_logs_user_id_accessed_at")
+        assert migrate(bind=legacy) == BASELINE_REVISION
+
+        for bind in (fresh, legacy):
+            with bind.connect() as conn:
+                assert current_revision(conn) == head_revision()
+                assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+    finally:
+        fresh.dispose()
+        legacy.dispose()
+
+
+def test_workers_starting_together_migrate_once():
+    url = f"sqlite:///{tempfile.mkdtemp()}/workers.db"
+    workers = [create_db_engine(url) for _ in range(4)]
+    try:
+        with ThreadPoolExecutor(len(workers)) as pool:
+            befores = list(pool.map(lambda bind: migrate(bind=bind), workers))
+
+        # One worker built the schema; the others waited and found it current
+        assert befores.count(None) == 1
+        assert befores.count(head_revision()) == 3
+    finally:
+        for bind in workers:
+            bind.dispose()
+
+
+def test_reads_use_the_replica_unless_it_lags_or_the_card_was_just_written(db, monkeypatch):
+    # The "replica" is a snapshot: it never sees the rename below, so every
+    # read shows which database answered
+    replica_engine = create_db_engine(f"sqlite:///{tempfile.mkdtemp()}/replica.db")
+    with engine.connect() as source, replica_engine.connect() as target:
+        source.connection.driver_connection.backup(target.connection.driver_connection)
+    profile = db.query(EmergencyProfile).filter_by(public_id=PUBLIC_ID).one()
+    renamed, profile.full_name = profile.full_name, "Renamed Person"
+    db.commit()
+
+    def make_router():
+        return ReadRouter(
+            replica_sessions=sessionmaker(bind=replica_engine, autoflush=False),
+            async_replica_sessions=None,
+            max_lag_seconds=1.0,
+            check_seconds=60,
+            read_your_writes_seconds=60
+        )
+
+    router = make_router()
+    monkeypatch.setattr(read_routing, "read_router", router)
+
+    def full_name(*keys, via=router, written_at=None):
+        async def read():
+            async with via.session(*keys, written_at=written_at) as session:
+                return await session.scalar(
+                    select(EmergencyProfile.full_name).where(EmergencyProfile.public_id == PUBLIC_ID)
+                )
+        return asyncio.run(read())
+
+    try:
+        # No lag check yet: primary
+        assert full_name(card_key(PUBLIC_ID)) == "Renamed Person"
+
+        assert router.check() == 0.0
+        assert full_name(card_key(PUBLIC_ID)) == renamed
+
+        # The owner just edited the card: their next reads see it
+        async def edit(scope, receive, send):
+            router.wrote(card_key(PUBLIC_ID))
+            await send({"type": "http.response.start", "status": 204, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(ReadYourWritesMiddleware(edit)({"type": "http", "headers": []}, None, send))
+        mark = dict(sent[0]["headers"])[WRITE_MARK_HEADER.lower().encode()].decode()
+        assert full_name(card_key(PUBLIC_ID)) == "Renamed Person"
+        assert full_name(card_key("someone-else")) == renamed
+
+        # Their next read lands on another worker, which has seen no writes:
+        # the write mark they send back still routes it to the primary
+        other_worker = make_router()
+        other_worker.check()
+        assert full_name(card_key(PUBLIC_ID), via=other_worker) == renamed
+        assert full_name(
+            card_key(PUBLIC_ID), via=other_worker, written_at=mark_written_at(mark)
+        ) == "Renamed Person"
+        assert mark_written_at(mark.replace(".", "0.")) is None
+        assert mark_written_at(write_mark(time.time() - 120)) is not None
+        assert full_name(via=other_worker, written_at=time.time() - 120) == renamed
+
+        monkeypatch.setattr(read_routing, "replica_lag", lambda engine: 5.0)
+        router.check()
+        assert full_name(card_key("someone-else")) == "Renamed Person"
+
+        def unreachable(engine):
+            raise OperationalError("SELECT 1", {}, None)
+
+        monkeypatch.setattr(read_routing, "replica_lag", unreachable)
+        router.check()
+        assert router.lag is None and full_name() == "Renamed Person"
+
+        assert router.replica_reads == 2
+        assert router.primary_reads == {"lagging": 1, "unavailable": 2, "read_your_writes": 1}
+        assert other_worker.primary_reads["read_your_writes"] == 1
+    finally:
+        profile.full_name = renamed
+        db.commit()
+        replica_engine.dispose()